@@ -0,0 +1,129 @@
+"""
+Parsing of structured tattoo analyses.
+
+Claude is asked for the five markdown sections of the analysis followed by
+a ``<facets>`` JSON block naming the primary style and key symbols. The
+facets block is machine-only: it is stripped from the text shown to users
+and stored as indexed columns instead.
+"""
+
+import json
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+FACETS_OPEN = "<facets>"
+FACETS_CLOSE = "</facets>"
+
+# Section headings requested by the analysis prompt, mapped to field names
+SECTIONS = {
+    "Symbolism & Meaning": "symbolism",
+    "Artistic Style": "artistic_style",
+    "Cultural Significance": "cultural_significance",
+    "Design Elements": "design_elements",
+    "Personal Interpretation": "interpretation",
+}
+
+KNOWN_STYLES = [
+    "neo-traditional", "traditional", "realism", "blackwork", "tribal",
+    "japanese", "watercolor", "geometric", "minimalist", "dotwork",
+    "fine-line", "trash-polka", "illustrative", "new-school", "chicano",
+]
+
+_HEADING_RE = re.compile(
+    r"\*\*\s*(?:\d+\.\s*)?(" + "|".join(re.escape(h) for h in SECTIONS) + r")\s*\*\*\s*:?",
+    re.IGNORECASE
+)
+
+
+def normalize_facet(value: str) -> str:
+    """Normalize a style or symbol for indexed lookups"""
+    return re.sub(r"[\s_]+", "-", value.strip().lower())
+
+
+def split_facets(text: str) -> Tuple[str, Optional[Dict]]:
+    """Separate the display text from the trailing facets block"""
+    start = text.find(FACETS_OPEN)
+    if start < 0:
+        return text.strip(), None
+
+    end = text.find(FACETS_CLOSE, start)
+    raw = text[start + len(FACETS_OPEN):end if end >= 0 else len(text)]
+    try:
+        facets = json.loads(raw)
+    except ValueError:
+        facets = None
+    return text[:start].strip(), facets if isinstance(facets, dict) else None
+
+
+def parse_analysis(text: str) -> Dict[str, object]:
+    """Extract display text, sections, style and key symbols from an analysis"""
+    display_text, facets = split_facets(text)
+
+    fields = {name: "" for name in SECTIONS.values()}
+    matches = list(_HEADING_RE.finditer(display_text))
+    for i, match in enumerate(matches):
+        heading = next(h for h in SECTIONS if h.lower() == match.group(1).lower())
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(display_text)
+        body = display_text[match.end():end].strip()
+        # Drop a dangling list number left before the next heading
+        fields[SECTIONS[heading]] = re.sub(r"\n\s*\d+\.\s*$", "", body).strip()
+
+    # Facets come from model output, so fields of the wrong type are ignored
+    facets = facets or {}
+    style = facets.get("style")
+    if not isinstance(style, str) or not style.strip():
+        style = _guess_style(fields["artistic_style"])
+    raw_symbols = facets.get("key_symbols")
+    if isinstance(raw_symbols, str):
+        raw_symbols = [raw_symbols]
+    elif not isinstance(raw_symbols, list):
+        raw_symbols = []
+
+    symbols: List[str] = []
+    for symbol in raw_symbols:
+        if isinstance(symbol, str) and symbol.strip():
+            normalized = normalize_facet(symbol)
+            if normalized not in symbols:
+                symbols.append(normalized)
+
+    return dict(
+        fields,
+        display_text=display_text,
+        style=normalize_facet(style) if style else None,
+        key_symbols=symbols
+    )
+
+
+def _guess_style(artistic_style: str) -> Optional[str]:
+    """Fall back to the first known style named in the style section"""
+    normalized = normalize_facet(artistic_style)
+    for style in KNOWN_STYLES:
+        if style in normalized:
+            return style
+    return None
+
+
+class FacetsStripper:
+    """Forward streamed text deltas while withholding the facets block"""
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self.on_delta = on_delta
+        self._text = ""
+        self._sent = 0
+
+    def feed(self, delta: str):
+        """Accept a delta, forwarding whatever is known to be display text"""
+        self._text += delta
+
+        limit = self._text.find(FACETS_OPEN)
+        if limit < 0:
+            # Hold back a tail that could be the start of the marker
+            limit = len(self._text)
+            for size in range(len(FACETS_OPEN) - 1, 0, -1):
+                if self._text.endswith(FACETS_OPEN[:size]):
+                    limit -= size
+                    break
+
+        if limit > self._sent:
+            self.on_delta(self._text[self._sent:limit])
+            self._sent = limit
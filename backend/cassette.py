@@ -0,0 +1,256 @@
+"""
+Record/replay of API traffic for repeatable benchmark runs.
+
+A cassette is a directory holding an ``exchanges.jsonl`` index and a
+``blobs`` folder. Each POST exchange is stored with its original timing;
+large base64 payloads (generated images, uploaded images) are decoded and
+written once to ``blobs/<sha256>`` so repeated images cost no extra space.
+
+The transport here wraps the httpx transport, so it plugs into HttpPool and
+covers every OpenAI and Anthropic call without touching the services.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import httpx
+
+# Strings at least this long that decode as base64 are stored as blobs
+BLOB_MIN_LENGTH = 4096
+
+# Headers that no longer apply once the body has been read and decoded
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CassetteError(Exception):
+    """Raised when replay finds no recording for a request"""
+
+
+class Cassette:
+    """On-disk store of recorded API exchanges"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.index_path = self.path / "exchanges.jsonl"
+        self.blobs_path = self.path / "blobs"
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._replay_positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        if self.index_path.exists():
+            self._load()
+
+    @staticmethod
+    def request_key(request: httpx.Request) -> str:
+        """Identify a request by method, path and canonical JSON body"""
+        body = request.content or b""
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+        except ValueError:
+            pass
+
+        digest = hashlib.sha256()
+        digest.update(request.method.encode("utf-8"))
+        digest.update(request.url.path.encode("utf-8"))
+        digest.update(body)
+        return digest.hexdigest()
+
+    def record(self, request: httpx.Request, response: httpx.Response, body: bytes, elapsed: float):
+        """Append an exchange to the cassette.
+
+        Does blocking file I/O; AsyncCassetteTransport calls it in an executor.
+        """
+        with self._lock:
+            self._record(request, response, body, elapsed)
+
+    def _record(self, request: httpx.Request, response: httpx.Response, body: bytes, elapsed: float):
+        """Write an exchange and its blobs; the caller holds the lock"""
+        entry = {
+            "key": self.request_key(request),
+            "method": request.method,
+            "path": request.url.path,
+            "request": self._pack_body(request.content or b""),
+            "status": response.status_code,
+            "headers": {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in _DROPPED_HEADERS
+            },
+            "response": self._pack_body(body),
+            "elapsed": round(elapsed, 4)
+        }
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._entries[entry["key"]].append(entry)
+
+    def next_exchange(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        """Return the next recording for a request, repeating the last one when exhausted"""
+        key = self.request_key(request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+
+            position = self._replay_positions[key]
+            self._replay_positions[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def build_response(self, entry: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+        """Rebuild an httpx response from a recording"""
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=self._unpack_body(entry["response"]),
+            request=request
+        )
+
+    def _load(self):
+        """Read the exchange index into memory"""
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+
+    def _pack_body(self, body: bytes) -> Any:
+        """Store a body as JSON with large base64 strings moved to blobs"""
+        try:
+            return {"json": self._extract_blobs(json.loads(body))}
+        except ValueError:
+            return {"text": body.decode("utf-8", errors="replace")}
+
+    def _unpack_body(self, packed: Dict[str, Any]) -> bytes:
+        """Restore a body stored by _pack_body"""
+        if "json" in packed:
+            return json.dumps(self._restore_blobs(packed["json"])).encode("utf-8")
+        return packed["text"].encode("utf-8")
+
+    def _extract_blobs(self, value: Any) -> Any:
+        """Replace large base64 strings with content-addressed blob references"""
+        if isinstance(value, dict):
+            return {k: self._extract_blobs(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._extract_blobs(v) for v in value]
+        if isinstance(value, str) and len(value) >= BLOB_MIN_LENGTH:
+            try:
+                data = base64.b64decode(value, validate=True)
+            except (binascii.Error, ValueError):
+                return value
+            return {"$blob": self._write_blob(data)}
+        return value
+
+    def _restore_blobs(self, value: Any) -> Any:
+        """Inline blob references back as base64 strings"""
+        if isinstance(value, dict):
+            if set(value) == {"$blob"}:
+                data = (self.blobs_path / value["$blob"]).read_bytes()
+                return base64.b64encode(data).decode("utf-8")
+            return {k: self._restore_blobs(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._restore_blobs(v) for v in value]
+        return value
+
+    def _write_blob(self, data: bytes) -> str:
+        """Write a blob once and return its hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self.blobs_path / digest
+        if not blob_path.exists():
+            self.blobs_path.mkdir(parents=True, exist_ok=True)
+            blob_path.write_bytes(data)
+        return digest
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async transport that records through, or replays from, a cassette"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cassette: Cassette, mode: str, latency: str = "instant"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.transport = transport
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+
+    def _replay(self, request: httpx.Request):
+        """Look up a recorded exchange, returning it with its replay delay"""
+        if request.method != "POST":
+            # Warm-up and other probes are not recorded
+            return httpx.Response(200, request=request), 0.0
+
+        entry = self.cassette.next_exchange(request)
+        if entry is None:
+            raise CassetteError(f"No recording for {request.method} {request.url.path}")
+
+        delay = entry["elapsed"] if self.latency == "original" else 0.0
+        return self.cassette.build_response(entry, request), delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        loop = asyncio.get_event_loop()
+        if self.mode == "replay":
+            response, delay = await loop.run_in_executor(None, self._replay, request)
+            if delay:
+                await asyncio.sleep(delay)
+            return response
+
+        started = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        if request.method != "POST":
+            return response
+
+        # The body is passed on as it arrives and recorded once it has all been read
+        return httpx.Response(
+            response.status_code,
+            headers=[(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS],
+            stream=_RecordingStream(self.cassette, request, response, started),
+            request=request,
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Response body that tees decoded chunks into a cassette recording.
+
+    Chunks reach the caller as soon as upstream sends them, so streamed
+    responses keep their pacing while being recorded. The exchange is written
+    when the stream is closed, and only if the body was read to the end.
+    """
+
+    def __init__(self, cassette: Cassette, request: httpx.Request, response: httpx.Response, started: float):
+        self.cassette = cassette
+        self.request = request
+        self.response = response
+        self.started = started
+        self.chunks: List[bytes] = []
+        self.complete = False
+        self.closed = False
+
+    async def __aiter__(self):
+        async for chunk in self.response.aiter_bytes():
+            self.chunks.append(chunk)
+            yield chunk
+        self.complete = True
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        await self.response.aclose()
+        if not self.complete:
+            return
+
+        # Blobs of large image responses are written off the event loop
+        await asyncio.get_event_loop().run_in_executor(
+            None, self.cassette.record, self.request, self.response,
+            b"".join(self.chunks), time.perf_counter() - self.started
+        )
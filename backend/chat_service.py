@@ -1,25 +1,35 @@
 import sqlite3
 import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, Optional, Set
 import uuid
 from pathlib import Path
 import shutil
 
-from backend.models import ChatSession, ChatMessage, TattooImage
+from backend.models import (
+    ChatSession, ChatMessage, TattooImage, AnalysisJob, JobStatus, TattooAnalysis
+)
+from backend.analysis_parser import normalize_facet
+
+# Seconds a connection waits for another process's write lock
+BUSY_TIMEOUT = 30.0
 
 class ChatService:
     def __init__(self, db_path: str = "data/chats.db"):
         self.db_path = db_path
+        self._listeners: List[Callable[[str, str], None]] = []
         self._init_db()
     
     def _init_db(self):
         """Initialize database tables"""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL lets the GUI and the standalone MCP server read while the other writes
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS chat_sessions (
                 id TEXT PRIMARY KEY,
@@ -29,6 +39,12 @@ class ChatService:
             )
         ''')
         
+        # Sidebar pages walk sessions by recency
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated 
+            ON chat_sessions (updated_at, id)
+        ''')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS chat_messages (
                 id TEXT PRIMARY KEY,
@@ -53,9 +69,116 @@ class ChatService:
             )
         ''')
         
+        # Display derivative paths were added after the first release
+        self._add_missing_columns(cursor, 'tattoo_images', {
+            'thumb_path': 'TEXT',
+            'medium_path': 'TEXT',
+            'large_path': 'TEXT'
+        })
+        
+        # Analyses keyed by image content and prompt/model version
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                image_hash TEXT,
+                analysis_version TEXT,
+                analysis TEXT,
+                created_at TIMESTAMP,
+                PRIMARY KEY (image_hash, analysis_version)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                chat_session_id TEXT,
+                image_path TEXT,
+                priority INTEGER,
+                status TEXT,
+                error TEXT,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                FOREIGN KEY (chat_session_id) REFERENCES chat_sessions(id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status 
+            ON analysis_jobs (status, priority, created_at)
+        ''')
+        
+        # Structured analyses with indexed style and key symbols
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tattoo_analyses (
+                id TEXT PRIMARY KEY,
+                chat_session_id TEXT,
+                image_path TEXT,
+                image_hash TEXT,
+                style TEXT,
+                symbolism TEXT,
+                artistic_style TEXT,
+                cultural_significance TEXT,
+                design_elements TEXT,
+                interpretation TEXT,
+                created_at TIMESTAMP,
+                FOREIGN KEY (chat_session_id) REFERENCES chat_sessions(id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tattoo_analyses_style 
+            ON tattoo_analyses (style, created_at)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tattoo_analyses_session 
+            ON tattoo_analyses (chat_session_id)
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tattoo_analysis_symbols (
+                symbol TEXT,
+                analysis_id TEXT,
+                PRIMARY KEY (symbol, analysis_id),
+                FOREIGN KEY (analysis_id) REFERENCES tattoo_analyses(id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tattoo_analysis_symbols_analysis 
+            ON tattoo_analysis_symbols (analysis_id)
+        ''')
+        
         conn.commit()
         conn.close()
     
+    def _add_missing_columns(self, cursor, table: str, columns: dict):
+        """Add columns that an older database does not have yet"""
+        existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+    
+    def subscribe(self, callback: Callable[[str, str], None]):
+        """Call callback(event, session_id) when session data changes.
+
+        Events are "session_created", "message_added", "image_saved" and
+        "session_deleted", delivered on the event loop after the write.
+        """
+        self._listeners.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[str, str], None]):
+        """Stop delivering events to callback"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, event: str, session_id: str):
+        """Tell subscribers that a session changed"""
+        for callback in list(self._listeners):
+            try:
+                callback(event, session_id)
+            except Exception as e:
+                print(f"Error in chat service listener: {e}")
+    
     async def create_session(self, name: str) -> ChatSession:
         """Create a new chat session"""
         session = ChatSession(
@@ -71,6 +194,7 @@ class ChatService:
             (session.id, session.name, session.created_at, session.updated_at)
         )
         
+        self._notify("session_created", session.id)
         return session
     
     async def get_all_sessions(self) -> List[ChatSession]:
@@ -79,17 +203,42 @@ class ChatService:
             'SELECT * FROM chat_sessions ORDER BY updated_at DESC'
         )
         
-        sessions = []
-        for row in rows:
-            session = ChatSession(
-                id=row[0],
-                name=row[1],
-                created_at=datetime.fromisoformat(row[2]),
-                updated_at=datetime.fromisoformat(row[3])
+        return [self._row_to_session(row) for row in rows]
+    
+    async def get_sessions_page(self, limit: int, after: Optional[ChatSession] = None) -> List[ChatSession]:
+        """Get up to limit sessions, most recently updated first, following after"""
+        if after is None:
+            rows = await self._fetch_all(
+                'SELECT * FROM chat_sessions ORDER BY updated_at DESC, id DESC LIMIT ?',
+                (limit,)
             )
-            sessions.append(session)
+        else:
+            rows = await self._fetch_all(
+                '''SELECT * FROM chat_sessions 
+                WHERE updated_at < ? OR (updated_at = ? AND id < ?) 
+                ORDER BY updated_at DESC, id DESC LIMIT ?''',
+                (after.updated_at, after.updated_at, after.id, limit)
+            )
+        
+        return [self._row_to_session(row) for row in rows]
+    
+    async def get_session(self, session_id: str) -> Optional[ChatSession]:
+        """Get one chat session"""
+        rows = await self._fetch_all(
+            'SELECT * FROM chat_sessions WHERE id = ?',
+            (session_id,)
+        )
         
-        return sessions
+        return self._row_to_session(rows[0]) if rows else None
+    
+    def _row_to_session(self, row) -> ChatSession:
+        """Build a ChatSession from a chat_sessions row"""
+        return ChatSession(
+            id=row[0],
+            name=row[1],
+            created_at=datetime.fromisoformat(row[2]),
+            updated_at=datetime.fromisoformat(row[3])
+        )
     
     async def get_session_messages(self, session_id: str) -> List[ChatMessage]:
         """Get all messages for a session"""
@@ -120,37 +269,71 @@ class ChatService:
         image_id: Optional[str] = None
     ) -> ChatMessage:
         """Add a message to a session"""
-        message = ChatMessage(
+        message = self._new_message(session_id, content, image_id)
+        await self._execute_transaction(self._message_statements(message))
+        
+        self._notify("message_added", session_id)
+        return message
+    
+    def _new_message(self, session_id: str, content: str, image_id: Optional[str] = None) -> ChatMessage:
+        return ChatMessage(
             id=str(uuid.uuid4()),
             chat_session_id=session_id,
             content=content,
             image_id=image_id,
             created_at=datetime.now()
         )
+    
+    def _message_statements(self, message: ChatMessage) -> list:
+        """Statements inserting a message and updating its session's timestamp"""
+        return [
+            (
+                '''INSERT INTO chat_messages (id, chat_session_id, content, image_id, created_at)
+                VALUES (?, ?, ?, ?, ?)''',
+                (message.id, message.chat_session_id, message.content, 
+                message.image_id, message.created_at)
+            ),
+            (
+                'UPDATE chat_sessions SET updated_at = ? WHERE id = ?',
+                (datetime.now(), message.chat_session_id)
+            )
+        ]
+    
+    async def save_image_metadata(self, image: TattooImage):
+        """Save image metadata to database"""
+        await self._execute_query(*self._image_statement(image))
         
-        await self._execute_query(
-            '''INSERT INTO chat_messages (id, chat_session_id, content, image_id, created_at)
-            VALUES (?, ?, ?, ?, ?)''',
-            (message.id, message.chat_session_id, message.content, 
-            message.image_id, message.created_at)
-        )
-        
-        # Update session timestamp
-        await self._execute_query(
-            'UPDATE chat_sessions SET updated_at = ? WHERE id = ?',
-            (datetime.now(), session_id)
+        self._notify("image_saved", image.chat_session_id)
+    
+    async def save_generated_image(self, image: TattooImage, content: str) -> ChatMessage:
+        """Save an image and the message presenting it in one transaction"""
+        message = self._new_message(image.chat_session_id, content, image.id)
+        await self._execute_transaction(
+            [self._image_statement(image)] + self._message_statements(message)
         )
         
+        self._notify("image_saved", image.chat_session_id)
+        self._notify("message_added", image.chat_session_id)
         return message
     
-    async def save_image_metadata(self, image: TattooImage):
-        """Save image metadata to database"""
-        await self._execute_query(
-            '''INSERT INTO tattoo_images 
-            (id, chat_session_id, prompt, image_path, size, quality, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+    def _image_statement(self, image: TattooImage) -> tuple:
+        return (
+            '''INSERT OR IGNORE INTO tattoo_images 
+            (id, chat_session_id, prompt, image_path, size, quality, created_at,
+            thumb_path, medium_path, large_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
             (image.id, image.chat_session_id, image.prompt, image.image_path,
-            image.size.value, image.quality.value, image.created_at)
+            image.size.value, image.quality.value, image.created_at,
+            image.thumb_path, image.medium_path, image.large_path)
+        )
+    
+    async def save_image_derivatives(self, image_id: str, thumb_path: str, medium_path: str, large_path: str):
+        """Record the display derivatives built for an image"""
+        await self._execute_query(
+            '''UPDATE tattoo_images 
+            SET thumb_path = ?, medium_path = ?, large_path = ? 
+            WHERE id = ?''',
+            (thumb_path, medium_path, large_path, image_id)
         )
     
     async def get_session_images(self, session_id: str) -> List[TattooImage]:
@@ -174,12 +357,212 @@ class ChatService:
                 image_path=row[3],
                 size=ImageSize(row[4]),
                 quality=ImageQuality(row[5]),
-                created_at=datetime.fromisoformat(row[6])
+                created_at=datetime.fromisoformat(row[6]),
+                thumb_path=row[7],
+                medium_path=row[8],
+                large_path=row[9]
             )
             images.append(image)
         
         return images
     
+    async def search_messages(self, query: str, limit: int = 50) -> List[ChatMessage]:
+        """Find messages containing the query text across all sessions, newest first"""
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        rows = await self._fetch_all(
+            '''SELECT * FROM chat_messages 
+            WHERE content LIKE ? ESCAPE '\\' 
+            ORDER BY created_at DESC 
+            LIMIT ?''',
+            (f"%{escaped}%", limit)
+        )
+        
+        return [
+            ChatMessage(
+                id=row[0],
+                chat_session_id=row[1],
+                content=row[2],
+                image_id=row[3],
+                created_at=datetime.fromisoformat(row[4])
+            )
+            for row in rows
+        ]
+    
+    async def get_cached_analysis(self, image_hash: str, analysis_version: str) -> Optional[str]:
+        """Get a stored analysis for an image, if any"""
+        rows = await self._fetch_all(
+            '''SELECT analysis FROM analysis_cache 
+            WHERE image_hash = ? AND analysis_version = ?''',
+            (image_hash, analysis_version)
+        )
+        
+        return rows[0][0] if rows else None
+    
+    async def save_cached_analysis(self, image_hash: str, analysis_version: str, analysis: str):
+        """Store an analysis for an image, replacing any older one"""
+        await self._execute_query(
+            '''INSERT OR REPLACE INTO analysis_cache 
+            (image_hash, analysis_version, analysis, created_at)
+            VALUES (?, ?, ?, ?)''',
+            (image_hash, analysis_version, analysis, datetime.now())
+        )
+    
+    async def create_analysis_job(self, image_path: str, session_id: str, priority: int) -> AnalysisJob:
+        """Persist a new pending analysis job"""
+        job = AnalysisJob(
+            id=str(uuid.uuid4()),
+            image_path=image_path,
+            chat_session_id=session_id,
+            priority=priority,
+            status=JobStatus.PENDING,
+            created_at=datetime.now()
+        )
+        
+        await self._execute_query(
+            '''INSERT INTO analysis_jobs 
+            (id, chat_session_id, image_path, priority, status, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+            (job.id, job.chat_session_id, job.image_path, job.priority,
+            job.status.value, None, job.created_at, job.created_at)
+        )
+        
+        return job
+    
+    async def get_unfinished_analysis_jobs(self) -> List[AnalysisJob]:
+        """Get pending and interrupted analysis jobs in priority order"""
+        rows = await self._fetch_all(
+            '''SELECT id, chat_session_id, image_path, priority, status, error, created_at 
+            FROM analysis_jobs 
+            WHERE status IN (?, ?) 
+            ORDER BY priority ASC, created_at ASC''',
+            (JobStatus.PENDING.value, JobStatus.RUNNING.value)
+        )
+        
+        jobs = []
+        for row in rows:
+            job = AnalysisJob(
+                id=row[0],
+                chat_session_id=row[1],
+                image_path=row[2],
+                priority=row[3],
+                status=JobStatus(row[4]),
+                error=row[5],
+                created_at=datetime.fromisoformat(row[6])
+            )
+            jobs.append(job)
+        
+        return jobs
+    
+    async def update_analysis_job(self, job_id: str, status: JobStatus, error: Optional[str] = None):
+        """Update the status of an analysis job"""
+        await self._execute_query(
+            '''UPDATE analysis_jobs SET status = ?, error = ?, updated_at = ? 
+            WHERE id = ?''',
+            (status.value, error, datetime.now(), job_id)
+        )
+    
+    async def save_analysis(self, analysis: TattooAnalysis, message_content: Optional[str] = None):
+        """Save a structured analysis and its key symbols, with an optional chat message"""
+        statements = [(
+            '''INSERT INTO tattoo_analyses 
+            (id, chat_session_id, image_path, image_hash, style, symbolism, artistic_style,
+            cultural_significance, design_elements, interpretation, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (analysis.id, analysis.chat_session_id, analysis.image_path, analysis.image_hash,
+            analysis.style, analysis.symbolism, analysis.artistic_style,
+            analysis.cultural_significance, analysis.design_elements,
+            analysis.interpretation, analysis.created_at)
+        )]
+        for symbol in analysis.key_symbols:
+            statements.append((
+                'INSERT OR IGNORE INTO tattoo_analysis_symbols (symbol, analysis_id) VALUES (?, ?)',
+                (symbol, analysis.id)
+            ))
+        if message_content is not None:
+            statements += self._message_statements(
+                self._new_message(analysis.chat_session_id, message_content)
+            )
+        
+        await self._execute_transaction(statements)
+        if message_content is not None:
+            self._notify("message_added", analysis.chat_session_id)
+    
+    async def find_analyses_by_style(self, style: str, session_id: Optional[str] = None) -> List[TattooAnalysis]:
+        """Get analyses of a style (e.g. "neo-traditional") across sessions or in one session"""
+        query = 'SELECT * FROM tattoo_analyses WHERE style = ?'
+        params = [normalize_facet(style)]
+        if session_id:
+            query += ' AND chat_session_id = ?'
+            params.append(session_id)
+        query += ' ORDER BY created_at DESC'
+        
+        return await self._load_analyses(await self._fetch_all(query, tuple(params)))
+    
+    async def find_analyses_by_symbol(self, symbol: str) -> List[TattooAnalysis]:
+        """Get analyses that list a key symbol (e.g. "wolf") across sessions"""
+        rows = await self._fetch_all(
+            '''SELECT a.* FROM tattoo_analysis_symbols s 
+            JOIN tattoo_analyses a ON a.id = s.analysis_id 
+            WHERE s.symbol = ? 
+            ORDER BY a.created_at DESC''',
+            (normalize_facet(symbol),)
+        )
+        
+        return await self._load_analyses(rows)
+    
+    async def get_analyzed_image_paths(self, session_id: str) -> Set[str]:
+        """Get the paths of a session's images that already have an analysis"""
+        rows = await self._fetch_all(
+            'SELECT DISTINCT image_path FROM tattoo_analyses WHERE chat_session_id = ?',
+            (session_id,)
+        )
+        
+        return {row[0] for row in rows}
+    
+    async def get_style_counts(self) -> List[tuple]:
+        """Get (style, count) pairs over all analyses, most common first"""
+        return await self._fetch_all(
+            '''SELECT style, COUNT(*) FROM tattoo_analyses 
+            WHERE style IS NOT NULL 
+            GROUP BY style 
+            ORDER BY COUNT(*) DESC'''
+        )
+    
+    async def _load_analyses(self, rows) -> List[TattooAnalysis]:
+        """Build analyses from tattoo_analyses rows, attaching their symbols"""
+        if not rows:
+            return []
+        
+        ids = [row[0] for row in rows]
+        symbol_rows = await self._fetch_all(
+            f'''SELECT analysis_id, symbol FROM tattoo_analysis_symbols 
+            WHERE analysis_id IN ({", ".join("?" * len(ids))})''',
+            tuple(ids)
+        )
+        symbols = {}
+        for analysis_id, symbol in symbol_rows:
+            symbols.setdefault(analysis_id, []).append(symbol)
+        
+        analyses = []
+        for row in rows:
+            analysis = TattooAnalysis(
+                id=row[0],
+                chat_session_id=row[1],
+                image_path=row[2],
+                image_hash=row[3],
+                style=row[4],
+                key_symbols=symbols.get(row[0], []),
+                symbolism=row[5],
+                artistic_style=row[6],
+                cultural_significance=row[7],
+                design_elements=row[8],
+                interpretation=row[9],
+                created_at=datetime.fromisoformat(row[10])
+            )
+            analyses.append(analysis)
+        
+        return analyses
+    
     async def delete_session(self, session_id: str):
         """Delete a chat session and all associated data"""        
         # Delete image files from file system
@@ -201,10 +584,32 @@ class ChatService:
             (session_id,)
         )
         
+        await self._execute_query(
+            'DELETE FROM analysis_jobs WHERE chat_session_id = ?',
+            (session_id,)
+        )
+        
+        await self._execute_query(
+            '''DELETE FROM tattoo_analysis_symbols WHERE analysis_id IN 
+            (SELECT id FROM tattoo_analyses WHERE chat_session_id = ?)''',
+            (session_id,)
+        )
+        
+        await self._execute_query(
+            'DELETE FROM tattoo_analyses WHERE chat_session_id = ?',
+            (session_id,)
+        )
+        
         await self._execute_query(
             'DELETE FROM chat_sessions WHERE id = ?',
             (session_id,)
         )
+        
+        self._notify("session_deleted", session_id)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection that waits out concurrent writers"""
+        return sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
     
     async def _execute_query(self, query: str, params=None):
         """Execute a database query asynchronously"""
@@ -213,7 +618,7 @@ class ChatService:
     
     def _execute_sync(self, query: str, params=None):
         """Synchronous query execution"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         if params:
             cursor.execute(query, params)
@@ -222,6 +627,21 @@ class ChatService:
         conn.commit()
         conn.close()
     
+    async def _execute_transaction(self, statements):
+        """Execute several (query, params) statements atomically"""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._execute_transaction_sync, statements)
+    
+    def _execute_transaction_sync(self, statements):
+        """Synchronous transaction execution"""
+        conn = self._connect()
+        try:
+            with conn:
+                for query, params in statements:
+                    conn.execute(query, params)
+        finally:
+            conn.close()
+    
     async def _fetch_all(self, query: str, params=None):
         """Fetch all results asynchronously"""
         loop = asyncio.get_event_loop()
@@ -229,7 +649,7 @@ class ChatService:
     
     def _fetch_all_sync(self, query: str, params=None):
         """Synchronous fetch all"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         if params:
             cursor.execute(query, params)
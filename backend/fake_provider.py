@@ -0,0 +1,387 @@
+"""
+Offline stand-in for the OpenAI and Anthropic APIs.
+
+Serves the images.generate, chat.completions and messages endpoints from a
+localhost HTTP server running in a background thread. Responses are
+deterministic for a given request, and latency, server errors and 429 rate
+limiting can be injected to exercise the app without keys or network.
+Streamed responses are sent one event at a time with an optional delay
+between chunks, so time to first token and incremental rendering can be
+measured.
+Anthropic prompt caching is emulated: the prefix up to the last
+``cache_control`` block is written on first use and read afterwards, provided
+it reaches the model's minimum cacheable length.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw
+
+# Anthropic allows at most this many cache_control breakpoints per request
+MAX_CACHE_BREAKPOINTS = 4
+
+# Shortest prefix, in tokens, that Anthropic caches; shorter prefixes are
+# processed without caching. Haiku models need twice the default.
+MIN_CACHEABLE_TOKENS = {"haiku": 2048}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model: str) -> int:
+    """Return the minimum cacheable prompt length for a model"""
+    for family, tokens in MIN_CACHEABLE_TOKENS.items():
+        if family in (model or ""):
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+def render_png(seed_text: str, size: str = "1024x1024") -> bytes:
+    """Draw a deterministic black ink pattern for the given seed"""
+    width, height = (int(v) for v in size.split("x"))
+    digest = hashlib.sha256(seed_text.encode("utf-8")).digest()
+    rng = random.Random(digest)
+
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    cx, cy = width // 2, height // 2
+    for i in range(12):
+        radius = rng.randint(min(width, height) // 16, min(width, height) // 3)
+        x = cx + rng.randint(-width // 4, width // 4)
+        y = cy + rng.randint(-height // 4, height // 4)
+        draw.ellipse(
+            (x - radius, y - radius, x + radius, y + radius),
+            outline="black",
+            width=rng.randint(2, 12)
+        )
+        draw.line(
+            (rng.randint(0, width), rng.randint(0, height), x, y),
+            fill="black",
+            width=rng.randint(1, 6)
+        )
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _analysis_text(seed_text: str) -> str:
+    """Build a deterministic five-part tattoo analysis"""
+    rng = random.Random(hashlib.sha256(seed_text.encode("utf-8")).digest())
+    style = rng.choice(["traditional", "neo-traditional", "blackwork", "realism", "minimalist"])
+    symbol = rng.choice(["dragon", "rose", "wolf", "serpent", "moon", "skull"])
+    return (
+        f"**Symbolism & Meaning**: The {symbol} suggests strength and transformation.\n\n"
+        f"**Artistic Style**: {style.capitalize()} with bold black linework.\n\n"
+        "**Cultural Significance**: Draws on widely shared tattoo iconography.\n\n"
+        "**Design Elements**: Balanced composition with strong contrast and negative space.\n\n"
+        f"**Personal Interpretation**: A personal emblem of resilience centred on the {symbol}.\n\n"
+        f'<facets>{{"style": "{style}", "key_symbols": ["{symbol}"]}}</facets>'
+    )
+
+
+class FakeProviderServer:
+    """Localhost server emulating the OpenAI and Anthropic endpoints"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: int = 0,
+        chunk_delay_ms: int = 0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.chunk_delay_ms = chunk_delay_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.request_counts: Dict[str, int] = {}
+        self._cached_prefixes = set()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config) -> "FakeProviderServer":
+        """Create a server from application configuration"""
+        return cls(
+            latency_ms=config.fake_latency_ms,
+            chunk_delay_ms=config.fake_chunk_delay_ms,
+            error_rate=config.fake_error_rate,
+            rate_limit_rate=config.fake_rate_limit_rate,
+            seed=config.fake_seed
+        )
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        """Base URL to pass to the OpenAI client"""
+        return f"{self.url}/v1"
+
+    @property
+    def anthropic_base_url(self) -> str:
+        """Base URL to pass to the Anthropic client"""
+        return self.url
+
+    def start(self) -> "FakeProviderServer":
+        """Start serving in a daemon thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, str], Union[bytes, List[bytes]]]:
+        """Produce a (status, headers, body) response for an API request.
+
+        The body of a streamed response is the list of its chunks.
+        """
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+            roll = self._random.random()
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        if roll < self.rate_limit_rate:
+            return self._error(path, 429, "rate_limit_error", "Rate limit exceeded", {"retry-after": "0"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            return self._error(path, 500, "api_error", "Injected server error")
+
+        if path == "/v1/images/generations":
+            payload = self._images_generate(body)
+        elif path == "/v1/chat/completions":
+            payload = self._chat_completions(body)
+        elif path == "/v1/messages":
+            try:
+                payload = self._messages(body)
+            except ValueError as e:
+                return self._error(path, 400, "invalid_request_error", str(e))
+            if body.get("stream"):
+                return 200, {"Content-Type": "text/event-stream"}, self._message_events(payload)
+        else:
+            return self._error(path, 404, "not_found_error", f"Unknown endpoint: {path}")
+
+        return 200, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+    def _images_generate(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Emulate POST /v1/images/generations"""
+        prompt = body.get("prompt", "")
+        size = body.get("size", "1024x1024")
+        png = render_png(f"{prompt}|{size}|{body.get('quality', 'standard')}", size)
+        return {
+            "created": 0,
+            "data": [{
+                "b64_json": base64.b64encode(png).decode("utf-8"),
+                "revised_prompt": prompt
+            }]
+        }
+
+    def _chat_completions(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Emulate POST /v1/chat/completions"""
+        messages = body.get("messages", [])
+        last = messages[-1]["content"] if messages else ""
+        text = f"Professional tattoo design combining: {' '.join(str(last).split())[:400]}"
+        return {
+            "id": "chatcmpl-offline",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": len(str(messages)) // 4,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": (len(str(messages)) + len(text)) // 4
+            }
+        }
+
+    def _messages(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Emulate POST /v1/messages"""
+        text = _analysis_text(json.dumps(body.get("messages", []), sort_keys=True))
+        input_tokens = len(json.dumps(body)) // 4
+        cache_write, cache_read = self._cache_usage(body)
+        return {
+            "id": "msg_offline",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", ""),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": input_tokens - cache_write - cache_read,
+                "cache_creation_input_tokens": cache_write,
+                "cache_read_input_tokens": cache_read,
+                "output_tokens": len(text) // 4
+            }
+        }
+
+    def _cache_usage(self, body: Dict[str, Any]) -> Tuple[int, int]:
+        """Return (cache write, cache read) tokens for the request's cacheable prefix"""
+        # The cached prefix runs through tools, system and messages in order
+        system = body.get("system", [])
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        blocks = list(body.get("tools", [])) + list(system)
+        for message in body.get("messages", []):
+            content = message.get("content", [])
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            blocks += content
+
+        breakpoints = [i for i, block in enumerate(blocks) if "cache_control" in block]
+        if len(breakpoints) > MAX_CACHE_BREAKPOINTS:
+            raise ValueError(f"A maximum of {MAX_CACHE_BREAKPOINTS} blocks with cache_control may be provided")
+        for i in breakpoints:
+            if blocks[i]["cache_control"] != {"type": "ephemeral"}:
+                raise ValueError("cache_control.type: Input should be 'ephemeral'")
+        if not breakpoints:
+            return 0, 0
+
+        prefix = json.dumps(
+            [body.get("model"), blocks[:breakpoints[-1] + 1]], sort_keys=True
+        )
+        tokens = len(prefix) // 4
+        if tokens < min_cacheable_tokens(body.get("model")):
+            return 0, 0
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._cached_prefixes:
+                return 0, tokens
+            self._cached_prefixes.add(key)
+        return tokens, 0
+
+    def _message_events(self, message: Dict[str, Any]) -> List[bytes]:
+        """Render a message as the server-sent events of a streamed response"""
+        text = message["content"][0]["text"]
+        start = dict(message, content=[], stop_reason=None)
+        start["usage"] = dict(message["usage"], output_tokens=1)
+
+        events = [
+            ("message_start", {"type": "message_start", "message": start}),
+            ("content_block_start", {
+                "type": "content_block_start",
+                "index": 0,
+                "content_block": {"type": "text", "text": ""}
+            })
+        ]
+        # Emit roughly one delta per word, like token streaming
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            chunk = word if i == len(words) - 1 else word + " "
+            events.append(("content_block_delta", {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": chunk}
+            }))
+        events += [
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": message["usage"]["output_tokens"]}
+            }),
+            ("message_stop", {"type": "message_stop"})
+        ]
+
+        return [
+            f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+            for name, data in events
+        ]
+
+    def _error(
+        self,
+        path: str,
+        status: int,
+        error_type: str,
+        message: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Build an error response in the provider's format"""
+        if path == "/v1/messages":
+            payload = {"type": "error", "error": {"type": error_type, "message": message}}
+        else:
+            payload = {"error": {"type": error_type, "message": message, "code": None}}
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        return status, headers, json.dumps(payload).encode("utf-8")
+
+    def _make_handler(self):
+        """Create the request handler class bound to this server"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length else b"{}"
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    body = {}
+
+                status, headers, payload = server.handle(self.path.split("?")[0], body)
+                self.send_response(status)
+                if isinstance(payload, list):
+                    self.send_header("Transfer-Encoding", "chunked")
+                else:
+                    self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                try:
+                    self.end_headers()
+                    if isinstance(payload, list):
+                        self._write_chunks(payload)
+                    else:
+                        self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request, e.g. a cancelled analysis stream
+                    self.close_connection = True
+
+            def _write_chunks(self, chunks: List[bytes]):
+                """Send a streamed body chunk by chunk, pausing between chunks"""
+                for i, chunk in enumerate(chunks):
+                    if i and server.chunk_delay_ms:
+                        time.sleep(server.chunk_delay_ms / 1000)
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
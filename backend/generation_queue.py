@@ -0,0 +1,144 @@
+"""
+Concurrent queue of tattoo generation jobs.
+
+Every prompt the user submits becomes a GenerationJob that runs as its own
+task, so several generations can be in flight across sessions at once. A
+semaphore caps how many call the image API at the same time. Results are
+saved against the job's session, whichever session is open when they land.
+
+Cancelling a job cancels its task, which aborts the API request and frees
+its slot at once. A job whose result is already being committed can no
+longer be cancelled, so the database never holds half a result.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from backend.chat_service import ChatService
+from backend.models import GenerationJob, ImageQuality, ImageSize, JobStatus, TattooImage
+from backend.openai_service import OpenAIService
+
+
+class GenerationQueue:
+    """Runs generation jobs concurrently under a global limit"""
+
+    def __init__(self, openai_service: OpenAIService, chat_service: ChatService, concurrency: int = 2):
+        self.openai_service = openai_service
+        self.chat_service = chat_service
+        self.concurrency = concurrency
+
+        # Called whenever a job changes status
+        self.on_job_updated: Optional[Callable[[GenerationJob], None]] = None
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Jobs saving their result, past the point of cancellation
+        self._committing: Set[str] = set()
+
+    def submit(
+        self,
+        session_id: str,
+        prompt: str,
+        size: ImageSize,
+        quality: ImageQuality,
+        conversation_history: List[Dict[str, str]]
+    ) -> GenerationJob:
+        """Start a generation job; it waits for a free slot before calling the API"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        job = GenerationJob(
+            id=str(uuid.uuid4()),
+            chat_session_id=session_id,
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            conversation_history=conversation_history,
+            status=JobStatus.PENDING,
+            created_at=datetime.now()
+        )
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.ensure_future(self._run(job))
+        self._report(job)
+        return job
+
+    def active_jobs(self, session_id: str = None) -> List[GenerationJob]:
+        """Jobs waiting or running, overall or for one session, oldest first"""
+        return [
+            job for job in self._jobs.values()
+            if session_id is None or job.chat_session_id == session_id
+        ]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a waiting or running job; False if it is finished or being saved"""
+        task = self._tasks.get(job_id)
+        if task is None or job_id in self._committing:
+            return False
+        task.cancel()
+        return True
+
+    async def stop(self):
+        """Abandon all unfinished jobs"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: GenerationJob):
+        """Generate one image and record it in the job's session"""
+        image = save = None
+        try:
+            async with self._semaphore:
+                job.status = JobStatus.RUNNING
+                self._report(job)
+
+                image = await self.openai_service.generate_tattoo(
+                    job.prompt, job.size, job.quality, job.chat_session_id, job.conversation_history
+                )
+                self._committing.add(job.id)
+                save = asyncio.ensure_future(self.chat_service.save_generated_image(
+                    image, f"Generated tattoo: {job.prompt}"
+                ))
+                await asyncio.shield(save)
+
+                job.image = image
+                job.status = JobStatus.DONE
+        except asyncio.CancelledError:
+            if save is None:
+                job.status = JobStatus.CANCELLED
+            else:
+                # Cancelled (e.g. by stop()) while saving: the save still
+                # commits, so the job ends with its outcome
+                await self._finish_save(job, image, save)
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            self._jobs.pop(job.id, None)
+            self._tasks.pop(job.id, None)
+            self._committing.discard(job.id)
+
+        self._report(job)
+
+    async def _finish_save(self, job: GenerationJob, image: TattooImage, save: asyncio.Future):
+        """Wait for a save that outlived its job's cancellation and record its result"""
+        while not save.done():
+            try:
+                await asyncio.shield(save)
+            except asyncio.CancelledError:
+                pass
+
+        if save.exception() is not None:
+            job.status = JobStatus.FAILED
+            job.error = str(save.exception())
+        else:
+            job.image = image
+            job.status = JobStatus.DONE
+
+    def _report(self, job: GenerationJob):
+        """Notify the UI of a job's status"""
+        if self.on_job_updated:
+            self.on_job_updated(job)
@@ -0,0 +1,135 @@
+"""
+Shared HTTP transport for the OpenAI and Anthropic clients.
+
+Both SDKs accept an httpx client, so a single pool of keep-alive
+connections is created here, warmed up in the background at startup and
+closed once when the application exits. When a cassette mode is set the
+transports are wrapped to record or replay all API traffic.
+"""
+
+import asyncio
+from typing import Any, Dict, List
+import httpx
+
+from backend.cassette import Cassette, AsyncCassetteTransport
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+OPENAI_BASE_URL = "https://api.openai.com"
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+
+
+class HttpPool:
+    """Keep-alive connection pools shared by all API clients"""
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 90.0,
+        http2: bool = False,
+        cassette_mode: str = "off",
+        cassette_path: str = None,
+        cassette_latency: str = "instant"
+    ):
+        if http2 and not HTTP2_AVAILABLE:
+            print("HTTP/2 requested but h2 is not installed. Install with: pip install httpx[http2]")
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        timeout = httpx.Timeout(600.0, connect=5.0)
+
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.http2)
+        transport = self._transport
+
+        self.cassette = None
+        if cassette_mode != "off":
+            self.cassette = Cassette(cassette_path)
+            transport = AsyncCassetteTransport(transport, self.cassette, cassette_mode, cassette_latency)
+
+        self.async_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=timeout,
+            event_hooks={"request": [self._on_request]}
+        )
+
+        self._requests = 0
+        self._warmed_up: List[str] = []
+        self._warm_up_task = None
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, config) -> "HttpPool":
+        """Create a pool from application configuration"""
+        return cls(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive,
+            keepalive_expiry=config.http_keepalive_expiry,
+            http2=config.http2,
+            cassette_mode=config.cassette_mode,
+            cassette_path=config.cassette_path,
+            cassette_latency=config.cassette_latency
+        )
+
+    def start_warm_up(self, base_urls: List[str]):
+        """Open connections to the given hosts in the background"""
+        self._warm_up_task = asyncio.ensure_future(self.warm_up(base_urls))
+
+    async def warm_up(self, base_urls: List[str]):
+        """Pay DNS, TCP and TLS setup before the first real request"""
+        results = await asyncio.gather(
+            *(self.async_client.head(url) for url in base_urls),
+            return_exceptions=True
+        )
+        for url, result in zip(base_urls, results):
+            if isinstance(result, Exception):
+                print(f"Connection warm-up failed for {url}: {result}")
+            else:
+                self._warmed_up.append(url)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool statistics for diagnostics"""
+        return {
+            "http2": self.http2,
+            "requests": self._requests,
+            "warmed_up": list(self._warmed_up),
+            "connections": self._connection_stats(self._transport),
+            "closed": self._closed
+        }
+
+    async def aclose(self):
+        """Close all pooled connections"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._warm_up_task and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+
+        await self.async_client.aclose()
+
+    async def _on_request(self, request: httpx.Request):
+        """Count requests sent through the pool"""
+        self._requests += 1
+
+    def _connection_stats(self, transport) -> Dict[str, int]:
+        """Count open and idle connections in a transport's pool"""
+        # httpx does not expose its pool publicly, so this is best effort
+        pool = getattr(transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return {}
+
+        return {
+            "open": len(connections),
+            "idle": sum(1 for c in connections if c.is_idle()),
+            "http2": sum(1 for c in connections if getattr(c, "is_http2", False))
+        }
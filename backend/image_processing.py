@@ -0,0 +1,172 @@
+"""
+Image preprocessing for vision model uploads and display.
+
+DALL-E images are up to 1792x1024 PNGs of several megabytes, while the
+vision model downsamples anything beyond roughly 1.15 megapixels anyway.
+Images are scaled to that bound and re-encoded in the shared process pool,
+as whichever of JPEG or PNG is smaller (flat line art often compresses
+better as PNG; PNG is always used when there is transparency). The derived
+payload is cached on disk by source content hash.
+
+Display derivatives (the image pyramid) are built once per image in the same
+pool, sized for the gallery thumbnail, the chat bubble and the preview
+dialog, so the UI never scales full-size originals.
+"""
+
+import asyncio
+import base64
+import io
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from backend.workers import run_in_process
+
+# Vision model effective resolution
+VISION_MAX_EDGE = 1568
+VISION_MAX_PIXELS = 1_150_000
+VISION_JPEG_QUALITY = 85
+
+# Bump when the settings above change so stale cache entries are ignored
+PREPROCESS_VERSION = "v1"
+
+_MEDIA_TYPES = {".jpg": "image/jpeg", ".png": "image/png"}
+
+# Display derivatives: level -> bounding box (width, height), largest first
+PYRAMID_LEVELS = {
+    "large": (800, 600),
+    "medium": (600, 600),
+    "thumb": (150, 150),
+}
+PYRAMID_JPEG_QUALITY = 90
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    """Check whether an image has transparency"""
+    return image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def _encode_smallest(image: Image.Image, jpeg_quality: int) -> Tuple[str, bytes]:
+    """Encode as PNG or JPEG, whichever is smaller (PNG when transparent)"""
+    png_buffer = io.BytesIO()
+    image.save(png_buffer, format="PNG")
+    extension, data = ".png", png_buffer.getvalue()
+
+    if not _has_alpha(image):
+        jpeg_buffer = io.BytesIO()
+        image.convert("RGB").save(
+            jpeg_buffer, format="JPEG", quality=jpeg_quality, optimize=True
+        )
+        if jpeg_buffer.tell() < len(data):
+            extension, data = ".jpg", jpeg_buffer.getvalue()
+
+    return extension, data
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write a file via a temporary name so readers never see a partial file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def _preprocess_image(source_path: str, target_stem: str) -> Tuple[str, str]:
+    """Downscale and re-encode an image, writing it next to target_stem.
+
+    Runs in a worker process. Returns the media type and base64 payload.
+    """
+    with Image.open(source_path) as image:
+        image.load()
+        width, height = image.size
+        scale = min(
+            1.0,
+            VISION_MAX_EDGE / max(width, height),
+            (VISION_MAX_PIXELS / (width * height)) ** 0.5
+        )
+        if scale < 1.0:
+            image = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.Resampling.LANCZOS
+            )
+
+        extension, data = _encode_smallest(image, VISION_JPEG_QUALITY)
+
+    write_atomic(Path(target_stem + extension), data)
+    return _MEDIA_TYPES[extension], base64.b64encode(data).decode("utf-8")
+
+
+def _read_cached(target_stem: str) -> Optional[Tuple[str, str]]:
+    """Load a previously derived payload, if present"""
+    for extension, media_type in _MEDIA_TYPES.items():
+        path = Path(target_stem + extension)
+        if path.exists():
+            return media_type, base64.b64encode(path.read_bytes()).decode("utf-8")
+    return None
+
+
+async def prepare_vision_image(image_path: str, image_hash: str, cache_dir: Path) -> Tuple[str, str]:
+    """Return (media_type, base64 data) of an image sized for vision upload"""
+    if not Path(image_path).exists():
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    # Workers may run in a different directory than the app
+    source_path = str(Path(image_path).resolve())
+    target_stem = str(Path(cache_dir).resolve() / f"{image_hash}-{PREPROCESS_VERSION}")
+    loop = asyncio.get_event_loop()
+    cached = await loop.run_in_executor(None, _read_cached, target_stem)
+    if cached:
+        return cached
+
+    return await run_in_process(_preprocess_image, source_path, target_stem)
+
+
+def pyramid_dir(image_path: str) -> Path:
+    """Directory holding an image's display derivatives"""
+    return Path(image_path).parent / "derived"
+
+
+def _build_pyramid(source_path: str) -> Dict[str, str]:
+    """Write every pyramid level of an image, returning level -> path.
+
+    Runs in a worker process. Each level is reduced from the previous one,
+    so the original is decoded only once.
+    """
+    target_dir = pyramid_dir(source_path)
+    stem = Path(source_path).stem
+    paths = {}
+
+    with Image.open(source_path) as image:
+        image.load()
+        level_image = image
+        previous_path = None
+        for level, box in PYRAMID_LEVELS.items():
+            size = level_image.size
+            level_image = level_image.copy()
+            level_image.thumbnail(box, Image.Resampling.LANCZOS)
+            if previous_path and level_image.size == size:
+                # Already fits this box (e.g. portrait large and medium)
+                paths[level] = previous_path
+                continue
+
+            extension, data = _encode_smallest(level_image, PYRAMID_JPEG_QUALITY)
+            path = target_dir / f"{stem}_{level}{extension}"
+            write_atomic(path, data)
+            paths[level] = previous_path = str(path)
+
+    return paths
+
+
+async def build_image_pyramid(image_path: str) -> Dict[str, str]:
+    """Build the display derivatives of an image in the process pool.
+
+    The worker is given an absolute path; the returned paths sit next to
+    image_path in the same (relative or absolute) form.
+    """
+    paths = await run_in_process(_build_pyramid, str(Path(image_path).resolve()))
+    target_dir = pyramid_dir(image_path)
+    return {level: str(target_dir / Path(path).name) for level, path in paths.items()}
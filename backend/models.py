@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from enum import Enum
 
 class ImageSize(Enum):
@@ -21,6 +21,10 @@ class TattooImage:
     quality: ImageQuality
     created_at: datetime
     chat_session_id: str
+    # Display derivatives, built once when the image is saved
+    thumb_path: Optional[str] = None
+    medium_path: Optional[str] = None
+    large_path: Optional[str] = None
 
 @dataclass
 class ChatMessage:
@@ -40,4 +44,49 @@ class ChatSession:
     
     def __post_init__(self):
         if self.messages is None:
-            self.messages = []
\ No newline at end of file
+            self.messages = []
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+@dataclass
+class AnalysisJob:
+    id: str
+    image_path: str
+    chat_session_id: str
+    priority: int
+    status: JobStatus
+    created_at: datetime
+    error: Optional[str] = None
+
+@dataclass
+class GenerationJob:
+    id: str
+    chat_session_id: str
+    prompt: str
+    size: ImageSize
+    quality: ImageQuality
+    conversation_history: List[Dict[str, str]]
+    status: JobStatus
+    created_at: datetime
+    image: Optional[TattooImage] = None
+    error: Optional[str] = None
+
+@dataclass
+class TattooAnalysis:
+    id: str
+    chat_session_id: str
+    image_path: str
+    image_hash: str
+    style: Optional[str]
+    key_symbols: List[str]
+    symbolism: str
+    artistic_style: str
+    cultural_significance: str
+    design_elements: str
+    interpretation: str
+    created_at: datetime
@@ -1,17 +1,42 @@
 import asyncio
-from typing import List, Dict
+import time
+from collections import deque
+from typing import Any, List, Dict, Optional, Tuple
 from pathlib import Path
 import base64
 from datetime import datetime
 import uuid
+import httpx
 from openai import AsyncOpenAI
 
 from backend.models import ImageSize, ImageQuality, TattooImage
+from backend.single_flight import SingleFlight, fingerprint
+from backend.image_processing import build_image_pyramid, write_atomic
 
 
 class OpenAIService:
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        enhance_budget_ms: int = 2500,
+        enhance_policy: str = "fallback",
+        speculative_max_per_minute: int = 6,
+        http_client: httpx.AsyncClient = None,
+        base_url: str = None
+    ):
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        self.enhance_budget_ms = enhance_budget_ms
+        self.enhance_policy = enhance_policy
+        self.speculative_max_per_minute = speculative_max_per_minute
+        self._in_flight = SingleFlight()
+        
+        # Background enhancement started while the user is still typing
+        self._speculative_key = None
+        self._speculative_task = None
+        self._speculative_starts = deque()
+        
+        # Outcomes of budgeted prompt enhancement, reported by enhance_stats()
+        self._enhance_counts = dict.fromkeys(("enhancements", "hedged", "over_budget", "failed"), 0)
     
     async def generate_tattoo(
         self, 
@@ -21,10 +46,34 @@ class OpenAIService:
         chat_session_id: str = None,
         conversation_history: List[Dict[str, str]] = None
     ) -> TattooImage:
-        """Generate a tattoo image using DALL-E 3 with conversation context"""
+        """Generate a tattoo image using DALL-E 3 with conversation context.
+
+        Identical concurrent requests (same session, prompt, history, size and
+        quality) share a single API call and return the same image.
+        """
+        key = fingerprint(
+            "generate", chat_session_id, prompt,
+            conversation_history or [], size.value, quality.value
+        )
+        return await self._in_flight.do(
+            key,
+            lambda: self._generate_tattoo(
+                prompt, size, quality, chat_session_id, conversation_history
+            )
+        )
+    
+    async def _generate_tattoo(
+        self,
+        prompt: str,
+        size: ImageSize,
+        quality: ImageQuality,
+        chat_session_id: str,
+        conversation_history: List[Dict[str, str]]
+    ) -> TattooImage:
+        """Run a single DALL-E 3 generation"""
         
         # Build context-aware prompt
-        enhanced_prompt = await self._build_contextual_prompt(prompt, conversation_history)
+        enhanced_prompt = await self._build_contextual_prompt(prompt, conversation_history, chat_session_id)
         
         try:
             # Generate image using OpenAI client
@@ -39,13 +88,16 @@ class OpenAIService:
             
             image_b64 = response.data[0].b64_json
             
-            # Save image
+            # Save the image and build its derivatives. File writes cannot be
+            # interrupted, so a generation cancelled meanwhile lets them finish
+            # and then deletes the files instead of leaving them orphaned.
             image_id = str(uuid.uuid4())
-            image_path = await self._save_image(
-                image_b64, 
-                image_id, 
-                chat_session_id
-            )
+            store = asyncio.ensure_future(self._store_image(image_b64, image_id, chat_session_id))
+            try:
+                image_path, derivatives = await asyncio.shield(store)
+            except asyncio.CancelledError:
+                store.add_done_callback(self._discard_stored_image)
+                raise
             
             return TattooImage(
                 id=image_id,
@@ -54,13 +106,21 @@ class OpenAIService:
                 size=size,
                 quality=quality,
                 created_at=datetime.now(),
-                chat_session_id=chat_session_id
+                chat_session_id=chat_session_id,
+                thumb_path=derivatives.get("thumb"),
+                medium_path=derivatives.get("medium"),
+                large_path=derivatives.get("large")
             )
             
         except Exception as e:
             raise Exception(f"Failed to generate image: {str(e)}")
     
-    async def _build_contextual_prompt(self, current_prompt: str, conversation_history: List[Dict[str, str]] = None) -> str:
+    async def _build_contextual_prompt(
+        self,
+        current_prompt: str,
+        conversation_history: List[Dict[str, str]] = None,
+        chat_session_id: str = None
+    ) -> str:
         """Build a prompt that includes conversation context"""
         
         if not conversation_history:
@@ -69,43 +129,166 @@ class OpenAIService:
         
         # For subsequent requests, use GPT to understand context and refine the prompt
         try:
-            system_prompt = """You are a tattoo design assistant. Based on the conversation history, 
-            create a detailed prompt for DALL-E 3 that incorporates all previous design requests while 
-            emphasizing the latest request. The design should evolve and build upon previous iterations, 
-            maintaining consistency while adding new elements."""
-            
-            # Build conversation context
-            context = "Previous tattoo design requests in this session:\n"
-            for i, msg in enumerate(conversation_history):
-                context += f"{i+1}. {msg['content']}\n"
-            
-            context += f"\nCurrent request: {current_prompt}\n\n"
-            context += """Create a single, comprehensive prompt for DALL-E 3 that:
-            1. Incorporates all design elements from previous requests
-            2. Emphasizes the new elements from the current request
-            3. Maintains stylistic consistency
-            4. Is suitable for a professional tattoo design"""
-            
-            # Use GPT to create an optimized prompt
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": context}
-                ],
-                max_tokens=300,
-                temperature=0.7
-            )
-            
-            enhanced_prompt = response.choices[0].message.content
-            
-            # Add tattoo-specific requirements
-            return f"{enhanced_prompt}\n\nProfessional tattoo design, black ink style, high contrast, clean lines suitable for skin application."
-            
+            speculative = self._take_speculation(current_prompt, chat_session_id, conversation_history)
+            if speculative is not None:
+                enhanced_prompt = await speculative
+            else:
+                enhanced_prompt = await self._enhance_within_budget(current_prompt, conversation_history)
         except Exception as e:
             # Fallback to simple context building if GPT fails
             print(f"GPT context building failed: {e}")
+            enhanced_prompt = None
+        
+        if enhanced_prompt is None:
             return self._build_simple_contextual_prompt(current_prompt, conversation_history)
+        
+        # Add tattoo-specific requirements
+        return f"{enhanced_prompt}\n\nProfessional tattoo design, black ink style, high contrast, clean lines suitable for skin application."
+    
+    def speculate_prompt(
+        self,
+        prompt: str,
+        chat_session_id: str,
+        conversation_history: List[Dict[str, str]] = None
+    ):
+        """Start enhancing a prompt in the background before Generate is pressed.
+
+        Any earlier speculation for different input is cancelled. Speculation
+        only applies to follow-up prompts and is rate limited per minute. It is
+        only claimed by a generation in the same session.
+        """
+        if not conversation_history:
+            return
+        
+        key = fingerprint(chat_session_id, prompt, conversation_history)
+        if key == self._speculative_key:
+            return
+        
+        now = time.monotonic()
+        while self._speculative_starts and now - self._speculative_starts[0] > 60:
+            self._speculative_starts.popleft()
+        if len(self._speculative_starts) >= self.speculative_max_per_minute:
+            return
+        
+        self.cancel_speculation()
+        self._speculative_starts.append(now)
+        self._speculative_key = key
+        self._speculative_task = asyncio.ensure_future(
+            self._enhance_within_budget(prompt, conversation_history)
+        )
+        # Unclaimed speculation may fail silently; mark its error as retrieved
+        self._speculative_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    
+    def cancel_speculation(self):
+        """Cancel any pending speculative enhancement"""
+        if self._speculative_task and not self._speculative_task.done():
+            self._speculative_task.cancel()
+        self._speculative_key = None
+        self._speculative_task = None
+    
+    def _take_speculation(
+        self,
+        prompt: str,
+        chat_session_id: str,
+        conversation_history: List[Dict[str, str]]
+    ) -> Optional[asyncio.Future]:
+        """Claim the speculative enhancement if it matches this request.
+
+        A speculation that already gave up (budget exceeded or failed) is
+        discarded so the request gets a fresh attempt.
+        """
+        task = self._speculative_task
+        if task is None or fingerprint(chat_session_id, prompt, conversation_history) != self._speculative_key:
+            return None
+        
+        self._speculative_key = None
+        self._speculative_task = None
+        if task.done() and (task.cancelled() or task.exception() is not None or task.result() is None):
+            return None
+        return task
+    
+    async def _enhance_within_budget(self, current_prompt: str, conversation_history: List[Dict[str, str]]) -> Optional[str]:
+        """Run GPT prompt enhancement under the latency budget.
+
+        Returns None when the budget runs out, so the caller can use the local
+        prompt instead. With the "hedge" policy a second request is started when
+        the first budget expires, capping the stage at two budgets in total.
+        """
+        self._enhance_counts["enhancements"] += 1
+        loop = asyncio.get_event_loop()
+        budget = self.enhance_budget_ms / 1000
+        deadline = loop.time() + budget
+        hedged = False
+        error = None
+        
+        pending = {asyncio.ensure_future(self._enhance_prompt(current_prompt, conversation_history))}
+        try:
+            while pending:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    if self.enhance_policy != "hedge" or hedged:
+                        self._enhance_counts["over_budget"] += 1
+                        return None
+                    
+                    hedged = True
+                    self._enhance_counts["hedged"] += 1
+                    pending.add(asyncio.ensure_future(self._enhance_prompt(current_prompt, conversation_history)))
+                    deadline = loop.time() + budget
+                    continue
+                
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            
+            self._enhance_counts["failed"] += 1
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def enhance_stats(self) -> Dict[str, Any]:
+        """Return prompt enhancement outcome counts for diagnostics"""
+        return dict(
+            self._enhance_counts,
+            budget_ms=self.enhance_budget_ms,
+            policy=self.enhance_policy
+        )
+    
+    async def _enhance_prompt(self, current_prompt: str, conversation_history: List[Dict[str, str]]) -> str:
+        """Ask GPT to merge the conversation history into a single DALL-E prompt"""
+        system_prompt = """You are a tattoo design assistant. Based on the conversation history, 
+        create a detailed prompt for DALL-E 3 that incorporates all previous design requests while 
+        emphasizing the latest request. The design should evolve and build upon previous iterations, 
+        maintaining consistency while adding new elements."""
+        
+        # Build conversation context
+        context = "Previous tattoo design requests in this session:\n"
+        for i, msg in enumerate(conversation_history):
+            context += f"{i+1}. {msg['content']}\n"
+        
+        context += f"\nCurrent request: {current_prompt}\n\n"
+        context += """Create a single, comprehensive prompt for DALL-E 3 that:
+        1. Incorporates all design elements from previous requests
+        2. Emphasizes the new elements from the current request
+        3. Maintains stylistic consistency
+        4. Is suitable for a professional tattoo design"""
+        
+        # Use GPT to create an optimized prompt
+        response = await self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": context}
+            ],
+            max_tokens=300,
+            temperature=0.7
+        )
+        
+        return response.choices[0].message.content
     
     def _build_simple_contextual_prompt(self, current_prompt: str, conversation_history: List[Dict[str, str]]) -> str:
         """Fallback simple context builder"""
@@ -124,6 +307,36 @@ class OpenAIService:
         
         return "\n".join(context_parts)
     
+    async def _store_image(
+        self,
+        image_b64: str,
+        image_id: str,
+        chat_session_id: str
+    ) -> Tuple[str, Dict[str, str]]:
+        """Save an image and build its display derivatives"""
+        image_path = await self._save_image(image_b64, image_id, chat_session_id)
+        
+        # Build display derivatives once, off the UI thread
+        try:
+            derivatives = await build_image_pyramid(image_path)
+        except Exception as e:
+            print(f"Error building image derivatives: {e}")
+            derivatives = {}
+        
+        return image_path, derivatives
+    
+    @staticmethod
+    def _discard_stored_image(store: asyncio.Future):
+        """Delete the files of an image whose generation was cancelled"""
+        if store.cancelled() or store.exception() is not None:
+            return
+        image_path, derivatives = store.result()
+        for path in {image_path, *derivatives.values()}:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError as e:
+                print(f"Error removing {path}: {e}")
+    
     async def _save_image(
         self, 
         image_b64: str, 
@@ -139,16 +352,14 @@ class OpenAIService:
         else:
             session_path = base_path / "unsorted"
         
-        session_path.mkdir(parents=True, exist_ok=True)
-        
-        # Save image
+        # Save image; the final name only appears once the file is complete
         image_path = session_path / f"{image_id}.png"
         image_data = base64.b64decode(image_b64)
         
         # Use asyncio for file operations
         await asyncio.get_event_loop().run_in_executor(
             None, 
-            lambda: image_path.write_bytes(image_data)
+            write_atomic, image_path, image_data
         )
         
-        return str(image_path)
\ No newline at end of file
+        return str(image_path)
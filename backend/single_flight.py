@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+
+def fingerprint(*parts: Any) -> str:
+    """Build a stable hash key from JSON-serializable request parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Hash a file's content (blocking - run in an executor)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Call:
+    """A running call and the number of callers awaiting it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent identical requests.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task and get the same result or exception.
+    The task is only cancelled once every waiting caller has been cancelled.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self, key: str) -> bool:
+        """Check whether a call for this key is currently running"""
+        return key in self._calls
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() once per key and share its outcome"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call):
+        """Drop a finished call so the next request starts fresh"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,47 @@
+"""
+Shared process pool for CPU-heavy image work.
+
+Pillow decoding, resizing and encoding hold the GIL for long stretches, so
+they run in worker processes to keep both the UI and the event loop
+responsive. The pool is created on first use and shut down on exit.
+
+Workers are spawned rather than forked, since forking a process that runs Qt
+and other threads is unsafe. A worker keeps the working directory it started
+with, so callers pass absolute paths.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+_process_pool = None
+
+
+def get_process_pool(max_workers: int = 2) -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+async def run_in_process(func: Callable, *args) -> Any:
+    """Run a picklable function in the shared process pool"""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+def shutdown_process_pool():
+    """Stop the shared process pool if it was started.
+
+    Queued work is dropped, but the workers are joined: a pool abandoned
+    without waiting leaves its queues' semaphores behind at interpreter exit.
+    """
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,125 @@
+"""
+Benchmark replaying a session transcript into ChatArea.
+
+Replays a synthetic session (prompts, each followed by its generated image)
+into a fresh ChatArea, once appending row by row and once inside
+begin_batch()/end_batch() as MainWindow does, and reports how long each
+takes until the transcript is laid out and painted at the bottom.
+
+Run from the repository root:
+
+    python -m benchmarks.chat_replay --messages 300
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QColor, QImage
+from PyQt6.QtWidgets import QApplication
+
+from frontend.widgets.chat_area import ChatArea
+
+
+def make_images(directory: Path, count: int):
+    """Write small distinct PNGs standing in for generated images"""
+    paths = []
+    for i in range(count):
+        image = QImage(512, 512, QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 37 % 360, 160, 200))
+        path = directory / f"image_{i}.png"
+        image.save(str(path))
+        paths.append(str(path))
+    return paths
+
+
+def make_transcript(messages: int, images):
+    """Alternate plain prompts and generated images, like a real session"""
+    rows = []
+    for i in range(messages):
+        prompt = f"Tattoo idea {i}: a fox curled around a crescent moon, fine line, dotwork shading"
+        if i % 2:
+            rows.append((prompt, images[i % len(images)]))
+        else:
+            rows.append((prompt, None))
+    return rows
+
+
+def replay(chat_area: ChatArea, rows, batched: bool):
+    """Replay rows the way MainWindow loads a session"""
+    if batched:
+        chat_area.begin_batch()
+    try:
+        for prompt, image_path in rows:
+            chat_area.add_user_message(prompt)
+            if image_path:
+                chat_area.add_image_message(prompt, image_path)
+    finally:
+        if batched:
+            chat_area.end_batch()
+
+
+def settle(app: QApplication, chat_area: ChatArea):
+    """Run the event loop until the pending scroll has happened and the view is painted"""
+    while chat_area._scroll_timer.isActive():
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+    chat_area.list_view.viewport().repaint()
+
+
+def measure(app: QApplication, rows, batched: bool):
+    """Time one replay into a fresh chat area; returns (replay ms, total ms, insertions)"""
+    chat_area = ChatArea()
+    chat_area.resize(1000, 900)
+    chat_area.show()
+    app.processEvents()
+
+    insertions = []
+    chat_area.model.rowsInserted.connect(lambda *_: insertions.append(1))
+
+    start = time.perf_counter()
+    replay(chat_area, rows, batched)
+    replayed = time.perf_counter()
+    settle(app, chat_area)
+    # The scroll is deferred by the coalescing timer; count only the work
+    waited = chat_area._scroll_timer.interval() / 1000
+    total = time.perf_counter() - start - waited
+
+    chat_area.close()
+    chat_area.deleteLater()
+    app.processEvents()
+    return (replayed - start) * 1000, total * 1000, len(insertions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=300, help="messages in the replayed session")
+    parser.add_argument("--runs", type=int, default=5, help="runs per mode; the median is reported")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        rows = make_transcript(args.messages, make_images(Path(directory), 20))
+        row_count = sum(2 if image_path else 1 for _, image_path in rows)
+        print(f"Replaying {args.messages} messages ({row_count} rows), median of {args.runs} runs")
+
+        for label, batched in (("row by row", False), ("batched", True)):
+            results = [measure(app, rows, batched) for _ in range(args.runs)]
+            replay_ms = statistics.median(r[0] for r in results)
+            total_ms = statistics.median(r[1] for r in results)
+            print(
+                f"  {label:<11} replay {replay_ms:8.1f} ms   "
+                f"laid out and painted {total_ms:8.1f} ms   "
+                f"insertions {results[0][2]}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,17 @@ class Config:
         # AI Configuration
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY", "")
+        self.openai_base_url = os.getenv("OPENAI_BASE_URL") or None
+        self.anthropic_base_url = os.getenv("ANTHROPIC_BASE_URL") or None
+        
+        # Offline Mode
+        # Serves both APIs from the local stand-in in backend/fake_provider.py
+        self.offline_mode = os.getenv("INKFORGE_OFFLINE", "0") == "1"
+        self.fake_latency_ms = int(os.getenv("FAKE_LATENCY_MS", "0"))
+        self.fake_chunk_delay_ms = int(os.getenv("FAKE_CHUNK_DELAY_MS", "0"))
+        self.fake_error_rate = float(os.getenv("FAKE_ERROR_RATE", "0"))
+        self.fake_rate_limit_rate = float(os.getenv("FAKE_RATE_LIMIT_RATE", "0"))
+        self.fake_seed = int(os.getenv("FAKE_SEED", "0"))
         
         # Application Settings
         self.app_name = "AI Tattoo Generator"
@@ -24,17 +35,71 @@ class Config:
         self.window_height = 900
         self.sidebar_width = 280
         
+        # Rendered views of recently left sessions kept for instant switching
+        self.session_cache_size = int(os.getenv("SESSION_CACHE_SIZE", "8"))
+        self.session_cache_mb = int(os.getenv("SESSION_CACHE_MB", "16"))
+        
+        # Sessions hovered or focused in the sidebar for the dwell time are
+        # fetched ahead of the click, decoding at most N of their images
+        self.prefetch_dwell_ms = int(os.getenv("PREFETCH_DWELL_MS", "250"))
+        self.prefetch_max_images = int(os.getenv("PREFETCH_MAX_IMAGES", "12"))
+        
         # Image Generation Defaults
         self.default_image_size = "1024x1024"
         self.default_image_quality = "standard"
         
+        # Prompt Enhancement
+        # Latency budget for the GPT enhancement stage; when it expires the
+        # "fallback" policy uses the simple local prompt, while "hedge" fires a
+        # second request and takes whichever answers first within another budget
+        self.enhance_budget_ms = int(os.getenv("ENHANCE_BUDGET_MS", "2500"))
+        self.enhance_policy = os.getenv("ENHANCE_POLICY", "fallback")
+        
+        # Speculative enhancement starts once the prompt input has been idle
+        # for the debounce interval, at most N times per minute
+        self.speculative_enhance = os.getenv("SPECULATIVE_ENHANCE", "1") == "1"
+        self.speculative_debounce_ms = int(os.getenv("SPECULATIVE_DEBOUNCE_MS", "700"))
+        self.speculative_max_per_minute = int(os.getenv("SPECULATIVE_MAX_PER_MINUTE", "6"))
+        
+        # HTTP Connection Pool
+        self.http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+        self.http_max_keepalive = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "90"))
+        self.http2 = os.getenv("HTTP2", "0") == "1"
+        self.http_prewarm = os.getenv("HTTP_PREWARM", "1") == "1"
+        
+        # Record/Replay of API traffic ("off", "record" or "replay")
+        # Replay latency is "instant" or "original" (recorded timings)
+        self.cassette_mode = os.getenv("CASSETTE_MODE", "off")
+        self.cassette_path = Path(os.getenv("CASSETTE_PATH", str(self.data_dir / "cassettes" / "default")))
+        self.cassette_latency = os.getenv("CASSETTE_LATENCY", "instant")
+        if self.cassette_mode == "replay":
+            # Replayed traffic needs no real keys or warm-up
+            self.openai_api_key = self.openai_api_key or "replay"
+            self.anthropic_api_key = self.anthropic_api_key or "replay"
+            self.http_prewarm = False
+        
+        # Number of tattoo generations run concurrently across all sessions
+        self.generation_workers = int(os.getenv("GENERATION_WORKERS", "2"))
+        
+        # Number of batch analysis jobs processed concurrently
+        self.analysis_workers = int(os.getenv("ANALYSIS_WORKERS", "2"))
+        
         # MCP Configuration
         self.enable_mcp = self.anthropic_api_key != ""
         self.mcp_port = int(os.getenv("MCP_PORT", "5000"))
         
+    def use_fake_provider(self, server):
+        """Point both API clients at a local stand-in server"""
+        self.openai_api_key = "offline"
+        self.anthropic_api_key = "offline"
+        self.openai_base_url = server.openai_base_url
+        self.anthropic_base_url = server.anthropic_base_url
+        self.enable_mcp = True
+    
     def validate(self):
         """Validate configuration"""
-        if not self.openai_api_key:
+        if not self.openai_api_key and not self.offline_mode:
             raise ValueError("OpenAI API key is required")
         
         # Create directories if they don't exist
@@ -0,0 +1,239 @@
+"""
+Pixmap loading for chat and gallery images.
+
+Views load the pre-sized derivative from the image pyramid when one exists
+and only fall back to scaling the full-size original otherwise.
+
+ImageLoader decodes off the GUI thread: each request is decoded by a
+QThreadPool worker with QImageReader.setScaledSize, and the QImage is handed
+back through a queued signal. Requests belong to an owner widget and are
+cancelled together when the owner is cleared or destroyed. The pool owns
+and deletes each task once it has run; the loader only keeps the task's
+cancel flag, so cancelling never frees a task a worker is still running.
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Set
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+
+def load_pixmap(derived_path: str, original_path: str, max_width: int, max_height: int) -> QPixmap:
+    """Load an image to fit max_width x max_height, preferring its derivative"""
+    if derived_path and Path(derived_path).exists():
+        pixmap = QPixmap(derived_path)
+        if pixmap.width() <= max_width and pixmap.height() <= max_height:
+            return pixmap
+    else:
+        pixmap = QPixmap(original_path)
+
+    if pixmap.isNull():
+        return pixmap
+    return pixmap.scaled(
+        max_width, max_height,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+
+
+def _pick_path(derived_path: str, original_path: str) -> str:
+    """Prefer the derivative when it has been built"""
+    if derived_path and Path(derived_path).exists():
+        return derived_path
+    return original_path
+
+
+def _fit(size: QSize, max_width: int, max_height: int) -> QSize:
+    """Scale a size down to fit the box, keeping its aspect ratio"""
+    if size.width() > max_width or size.height() > max_height:
+        return size.scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio)
+    return size
+
+
+def display_size(derived_path: str, original_path: str, max_width: int, max_height: int) -> QSize:
+    """Size an image will be shown at, read from its header without decoding"""
+    size = QImageReader(_pick_path(derived_path, original_path)).size()
+    if not size.isValid():
+        return QSize()
+    return _fit(size, max_width, max_height)
+
+
+def decode_image(derived_path: str, original_path: str, max_width: int, max_height: int) -> QImage:
+    """Decode an image already scaled to fit the box (safe off the GUI thread)"""
+    reader = QImageReader(_pick_path(derived_path, original_path))
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(_fit(size, max_width, max_height))
+    return reader.read()
+
+
+class PixmapCache:
+    """LRU of decoded pixmaps bounded by their memory footprint"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._pixmaps: "OrderedDict[str, QPixmap]" = OrderedDict()
+
+    @staticmethod
+    def cost(pixmap: QPixmap) -> int:
+        """Approximate memory used by a pixmap"""
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, key: str):
+        """Return a cached pixmap and mark it recently used"""
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key: str, pixmap: QPixmap):
+        """Cache a pixmap, evicting the least recently used beyond the budget"""
+        old = self._pixmaps.pop(key, None)
+        if old is not None:
+            self.bytes -= self.cost(old)
+        self._pixmaps[key] = pixmap
+        self.bytes += self.cost(pixmap)
+
+        while self.bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self.bytes -= self.cost(evicted)
+
+    def __len__(self) -> int:
+        return len(self._pixmaps)
+
+
+# Priority of speculative decodes, queued behind anything a view is waiting for
+PREFETCH_PRIORITY = -1
+
+
+class _DecodeSignals(QObject):
+    """Carries decoded images from worker threads back to the GUI thread"""
+    decoded = pyqtSignal(int, QImage)
+
+
+class _DecodeTask(QRunnable):
+    """Decode one image in the thread pool unless cancelled first"""
+
+    def __init__(self, request_id: int, args: tuple, signals: _DecodeSignals, cancelled: threading.Event):
+        super().__init__()
+        self.request_id = request_id
+        self.args = args
+        self.signals = signals
+        self.cancelled = cancelled
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        image = decode_image(*self.args)
+        if not self.cancelled.is_set():
+            self.signals.decoded.emit(self.request_id, image)
+
+
+class ImageLoader(QObject):
+    """Thread pool image decoder with per-owner cancellation"""
+
+    def __init__(self, max_threads: int = 2):
+        super().__init__()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+
+        self._signals = _DecodeSignals()
+        self._signals.decoded.connect(self._on_decoded)
+
+        self._ids = itertools.count(1)
+        self._requests: Dict[int, tuple] = {}
+        self._owners: Dict[int, Set[int]] = {}
+        self._watched: Set[int] = set()
+
+    def load(
+        self,
+        owner: QObject,
+        derived_path: str,
+        original_path: str,
+        max_width: int,
+        max_height: int,
+        callback: Callable[[QImage], None],
+        priority: int = 0
+    ) -> int:
+        """Decode an image for owner and pass the QImage to callback on the GUI thread.
+
+        Queued requests with a higher priority are decoded first.
+        """
+        request_id = next(self._ids)
+        owner_key = id(owner)
+        cancelled = threading.Event()
+        task = _DecodeTask(
+            request_id, (derived_path, original_path, max_width, max_height), self._signals, cancelled
+        )
+
+        self._requests[request_id] = (cancelled, owner_key, callback)
+        self._owners.setdefault(owner_key, set()).add(request_id)
+        if owner_key not in self._watched:
+            self._watched.add(owner_key)
+            owner.destroyed.connect(lambda _=None, key=owner_key: self._forget_owner(key))
+
+        self.pool.start(task, priority)
+        return request_id
+
+    def cancel(self, owner: QObject):
+        """Cancel every pending decode requested by owner"""
+        for request_id in list(self._owners.get(id(owner), ())):
+            self.cancel_request(request_id)
+
+    def cancel_request(self, request_id: int):
+        """Cancel one pending decode"""
+        entry = self._requests.pop(request_id, None)
+        if entry is None:
+            return
+
+        # A queued task still gets a thread, but returns at once
+        cancelled, owner_key, _ = entry
+        cancelled.set()
+        self._discard(owner_key, request_id)
+
+    def pending(self, owner: QObject = None) -> int:
+        """Number of decodes not yet delivered, overall or for one owner"""
+        if owner is None:
+            return len(self._requests)
+        return len(self._owners.get(id(owner), ()))
+
+    def _on_decoded(self, request_id: int, image: QImage):
+        """Deliver a decoded image unless its request was cancelled"""
+        entry = self._requests.pop(request_id, None)
+        if entry is None:
+            return
+
+        _, owner_key, callback = entry
+        self._discard(owner_key, request_id)
+        callback(image)
+
+    def _discard(self, owner_key: int, request_id: int):
+        """Remove a finished or cancelled request from its owner"""
+        requests = self._owners.get(owner_key)
+        if requests is not None:
+            requests.discard(request_id)
+            if not requests:
+                del self._owners[owner_key]
+
+    def _forget_owner(self, owner_key: int):
+        """Cancel requests of an owner that has been destroyed"""
+        self._watched.discard(owner_key)
+        for request_id in list(self._owners.get(owner_key, ())):
+            self.cancel_request(request_id)
+
+
+_image_loader = None
+
+
+def get_image_loader() -> ImageLoader:
+    """Return the shared image loader, creating it on first use"""
+    global _image_loader
+    if _image_loader is None:
+        _image_loader = ImageLoader()
+    return _image_loader
@@ -2,39 +2,116 @@ from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QSplitter
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
+from collections import OrderedDict
+import asyncio
+import uuid
 
 from frontend.styles import CLAUDE_STYLE
 from frontend.widgets.chat_sidebar import ChatSidebar
 from frontend.widgets.chat_area import ChatArea
 from frontend.widgets.input_widget import InputWidget
 from frontend.widgets.image_gallery import ImageGallery
+from frontend.session_cache import SessionView, SessionViewCache
 from backend.chat_service import ChatService
 from backend.openai_service import OpenAIService
+from backend.http_pool import HttpPool
+from backend.image_processing import build_image_pyramid
+from backend.generation_queue import GenerationQueue
+from backend.models import GenerationJob, JobStatus
 from mcp_impl.conversation_mcp import TattooAnalysisMCP, MCPClient
+from mcp_impl.analysis_queue import INTERACTIVE_PRIORITY
+from config import Config
+
+# Prefetched timelines kept until their session is opened
+PREFETCH_KEEP = 4
+# Latest chat images decoded by a prefetch; the transcript opens at the bottom
+PREFETCH_CHAT_IMAGES = 2
+# Placeholder text of an analysis until it finishes
+ANALYSIS_PLACEHOLDER = "Analyzing tattoo..."
 
 class MainWindow(QMainWindow):
-    def __init__(self, openai_api_key: str, anthropic_api_key: str = None):
+    def __init__(
+        self,
+        openai_api_key: str,
+        anthropic_api_key: str = None,
+        config: Config = None,
+        http_pool: HttpPool = None
+    ):
         super().__init__()
+        self.config = config or Config()
+        self.http_pool = http_pool or HttpPool.from_config(self.config)
         
         # Initialize services
         self.chat_service = ChatService()
-        self.openai_service = OpenAIService(openai_api_key)
+        self.openai_service = OpenAIService(
+            openai_api_key,
+            enhance_budget_ms=self.config.enhance_budget_ms,
+            enhance_policy=self.config.enhance_policy,
+            speculative_max_per_minute=self.config.speculative_max_per_minute,
+            http_client=self.http_pool.async_client,
+            base_url=self.config.openai_base_url
+        )
+        
+        # Generations run concurrently, each tracked as a job
+        self.generation_queue = GenerationQueue(
+            self.openai_service, self.chat_service, self.config.generation_workers
+        )
+        self.generation_queue.on_job_updated = self.on_generation_job_updated
+        # (job id, error) of jobs that failed while their session was not open,
+        # reported when it is
+        self._failed_jobs = {}
+        # Analyses streaming into the chat, by job id, with their session and task
+        self._analyses = {}
+        # Job id of the running analysis for each (session, image, force)
+        self._analysis_requests = {}
+        # (session, prompt, size, quality) of generations being submitted
+        self._submitting = set()
+        # Background derivative builds, cancelled on shutdown, and the ids of
+        # images being built or whose build failed, which are not retried
+        self._backfills = set()
+        self._backfilling = set()
+        self._backfill_failed = set()
         
         # Initialize MCP if Anthropic API key is provided
         self.mcp_server = None
         self.mcp_client = None
         if anthropic_api_key:
-            self.mcp_server = TattooAnalysisMCP(self.chat_service, anthropic_api_key)
+            self.mcp_server = TattooAnalysisMCP(
+                self.chat_service,
+                anthropic_api_key,
+                http_client=self.http_pool.async_client,
+                base_url=self.config.anthropic_base_url,
+                analysis_workers=self.config.analysis_workers
+            )
             self.mcp_client = MCPClient(self.mcp_server)
+            self.mcp_server.analysis_queue.on_progress = self.on_batch_progress
+            self.mcp_server.analysis_queue.on_job_finished = self.on_batch_job_finished
         
-        # Current session
+        # Current session, and the task loading it from the database
         self.current_session = None
+        self._load_task = None
+        
+        # Views of recently left sessions, dropped when their data changes
+        self.view_cache = SessionViewCache(
+            self.config.session_cache_size,
+            self.config.session_cache_mb * 1024 * 1024
+        )
+        self.chat_service.subscribe(self.on_session_changed)
+        
+        # Timelines fetched ahead of a likely click, and the prefetch under way
+        self._prefetched = OrderedDict()
+        self._prefetch_session = None
+        self._prefetch_task = None
         
         # Setup UI
         self.init_ui()
         self.setStyleSheet(CLAUDE_STYLE)
         
+        # Resume batch analysis jobs left over from a previous run
+        if self.mcp_server:
+            QTimer.singleShot(0, lambda: asyncio.create_task(self.mcp_server.analysis_queue.start()))
+        
     def init_ui(self):
         """Initialize the user interface"""
         self.setWindowTitle("AI Tattoo Generator")
@@ -50,11 +127,13 @@ class MainWindow(QMainWindow):
         main_layout.setSpacing(0)
         
         # Create sidebar
-        self.sidebar = ChatSidebar(self.chat_service)
+        self.sidebar = ChatSidebar(self.chat_service, self.config.prefetch_dwell_ms)
         self.sidebar.setObjectName("sidebar")
         self.sidebar.session_selected.connect(self.on_session_selected)
         self.sidebar.new_session_created.connect(self.on_new_session)
         self.sidebar.session_deleted.connect(self.on_session_deleted)
+        self.sidebar.prefetch_requested.connect(self.on_prefetch_requested)
+        self.sidebar.prefetch_cancelled.connect(self.on_prefetch_cancelled)
         
         # Add visual separator
         sidebar_container = QWidget()
@@ -80,16 +159,20 @@ class MainWindow(QMainWindow):
         chat_layout.setSpacing(0)
         
         self.chat_area = ChatArea()
+        self.chat_area.job_cancel_requested.connect(self.on_job_cancel_requested)
         chat_layout.addWidget(self.chat_area)
         
         # Input widget
-        self.input_widget = InputWidget()
+        self.input_widget = InputWidget(self.config.speculative_debounce_ms)
         self.input_widget.generate_clicked.connect(self.on_generate_tattoo)
+        if self.config.speculative_enhance:
+            self.input_widget.prompt_idle.connect(self.on_prompt_idle)
         chat_layout.addWidget(self.input_widget)
         
         # Gallery
         self.gallery = ImageGallery()
         self.gallery.image_analyze_requested.connect(self.on_analyze_image)
+        self.gallery.analyze_all_requested.connect(self.on_analyze_all)
         
         # Add to splitter
         splitter.addWidget(chat_container)
@@ -110,110 +193,339 @@ class MainWindow(QMainWindow):
     
     async def on_session_selected(self, session_id: str):
         """Handle session selection"""
+        if session_id != self.current_session:
+            self._stash_current_view()
+        
+        # Only the latest selection may touch the views
+        self._cancel_session_load()
+        if session_id != self._prefetch_session:
+            self.on_prefetch_cancelled()
         self.current_session = session_id
+        
+        # A recently left session is swapped back in without touching the database
+        view = self.view_cache.take(session_id)
+        if view is not None:
+            self.chat_area.restore_state(view.chat)
+            self.gallery.restore_state(view.gallery)
+            self._show_session_jobs(session_id)
+            return
+        
         self.chat_area.clear()
+        self.gallery.clear()
         
-        # Load messages
-        messages = await self.chat_service.get_session_messages(session_id)
-        images = await self.chat_service.get_session_images(session_id)
+        task = asyncio.ensure_future(self._load_session(session_id))
+        self._load_task = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Superseded by a newer selection
+            if not task.cancelled():
+                raise
+    
+    async def _load_session(self, session_id: str):
+        """Fill the views with a session's messages and images"""
+        timeline = self._prefetched.pop(session_id, None)
+        if timeline is None and session_id == self._prefetch_session:
+            # Adopt the prefetch already under way instead of querying again
+            task = self._prefetch_task
+            self._prefetch_task = None
+            self._prefetch_session = None
+            timeline = await task
+            self._prefetched.pop(session_id, None)
+        if timeline is None:
+            timeline = await self._fetch_timeline(session_id)
+        messages, images = timeline
         
         # Create a map of image IDs to image objects
         image_map = {img.id: img for img in images}
         
-        for message in messages:
-            if message.image_id and message.image_id in image_map:
-                image = image_map[message.image_id]
-                if message.content.startswith("Generated tattoo: "):
-                    original_prompt = message.content.replace("Generated tattoo: ", "")
-                else:
-                    original_prompt = message.content
-                
-                self.chat_area.add_user_message(original_prompt)
-                self.chat_area.add_image_message(original_prompt, image.image_path)
-            elif not message.content.startswith("Generated tattoo:"):
-                self.chat_area.add_user_message(message.content)
+        # Replay as one batch: a single insertion, layout pass and scroll
+        self.chat_area.begin_batch()
+        try:
+            for message in messages:
+                if message.image_id and message.image_id in image_map:
+                    image = image_map[message.image_id]
+                    if message.content.startswith("Generated tattoo: "):
+                        original_prompt = message.content.replace("Generated tattoo: ", "")
+                    else:
+                        original_prompt = message.content
+                    
+                    self.chat_area.add_user_message(original_prompt)
+                    self.chat_area.add_image_message(original_prompt, image.image_path, image.medium_path)
+                elif not message.content.startswith("Generated tattoo:"):
+                    self.chat_area.add_user_message(message.content)
+        finally:
+            self.chat_area.end_batch()
         
         # Load gallery images
-        self.gallery.clear()
         for image in images:
-            self.gallery.add_image(image.image_path, image.prompt)
+            self.gallery.add_image(image.image_path, image.prompt, image.thumb_path, image.large_path)
+        
+        self._show_session_jobs(session_id)
+        
+        # Images saved before derivatives existed get them in the background
+        missing = [
+            image for image in images
+            if not image.thumb_path and image.id not in self._backfilling | self._backfill_failed
+        ]
+        if missing:
+            self._backfilling.update(image.id for image in missing)
+            task = asyncio.create_task(self._backfill_derivatives(missing))
+            self._backfills.add(task)
+            task.add_done_callback(self._backfills.discard)
+    
+    async def _fetch_timeline(self, session_id: str):
+        """Load a session's messages and images"""
+        messages = await self.chat_service.get_session_messages(session_id)
+        images = await self.chat_service.get_session_images(session_id)
+        return messages, images
+    
+    def on_prefetch_requested(self, session_id: str):
+        """Start loading a session the user is likely to open next"""
+        # Views at hand need nothing, and an interactive load takes precedence
+        if (session_id == self.current_session or session_id in self.view_cache
+                or session_id in self._prefetched or session_id == self._prefetch_session
+                or self._session_loading()):
+            return
+        
+        self.on_prefetch_cancelled()
+        self._prefetch_session = session_id
+        self._prefetch_task = asyncio.ensure_future(self._prefetch(session_id))
+    
+    def on_prefetch_cancelled(self):
+        """Abandon a prefetch the user has moved away from"""
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        self._prefetch_task = None
+        self._prefetch_session = None
+        self.chat_area.cancel_prefetch()
+        self.gallery.cancel_prefetch()
+    
+    async def _prefetch(self, session_id: str):
+        """Fetch a session's timeline and decode the images its first screen shows"""
+        timeline = await self._fetch_timeline(session_id)
+        self._prefetched[session_id] = timeline
+        while len(self._prefetched) > PREFETCH_KEEP:
+            self._prefetched.popitem(last=False)
+        
+        _, images = timeline
+        budget = self.config.prefetch_max_images
+        chat_images = images[-min(PREFETCH_CHAT_IMAGES, budget):] if budget > 0 else []
+        gallery_images = images[:max(0, min(self.gallery.visible_capacity(), budget - len(chat_images)))]
+        self.chat_area.prefetch_images([(image.medium_path, image.image_path) for image in chat_images])
+        self.gallery.prefetch_thumbnails([(image.thumb_path, image.image_path) for image in gallery_images])
+        return timeline
     
     async def on_new_session(self, session):
         """Handle new session creation"""
+        self._stash_current_view()
+        self._cancel_session_load()
         self.current_session = session.id
         self.chat_area.clear()
         self.gallery.clear()
     
     async def on_session_deleted(self, session_id: str):
         """Handle session deletion"""
+        self.view_cache.invalidate(session_id)
+        
         # If the deleted session was the current one, clear the UI
         if self.current_session == session_id:
+            self._cancel_session_load()
             self.current_session = None
             self.chat_area.clear()
             self.gallery.clear()
     
+    def on_session_changed(self, event: str, session_id: str):
+        """Drop the cached view of a session whose stored data changed.
+
+        The open session is not cached; its views are updated as it changes.
+        """
+        if event in ("message_added", "image_saved", "session_deleted"):
+            self.view_cache.invalidate(session_id)
+            self._prefetched.pop(session_id, None)
+            if session_id == self._prefetch_session:
+                self.on_prefetch_cancelled()
+    
+    def _session_loading(self) -> bool:
+        """Whether the views are still being filled for the open session"""
+        return self._load_task is not None and not self._load_task.done()
+    
+    def _cancel_session_load(self):
+        """Abandon an in-flight session load"""
+        if self._session_loading():
+            self._load_task.cancel()
+        self._load_task = None
+    
+    def _stash_current_view(self):
+        """Detach the open session's views into the cache before leaving it"""
+        # A partially loaded session is not worth keeping
+        if self.current_session and not self._session_loading():
+            self.view_cache.put(
+                self.current_session,
+                SessionView(self.chat_area.save_state(), self.gallery.save_state())
+            )
+    
     async def on_generate_tattoo(self, prompt: str, size, quality):
-        """Handle tattoo generation with conversation context"""
+        """Queue a tattoo generation with conversation context"""
         if not self.current_session:
             # Create a new session if none exists
+            # The sidebar shows it as soon as ChatService reports it
             session = await self.chat_service.create_session(f"Session {prompt[:20]}...")
             self.current_session = session.id
-            await self.sidebar.refresh_sessions()
+        session_id = self.current_session
+        
+        # A repeat of a generation still being submitted or run would only
+        # share its API call and save the same image again
+        request = (session_id, prompt, size, quality)
+        if request in self._submitting or any(
+            (job.prompt, job.size, job.quality) == (prompt, size, quality)
+            for job in self.generation_queue.active_jobs(session_id)
+        ):
+            if session_id == self.current_session:
+                self.chat_area.add_notice("This design is already being generated")
+            return
+        self._submitting.add(request)
         
-        # Add user message
-        self.chat_area.add_user_message(prompt)
-        await self.chat_service.add_message(self.current_session, prompt)
+        try:
+            # Add user message
+            self.chat_area.add_user_message(prompt)
+            
+            # Build conversation history from the messages before this prompt
+            messages = await self.chat_service.get_session_messages(session_id)
+            conversation_history = self._build_conversation_history(messages)
+            await self.chat_service.add_message(session_id, prompt)
+            
+            # Show context indicator if there's history
+            if conversation_history and session_id == self.current_session:
+                self.chat_area.add_context_indicator(len(conversation_history))
+            
+            # The job shows its own placeholder; the input stays usable meanwhile
+            self.generation_queue.submit(session_id, prompt, size, quality, conversation_history)
+        finally:
+            self._submitting.discard(request)
+    
+    def on_generation_job_updated(self, job: GenerationJob):
+        """Reflect a generation job in its session's chat and gallery"""
+        self.input_widget.set_active_jobs(len(self.generation_queue.active_jobs()))
+        
+        # Jobs of other sessions show up when those sessions are opened: saved
+        # images are in the database, and failures are reported then
+        if not self._showing(job.chat_session_id):
+            if job.status == JobStatus.FAILED:
+                self._report_job_failure(job.chat_session_id, job.id, f"Error generating tattoo: {job.error}")
+            elif job.status == JobStatus.DONE and job.chat_session_id == self.current_session:
+                # The load in flight may have read the session before the image was saved
+                asyncio.ensure_future(self.on_session_selected(job.chat_session_id))
+            return
         
-        # Build conversation history
-        messages = await self.chat_service.get_session_messages(self.current_session)
+        if job.status == JobStatus.DONE:
+            image = job.image
+            self.chat_area.complete_job_placeholder(job.id, job.prompt, image.image_path, image.medium_path)
+            self.gallery.add_image(image.image_path, job.prompt, image.thumb_path, image.large_path)
+        elif job.status == JobStatus.FAILED:
+            self._report_job_failure(job.chat_session_id, job.id, f"Error generating tattoo: {job.error}")
+        elif job.status == JobStatus.CANCELLED:
+            self.chat_area.remove_job_placeholder(job.id)
+            self.chat_area.add_notice("Generation cancelled")
+        else:
+            self.chat_area.show_job_placeholder(job.id, self._job_text(job))
+    
+    def _job_text(self, job: GenerationJob) -> str:
+        """Placeholder text for a job that has not finished"""
+        if job.status == JobStatus.PENDING:
+            return f"Waiting to generate: {job.prompt[:40]}..."
+        return "Generating tattoo design..."
+    
+    def _show_session_jobs(self, session_id: str):
+        """Bring the open session's job placeholders and failures up to date"""
+        active = set(self._analyses)
+        for job in self.generation_queue.active_jobs(session_id):
+            active.add(job.id)
+            self.chat_area.show_job_placeholder(job.id, self._job_text(job))
+        for job_id, (analysis_session, _) in self._analyses.items():
+            if analysis_session == session_id:
+                self.chat_area.show_job_placeholder(job_id, ANALYSIS_PLACEHOLDER)
+        
+        # Placeholders kept in a cached view of jobs that ended meanwhile
+        for job_id in self.chat_area.job_placeholders():
+            if job_id not in active:
+                self.chat_area.remove_job_placeholder(job_id)
+        
+        for job_id, error in self._failed_jobs.pop(session_id, []):
+            self.chat_area.remove_job_placeholder(job_id)
+            self.chat_area.add_error_message(error)
+    
+    def _showing(self, session_id: str) -> bool:
+        """Whether a session is open and fully loaded in the views"""
+        return session_id == self.current_session and not self._session_loading()
+    
+    def _report_job_failure(self, session_id: str, job_id: str, error: str):
+        """Show a job's error in its session now, or when the session is next opened"""
+        if self._showing(session_id):
+            self.chat_area.remove_job_placeholder(job_id)
+            self.chat_area.add_error_message(error)
+        else:
+            self._failed_jobs.setdefault(session_id, []).append((job_id, error))
+    
+    def on_job_cancel_requested(self, job_id: str):
+        """Cancel a generation or analysis from its placeholder's Cancel link"""
+        if self.generation_queue.cancel(job_id):
+            return
+        analysis = self._analyses.get(job_id)
+        if analysis is not None:
+            analysis[1].cancel()
+    
+    async def _backfill_derivatives(self, images):
+        """Build and record missing display derivatives, one image at a time"""
+        try:
+            for image in images:
+                try:
+                    paths = await build_image_pyramid(image.image_path)
+                except Exception as e:
+                    print(f"Error building derivatives for {image.image_path}: {e}")
+                    self._backfill_failed.add(image.id)
+                    continue
+                await self.chat_service.save_image_derivatives(
+                    image.id, paths["thumb"], paths["medium"], paths["large"]
+                )
+                
+                # Rows already on screen switch to the derivatives; stored
+                # views and timelines of the session still lack them
+                self.chat_area.set_image_display_path(image.image_path, paths["medium"])
+                self.gallery.set_image_derivatives(image.image_path, paths["thumb"], paths["large"])
+                self.view_cache.invalidate(image.chat_session_id)
+                self._prefetched.pop(image.chat_session_id, None)
+        finally:
+            self._backfilling.difference_update(image.id for image in images)
+    
+    def on_prompt_idle(self, prompt: str):
+        """Start speculative prompt enhancement while the user pauses typing"""
+        if self.current_session:
+            asyncio.create_task(self._speculate_prompt(self.current_session, prompt))
+    
+    async def _speculate_prompt(self, session_id: str, prompt: str):
+        """Enhance the pending prompt against the session history in the background"""
+        messages = await self.chat_service.get_session_messages(session_id)
+        if session_id != self.current_session:
+            return
+        
+        self.openai_service.speculate_prompt(prompt, session_id, self._build_conversation_history(messages))
+    
+    def _build_conversation_history(self, messages):
+        """Convert stored text messages into prompt history entries"""
         conversation_history = []
         
-        for msg in messages[:-1]:
+        for msg in messages:
             if not msg.image_id:
                 conversation_history.append({
                     'role': 'user',
                     'content': msg.content
                 })
         
-        # Show context indicator if there's history
-        if conversation_history:
-            self.chat_area.add_context_indicator(len(conversation_history))
-        
-        # Show loading
-        self.input_widget.set_loading(True)
-        self.chat_area.show_loading()
-        
-        try:
-            # Generate tattoo with conversation context
-            image = await self.openai_service.generate_tattoo(
-                prompt, size, quality, self.current_session, conversation_history
-            )
-            
-            # Save image metadata
-            await self.chat_service.save_image_metadata(image)
-            
-            # Add to chat
-            self.chat_area.hide_loading()
-            self.chat_area.add_image_message(prompt, image.image_path)
-            
-            # Add to gallery
-            self.gallery.add_image(image.image_path, prompt)
-            
-            # Save message with image reference
-            await self.chat_service.add_message(
-                self.current_session, 
-                f"Generated tattoo: {prompt}", 
-                image.id
-            )
-            
-        except Exception as e:
-            self.chat_area.hide_loading()
-            self.chat_area.add_error_message(f"Error generating tattoo: {str(e)}")
-        finally:
-            self.input_widget.set_loading(False)
+        return conversation_history
     
-    async def on_analyze_image(self, image_path: str, prompt: str):
-        """Handle image analysis request"""
+    async def on_analyze_image(self, image_path: str, prompt: str, force: bool = False):
+        """Handle image analysis request; force bypasses the analysis cache"""
         if not self.mcp_client:
             self.chat_area.add_error_message("Image analysis is not available. Please set ANTHROPIC_API_KEY.")
             return
@@ -222,28 +534,102 @@ class MainWindow(QMainWindow):
             self.chat_area.add_error_message("Please select or create a chat session first.")
             return
         
-        # Show loading message
+        # A repeat of a running analysis would stream a second copy of it
+        session_id = self.current_session
+        request = (session_id, image_path, force)
+        if request in self._analysis_requests:
+            self.chat_area.add_notice("This image is already being analyzed")
+            return
+        
+        # The analysis runs as a job with a cancellable placeholder
+        job_id = str(uuid.uuid4())
         self.chat_area.add_user_message(f"🔍 Analyzing tattoo: {prompt}")
-        self.chat_area.show_loading()
+        self.chat_area.show_job_placeholder(job_id, ANALYSIS_PLACEHOLDER)
         
+        task = asyncio.ensure_future(self._stream_analysis(job_id, session_id, image_path, force))
+        self._analyses[job_id] = (session_id, task)
+        self._analysis_requests[request] = job_id
         try:
-            # Request analysis through MCP
-            result = await self.mcp_client.analyze_image(image_path, self.current_session)
-            
-            # Hide loading
-            self.chat_area.hide_loading()
-            
-            if result["status"] == "success":
-                self.chat_area.hide_loading()
-                analysis_text = result["analysis"]
-                self.chat_area.add_user_message(f"🔍 Tattoo Analysis:\n\n{analysis_text}")
-            else:
-                self.chat_area.hide_loading()
-                self.chat_area.add_error_message(f"Analysis failed: {result.get('error', 'Unknown error')}")
-                
+            await task
+            if self._showing(session_id):
+                self.chat_area.remove_job_placeholder(job_id)
+        except asyncio.CancelledError:
+            # Cancelled from the placeholder; cancelling the stream aborted the request
+            if not task.cancelled():
+                raise
+            if self._showing(session_id):
+                self.chat_area.remove_job_placeholder(job_id)
+                self.chat_area.add_notice("Analysis cancelled")
         except Exception as e:
-            self.chat_area.hide_loading()
-            self.chat_area.add_error_message(f"Error during analysis: {str(e)}")
+            self._report_job_failure(session_id, job_id, f"Analysis failed: {str(e)}")
+        finally:
+            del self._analyses[job_id]
+            del self._analysis_requests[request]
+    
+    async def _stream_analysis(self, job_id: str, session_id: str, image_path: str, force: bool):
+        """Stream an analysis into its session's chat while the session is shown"""
+        text = "🔍 Tattoo Analysis:\n\n"
+        stream_message = None
+        try:
+            async for delta in self.mcp_client.stream_analysis(image_path, session_id, force):
+                text += delta
+                if not self._showing(session_id):
+                    continue
+                if stream_message is not None and stream_message.model is self.chat_area.model:
+                    stream_message.append(text[len(stream_message.text()):])
+                    continue
+                
+                # First delta, or the transcript was rebuilt since; the
+                # placeholder moves below the text so it can still be cancelled
+                if stream_message is not None:
+                    stream_message.finish()
+                self.chat_area.remove_job_placeholder(job_id)
+                stream_message = self.chat_area.add_streaming_message(text)
+                self.chat_area.show_job_placeholder(job_id, ANALYSIS_PLACEHOLDER)
+        finally:
+            if stream_message is not None:
+                stream_message.finish()
+    
+    async def on_analyze_all(self, all_sessions: bool):
+        """Queue batch analysis for the current session or every session"""
+        if not self.mcp_server:
+            self.chat_area.add_error_message("Image analysis is not available. Please set ANTHROPIC_API_KEY.")
+            return
+        
+        queue = self.mcp_server.analysis_queue
+        if self.current_session:
+            # The open session's images run ahead of the rest of a batch
+            await queue.submit_session(self.current_session, INTERACTIVE_PRIORITY)
+        if all_sessions:
+            await queue.submit_all_sessions()
+        elif not self.current_session:
+            self.chat_area.add_error_message("Please select or create a chat session first.")
+    
+    def on_batch_progress(self, done: int, total: int):
+        """Update the gallery with batch analysis progress"""
+        self.gallery.set_batch_progress(done, total)
+    
+    def on_batch_job_finished(self, job, result):
+        """Show a finished batch analysis if it belongs to the open session"""
+        if not self._showing(job.chat_session_id):
+            if result["status"] == "success" and job.chat_session_id == self.current_session:
+                # The load in flight may have read the session before the analysis was saved
+                asyncio.ensure_future(self.on_session_selected(job.chat_session_id))
+            return
+        
+        if result["status"] == "success":
+            self.chat_area.add_user_message(f"🔍 Tattoo Analysis:\n\n{result['analysis']}")
+        else:
+            self.chat_area.add_error_message(f"Analysis failed: {result.get('error', 'Unknown error')}")
+    
+    async def shutdown(self):
+        """Stop background work before the application exits"""
+        for task in list(self._backfills):
+            task.cancel()
+        await asyncio.gather(*self._backfills, return_exceptions=True)
+        await self.generation_queue.stop()
+        if self.mcp_server:
+            await self.mcp_server.analysis_queue.stop()
     
     async def refresh_chat_display(self):
         """Refresh the chat display to show new messages"""
@@ -254,7 +640,7 @@ class MainWindow(QMainWindow):
         messages = await self.chat_service.get_session_messages(self.current_session)
         
         # Find the last message we displayed
-        current_message_count = self.chat_area.message_layout.count()
+        current_message_count = self.chat_area.message_count()
         
         # Add only new messages
         if len(messages) > current_message_count:
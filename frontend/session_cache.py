@@ -0,0 +1,81 @@
+"""
+Rendered views of recently visited sessions.
+
+Switching sessions detaches the chat transcript and gallery models from
+their views instead of discarding them. SessionViewCache keeps the most
+recently left sessions, bounded by count and by an estimate of the memory
+their rows hold, so switching back is a model swap instead of a rebuild
+from the database. Decoded pixmaps are not counted here; they live in the
+views' shared PixmapCache, which has its own budget.
+
+MainWindow invalidates a session's entry whenever ChatService reports a
+change to it, so a cached view never goes stale.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from frontend.widgets.chat_area import ChatAreaState
+from frontend.widgets.image_gallery import GalleryState
+
+# Rough per-row cost of a model row beyond its text
+ROW_OVERHEAD_BYTES = 512
+
+
+@dataclass
+class SessionView:
+    chat: ChatAreaState
+    gallery: GalleryState
+    cost: int = field(init=False)
+
+    def __post_init__(self):
+        chat_items = self.chat.model.items()
+        self.cost = (
+            sum(2 * len(item.text) for item in chat_items)
+            + ROW_OVERHEAD_BYTES * (len(chat_items) + self.gallery.model.rowCount())
+        )
+
+
+class SessionViewCache:
+    """LRU of detached session views bounded by count and estimated size"""
+
+    def __init__(self, max_sessions: int = 8, max_bytes: int = 16 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._views: "OrderedDict[str, SessionView]" = OrderedDict()
+
+    def put(self, session_id: str, view: SessionView):
+        """Keep a session's view, evicting the least recently used ones"""
+        self.invalidate(session_id)
+        if self.max_sessions <= 0 or view.cost > self.max_bytes:
+            return
+
+        self._views[session_id] = view
+        self.bytes += view.cost
+        while len(self._views) > self.max_sessions or self.bytes > self.max_bytes:
+            _, evicted = self._views.popitem(last=False)
+            self.bytes -= evicted.cost
+
+    def take(self, session_id: str) -> Optional[SessionView]:
+        """Remove and return a session's view if it is cached"""
+        view = self._views.pop(session_id, None)
+        if view is not None:
+            self.bytes -= view.cost
+        return view
+
+    def invalidate(self, session_id: str):
+        """Forget a session's view"""
+        self.take(session_id)
+
+    def clear(self):
+        """Forget all views"""
+        self._views.clear()
+        self.bytes = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._views
+
+    def __len__(self) -> int:
+        return len(self._views)
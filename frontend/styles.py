@@ -10,36 +10,25 @@ QWidget#sidebar {
     border-right: 3px solid #3a3a3a;
 }
 
-QListWidget#chatList {
+QListView#chatList {
     background-color: transparent;
     border: none;
     outline: none;
-    padding: 8px;
-}
-
-QListWidget#chatList::item {
-    background-color: transparent;
-    border: none;
-    padding: 0;
-    margin: 4px 8px;
-}
-
-QListWidget#chatList::item:selected {
-    background-color: transparent;
-}
-
-/* Chat List Item Widget Styles */
-ChatListItem {
-    background-color: transparent;
-    border-radius: 8px;
+    padding: 8px 0;
 }
 
-ChatListItem:hover {
+QLineEdit#sessionFilter {
     background-color: #2a2a2a;
+    border: 1px solid #3a3a3a;
+    border-radius: 6px;
+    color: #e0e0e0;
+    padding: 6px 10px;
+    margin: 0 8px 8px 8px;
+    font-size: 13px;
 }
 
-QListWidget#chatList::item:selected ChatListItem {
-    background-color: #3a3a3a;
+QLineEdit#sessionFilter:focus {
+    border: 1px solid #4a4a4a;
 }
 
 /* Main Chat Area */
@@ -52,6 +41,12 @@ QScrollArea#messageArea {
     border: none;
 }
 
+QListView#messageArea {
+    background-color: transparent;
+    border: none;
+    outline: none;
+}
+
 QWidget#messageContainer {
     background-color: transparent;
 }
@@ -179,9 +174,10 @@ QWidget#galleryWidget {
     margin: 8px;
 }
 
-QScrollArea#galleryScroll {
+QScrollArea#galleryScroll, QListView#galleryScroll {
     background-color: transparent;
     border: none;
+    outline: none;
 }
 
 /* Scrollbar Styles */
@@ -1,148 +1,343 @@
-from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QScrollArea, QLabel,
-    QHBoxLayout, QSizePolicy
-)
-from PyQt6.QtCore import Qt, QTimer
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QListView, QAbstractItemView
+from PyQt6.QtCore import Qt, QObject, QTimer, QPersistentModelIndex, pyqtSignal
 from PyQt6.QtGui import QPixmap
 
+from frontend.image_loader import get_image_loader, display_size, PixmapCache, PREFETCH_PRIORITY
+from frontend.widgets.chat_model import (
+    ChatItem, ChatItemKind, ChatMessageModel, ChatMessageDelegate
+)
+
+# Memory budget for decoded chat images; rows scrolled away are reloaded lazily.
+# Images are keyed by path, so they are shared by every session's transcript.
+PIXMAP_CACHE_BYTES = 48 * 1024 * 1024
+
+
+@dataclass
+class ChatAreaState:
+    """A transcript detached from the view, ready to be shown again"""
+    model: ChatMessageModel
+    # First visible row, or None when the view was scrolled to the bottom
+    top_row: Optional[int]
+
+
+class StreamingMessage(QObject):
+    """Chat message that grows as text deltas arrive.
+
+    Deltas are buffered and applied at most once per flush interval, so a
+    fast token stream causes a handful of relayouts instead of one per token.
+    """
+    updated = pyqtSignal()
+
+    def __init__(self, model: ChatMessageModel, item: ChatItem, flush_interval_ms: int = 50):
+        super().__init__(model)
+        self.model = model
+        self.item = item
+        self._text = item.text
+        self._pending = []
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval_ms)
+        self._flush_timer.timeout.connect(self._flush)
+
+    def append(self, delta: str):
+        """Queue a text delta for the next repaint"""
+        self._pending.append(delta)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def finish(self):
+        """Apply any buffered text immediately"""
+        self._flush_timer.stop()
+        self._flush()
+
+    def text(self) -> str:
+        """Return the full text including buffered deltas"""
+        return self._text + "".join(self._pending)
+
+    def _flush(self):
+        """Apply buffered deltas in a single update"""
+        if not self._pending:
+            return
+        self._text += "".join(self._pending)
+        self._pending.clear()
+        self.item.text = self._text
+        self.model.item_changed(self.item)
+        self.updated.emit()
+
+
 class ChatArea(QWidget):
+    """Chat transcript as a virtualized list view.
+
+    Rows are painted by ChatMessageDelegate, so only visible messages cost
+    any drawing, and images are decoded only when their row is painted.
+    Between begin_batch() and end_batch() new rows are held back and inserted
+    together, so replaying a session costs one insertion, layout and scroll.
+    """
+    # The Cancel link of a job's placeholder was clicked
+    job_cancel_requested = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
+        self._pixmaps = PixmapCache(PIXMAP_CACHE_BYTES)
+        self._requested = set()
+        # Speculative decodes have their own owner so view changes do not cancel them
+        self._prefetcher = QObject(self)
+        self._prefetching = set()
+        # Rows held back while a batch is open, and whether it asked to scroll
+        self._batch = None
+        self._batch_depth = 0
+        self._batch_scroll = False
         self.init_ui()
-        self.loading_label = None
-    
+
     def init_ui(self):
         """Initialize the chat area UI"""
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
-        self.setMinimumHeight(900) 
-        
-        # Scroll area
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setObjectName("messageArea")
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        
-        # Message container
-        self.message_container = QWidget()
-        self.message_container.setObjectName("messageContainer")
-        self.message_layout = QVBoxLayout(self.message_container)
-        self.message_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.message_layout.setSpacing(8)
-        
-        self.scroll_area.setWidget(self.message_container)
-        layout.addWidget(self.scroll_area)
-    
+        self.setMinimumHeight(900)
+
+        self.model = ChatMessageModel()
+        self.delegate = ChatMessageDelegate(self._pixmap_for, self)
+        self.delegate.cancel_clicked.connect(self.job_cancel_requested)
+
+        self.list_view = QListView()
+        self.list_view.setObjectName("messageArea")
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.list_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.list_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.list_view.setUniformItemSizes(False)
+        self.list_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.list_view.setBatchSize(200)
+        self.list_view.setSpacing(0)
+
+        layout.addWidget(self.list_view)
+
+        # Scroll requests made in quick succession share one scroll
+        self._scroll_timer = QTimer(self)
+        self._scroll_timer.setSingleShot(True)
+        self._scroll_timer.setInterval(100)
+        self._scroll_timer.timeout.connect(self.list_view.scrollToBottom)
+
     def add_user_message(self, text: str):
         """Add a user message to the chat"""
-        message_widget = QWidget()
-        message_layout = QHBoxLayout(message_widget)
-        message_layout.setContentsMargins(20, 8, 20, 8)
-        
-        # Add stretch to align right
-        message_layout.addStretch()
-        
-        # Message label
-        label = QLabel(text)
-        label.setObjectName("userMessage")
-        label.setWordWrap(True)
-        label.setMaximumWidth(600)
-        label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
-        
-        message_layout.addWidget(label)
-        
-        self.message_layout.addWidget(message_widget)
+        self._append(ChatItem(ChatItemKind.USER, text))
         self._scroll_to_bottom()
-    
+
     def add_context_indicator(self, message_count: int):
         """Add a context indicator showing conversation history is being used"""
         if message_count > 0:
-            context_widget = QWidget()
-            context_layout = QHBoxLayout(context_widget)
-            context_layout.setContentsMargins(20, 4, 20, 4)
-            
-            context_label = QLabel(f"🔗 Using context from {message_count} previous {'request' if message_count == 1 else 'requests'}")
-            context_label.setStyleSheet("""
-                color: #888;
-                font-size: 12px;
-                padding: 4px 8px;
-                background-color: #252525;
-                border-radius: 4px;
-            """)
-            
-            context_layout.addWidget(context_label)
-            context_layout.addStretch()
-            
-            self.message_layout.addWidget(context_widget)
-    
-    def add_image_message(self, prompt: str, image_path: str):
-        """Add an image message to the chat"""
-        
-        # Create image widget
-        image_widget = QWidget()
-        image_layout = QVBoxLayout(image_widget)
-        image_layout.setContentsMargins(20, 8, 20, 8)
-        
-        # Container for image
-        container = QWidget()
-        container.setObjectName("imageMessage")
-        container_layout = QVBoxLayout(container)
-        
-        # Load and display image
-        pixmap = QPixmap(image_path)
-        if not pixmap.isNull():
-            scaled_pixmap = pixmap.scaled(
-                600, 600,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            
-            image_label = QLabel()
-            image_label.setPixmap(scaled_pixmap)
-            container_layout.addWidget(image_label)
-        
-        image_layout.addWidget(container)
-        self.message_layout.addWidget(image_widget)
+            self._append(ChatItem(
+                ChatItemKind.CONTEXT,
+                f"🔗 Using context from {message_count} previous {'request' if message_count == 1 else 'requests'}"
+            ))
+
+    def add_image_message(self, prompt: str, image_path: str, display_path: str = None):
+        """Add an image message to the chat, showing display_path (the medium derivative) if given"""
+        # Only the header is read now; pixels are decoded when the row is painted
+        size = display_size(display_path, image_path, 600, 600)
+        if not size.isValid():
+            return
+
+        self._append(ChatItem(
+            ChatItemKind.IMAGE,
+            prompt,
+            image_path=image_path,
+            display_path=display_path,
+            image_size=size
+        ))
         self._scroll_to_bottom()
-    
+
+    def add_streaming_message(self, prefix: str = "") -> StreamingMessage:
+        """Add a message whose text is streamed in incrementally"""
+        item = self.model.append(ChatItem(ChatItemKind.USER, prefix))
+        message = StreamingMessage(self.model, item)
+        message.updated.connect(self._scroll_to_bottom)
+
+        self._scroll_to_bottom()
+        return message
+
     def add_error_message(self, error: str):
         """Add an error message to the chat"""
-        error_widget = QWidget()
-        error_layout = QHBoxLayout(error_widget)
-        error_layout.setContentsMargins(20, 8, 20, 8)
+        self._append(ChatItem(ChatItemKind.ERROR, f"❌ {error}"))
+        self._scroll_to_bottom()
+
+    def add_notice(self, text: str):
+        """Add a small status note, such as a cancelled job"""
+        self._append(ChatItem(ChatItemKind.CONTEXT, text))
+        self._scroll_to_bottom()
+
+    def show_job_placeholder(self, job_id: str, text: str):
+        """Add or update the cancellable placeholder row of a job"""
+        item = self.model.find_job(job_id)
+        if item is None:
+            self.model.append(ChatItem(ChatItemKind.LOADING, text, job_id=job_id))
+            self._scroll_to_bottom()
+        elif item.text != text:
+            item.text = text
+            self.model.item_changed(item)
+    
+    def complete_job_placeholder(self, job_id: str, prompt: str, image_path: str, display_path: str = None):
+        """Turn a job's placeholder into its image, in place"""
+        item = self.model.find_job(job_id)
+        if item is None:
+            self.add_image_message(prompt, image_path, display_path)
+            return
         
-        label = QLabel(f"❌ {error}")
-        label.setObjectName("errorMessage")
-        label.setWordWrap(True)
-        label.setStyleSheet("color: #ff6b6b; background-color: #2a1515; padding: 12px; border-radius: 8px;")
+        size = display_size(display_path, image_path, 600, 600)
+        if not size.isValid():
+            self.model.remove(item)
+            return
         
-        error_layout.addWidget(label)
-        self.message_layout.addWidget(error_widget)
+        item.kind = ChatItemKind.IMAGE
+        item.text = prompt
+        item.image_path = image_path
+        item.display_path = display_path
+        item.image_size = size
+        item.job_id = None
+        self.model.item_changed(item)
         self._scroll_to_bottom()
     
-    def show_loading(self):
-        """Show loading indicator"""
-        self.loading_label = QLabel("Generating tattoo design...")
-        self.loading_label.setObjectName("loadingLabel")
-        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.message_layout.addWidget(self.loading_label)
-        self._scroll_to_bottom()
+    def remove_job_placeholder(self, job_id: str):
+        """Remove the placeholder row of a job"""
+        item = self.model.find_job(job_id)
+        if item is not None:
+            self.model.remove(item)
+    
+    def set_image_display_path(self, image_path: str, display_path: str):
+        """Show a derivative built for an image already in the transcript"""
+        for item in self.model.items():
+            if item.kind == ChatItemKind.IMAGE and item.image_path == image_path:
+                item.display_path = display_path
+                self.model.item_changed(item)
     
-    def hide_loading(self):
-        """Hide loading indicator"""
-        if self.loading_label:
-            self.loading_label.deleteLater()
-            self.loading_label = None
+    def job_placeholders(self) -> List[str]:
+        """Jobs with a placeholder row in the transcript"""
+        return self.model.job_ids()
     
+    def message_count(self) -> int:
+        """Number of rows currently shown, including a batch's pending rows"""
+        return self.model.rowCount() + len(self._batch or ())
+    
+    def begin_batch(self):
+        """Hold back rows added by the add_*_message methods until end_batch.
+
+        Batches nest; rows are inserted when the outermost batch ends. Meant
+        for synchronous replay: streaming messages and job placeholders always
+        go straight to the model.
+        """
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._batch = []
+            self._batch_scroll = False
+            self.list_view.setUpdatesEnabled(False)
+    
+    def end_batch(self):
+        """Insert the rows held back since begin_batch and scroll once"""
+        self._batch_depth -= 1
+        if self._batch_depth > 0:
+            return
+        
+        items, self._batch = self._batch, None
+        self.model.extend(items)
+        self.list_view.setUpdatesEnabled(True)
+        if self._batch_scroll:
+            self._scroll_to_bottom()
+
     def clear(self):
         """Clear all messages"""
-        while self.message_layout.count():
-            child = self.message_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        self._show_model(ChatMessageModel())
+    
+    def save_state(self) -> ChatAreaState:
+        """Detach the current transcript, leaving the chat empty"""
+        scrollbar = self.list_view.verticalScrollBar()
+        top_row = None
+        if scrollbar.value() < scrollbar.maximum():
+            top_row = self.list_view.indexAt(self.list_view.viewport().rect().topLeft()).row()
+        
+        state = ChatAreaState(self.model, top_row if top_row != -1 else None)
+        self.clear()
+        return state
+    
+    def restore_state(self, state: ChatAreaState):
+        """Show a transcript detached by save_state, at its old scroll position"""
+        self._show_model(state.model)
+        if state.top_row is None:
+            self._scroll_to_bottom()
+        else:
+            index = QPersistentModelIndex(self.model.index(state.top_row))
+            QTimer.singleShot(0, lambda: self._scroll_to_row(index))
+    
+    def prefetch_images(self, images: List[Tuple[str, str]]):
+        """Decode (display_path, image_path) pairs into the cache at low priority"""
+        for display_path, image_path in images:
+            key = display_path or image_path
+            if key in self._requested or key in self._prefetching or self._pixmaps.get(key) is not None:
+                continue
+            self._prefetching.add(key)
+            get_image_loader().load(
+                self._prefetcher, display_path, image_path, 600, 600,
+                lambda image, key=key: self._on_image_decoded(key, image),
+                PREFETCH_PRIORITY
+            )
+    
+    def cancel_prefetch(self):
+        """Drop queued speculative decodes"""
+        get_image_loader().cancel(self._prefetcher)
+        self._prefetching.clear()
+        # Rows that were waiting on a cancelled decode request their own
+        self.list_view.viewport().update()
+    
+    def _show_model(self, model: ChatMessageModel):
+        """Swap the transcript shown by the view"""
+        get_image_loader().cancel(self)
+        self._requested.clear()
+        self.model = model
+        self.list_view.setModel(model)
     
+    def _scroll_to_row(self, index: QPersistentModelIndex):
+        """Scroll a restored row to the top of the view"""
+        if index.isValid() and index.model() is self.model:
+            self.list_view.scrollTo(self.model.index(index.row()), QAbstractItemView.ScrollHint.PositionAtTop)
+
+    def _pixmap_for(self, item: ChatItem):
+        """Return a row's decoded image, starting a background decode if needed"""
+        key = item.display_path or item.image_path
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            return pixmap
+
+        if key not in self._requested and key not in self._prefetching:
+            self._requested.add(key)
+            get_image_loader().load(
+                self, item.display_path, item.image_path, 600, 600,
+                lambda image, key=key: self._on_image_decoded(key, image)
+            )
+        return None
+
+    def _on_image_decoded(self, key: str, image):
+        """Cache a decoded image and repaint the rows showing it"""
+        self._requested.discard(key)
+        self._prefetching.discard(key)
+        self._pixmaps.put(key, QPixmap.fromImage(image))
+        self.list_view.viewport().update()
+
+    def _append(self, item: ChatItem) -> ChatItem:
+        """Add a row, or hold it back while a batch is open"""
+        if self._batch is not None:
+            self._batch.append(item)
+            return item
+        return self.model.append(item)
+
     def _scroll_to_bottom(self):
-        """Scroll to the bottom of the chat"""
-        QTimer.singleShot(100, lambda: self.scroll_area.verticalScrollBar().setValue(
-            self.scroll_area.verticalScrollBar().maximum()
-        ))
\ No newline at end of file
+        """Scroll to the bottom of the chat once pending rows are laid out"""
+        if self._batch is not None:
+            self._batch_scroll = True
+        else:
+            self._scroll_timer.start()
@@ -0,0 +1,322 @@
+"""
+Model and delegate behind the virtualized ChatArea.
+
+Each chat entry is a lightweight ChatItem row in ChatMessageModel.
+ChatMessageDelegate paints only the rows in view, caches each row's height
+per view width, and draws images from a pixmap provider that loads them
+lazily, so memory and layout cost do not grow with a widget per message.
+Placeholder rows of running jobs carry a Cancel link the delegate handles.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, List, Optional
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, QRect, QRectF, QSize, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath, QPixmap
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyleOptionViewItem
+
+
+class ChatItemKind(Enum):
+    USER = "user"
+    CONTEXT = "context"
+    IMAGE = "image"
+    ERROR = "error"
+    LOADING = "loading"
+
+
+@dataclass(eq=False)
+class ChatItem:
+    kind: ChatItemKind
+    text: str = ""
+    image_path: Optional[str] = None
+    display_path: Optional[str] = None
+    # Display size of the image, read from its header when the row is added
+    image_size: Optional[QSize] = None
+    # Generation or analysis job a placeholder row stands for
+    job_id: Optional[str] = None
+    # Height cached for the width it was measured at
+    cached_width: int = -1
+    cached_height: int = 0
+
+
+# Qt role exposing the ChatItem of a row
+ChatItemRole = Qt.ItemDataRole.UserRole + 1
+
+
+class ChatMessageModel(QAbstractListModel):
+    """Flat list of chat rows"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[ChatItem] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        item = self._items[index.row()]
+        if role == ChatItemRole:
+            return item
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.text
+        return None
+
+    def append(self, item: ChatItem) -> ChatItem:
+        """Add a row at the end"""
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.append(item)
+        self.endInsertRows()
+        return item
+
+    def extend(self, items: List[ChatItem]):
+        """Add rows at the end in a single insertion"""
+        if not items:
+            return
+        first = len(self._items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self._items.extend(items)
+        self.endInsertRows()
+
+    def remove(self, item: ChatItem):
+        """Remove a row if present"""
+        row = self.row_of(item)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._items[row]
+        self.endRemoveRows()
+
+    def item_changed(self, item: ChatItem):
+        """Invalidate a row whose content changed"""
+        row = self.row_of(item)
+        if row < 0:
+            return
+        item.cached_width = -1
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def row_of(self, item: ChatItem) -> int:
+        """Find a row, searching from the end where recent items live"""
+        for row in range(len(self._items) - 1, -1, -1):
+            if self._items[row] is item:
+                return row
+        return -1
+
+    def find_job(self, job_id: str) -> Optional[ChatItem]:
+        """Find the placeholder row of a job"""
+        for row in range(len(self._items) - 1, -1, -1):
+            if self._items[row].job_id == job_id:
+                return self._items[row]
+        return None
+
+    def job_ids(self) -> List[str]:
+        """Jobs with a placeholder row"""
+        return [item.job_id for item in self._items if item.job_id]
+
+    def items(self) -> List[ChatItem]:
+        """Return all rows"""
+        return list(self._items)
+
+    def clear(self):
+        """Remove all rows"""
+        self.beginResetModel()
+        self._items.clear()
+        self.endResetModel()
+
+
+# Layout constants mirroring the chat bubble styles
+ROW_MARGIN_H = 20
+ROW_MARGIN_V = 8
+BUBBLE_MARGIN = 8
+BUBBLE_MAX_WIDTH = 600
+USER_PADDING = (16, 12)
+ERROR_PADDING = (12, 12)
+CONTEXT_PADDING = (8, 4)
+IMAGE_PADDING = 8
+LOADING_PADDING = 20
+CANCEL_TEXT = "Cancel"
+CANCEL_GAP = 12
+
+_TEXT_FLAGS = Qt.TextFlag.TextWordWrap | Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """Paints chat rows as bubbles, images and indicators"""
+    cancel_clicked = pyqtSignal(str)
+
+    def __init__(self, pixmap_provider: Callable[[ChatItem], Optional[QPixmap]], parent=None):
+        super().__init__(parent)
+        self.pixmap_provider = pixmap_provider
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        item = index.data(ChatItemRole)
+        width = option.rect.width()
+        if item.cached_width != width:
+            item.cached_height = self._measure(item, option.font, width)
+            item.cached_width = width
+        return QSize(width, item.cached_height)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        item = index.data(ChatItemRole)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        rect = option.rect
+        if item.kind == ChatItemKind.USER:
+            self._paint_bubble(painter, rect, item.text, option.font, USER_PADDING,
+                               QColor("#2a2a2a"), QColor("#e0e0e0"), 12, align_right=True)
+        elif item.kind == ChatItemKind.ERROR:
+            self._paint_bubble(painter, rect, item.text, option.font, ERROR_PADDING,
+                               QColor("#2a1515"), QColor("#ff6b6b"), 8, align_right=False, fill=True)
+        elif item.kind == ChatItemKind.CONTEXT:
+            self._paint_context(painter, rect, item.text, option.font)
+        elif item.kind == ChatItemKind.IMAGE:
+            self._paint_image(painter, rect, item)
+        elif item.kind == ChatItemKind.LOADING:
+            self._paint_loading(painter, rect, item, option.font)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        """Report clicks on a placeholder's Cancel link"""
+        if event.type() != QEvent.Type.MouseButtonRelease or event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        item = index.data(ChatItemRole)
+        if item.kind != ChatItemKind.LOADING or not item.job_id:
+            return False
+        if not self._cancel_rect(option.rect, item.text, option.font).contains(event.position().toPoint()):
+            return False
+        self.cancel_clicked.emit(item.job_id)
+        return True
+
+    def _measure(self, item: ChatItem, font: QFont, width: int) -> int:
+        """Compute a row's height for the given view width"""
+        if item.kind in (ChatItemKind.USER, ChatItemKind.ERROR):
+            padding = USER_PADDING if item.kind == ChatItemKind.USER else ERROR_PADDING
+            text_width = self._text_width(width, padding, item.kind == ChatItemKind.USER)
+            text_height = QFontMetrics(font).boundingRect(
+                QRect(0, 0, text_width, 100000), _TEXT_FLAGS, item.text
+            ).height()
+            return text_height + 2 * (padding[1] + BUBBLE_MARGIN + ROW_MARGIN_V)
+        if item.kind == ChatItemKind.CONTEXT:
+            return QFontMetrics(self._small_font(font)).height() + 2 * CONTEXT_PADDING[1] + 2 * 4
+        if item.kind == ChatItemKind.IMAGE:
+            image_height = item.image_size.height() if item.image_size else 0
+            return image_height + 2 * (IMAGE_PADDING + ROW_MARGIN_V)
+        return QFontMetrics(font).height() + 2 * LOADING_PADDING
+
+    def _text_width(self, width: int, padding, capped: bool) -> int:
+        """Width available to a bubble's text"""
+        available = width - 2 * (ROW_MARGIN_H + BUBBLE_MARGIN + padding[0])
+        if capped:
+            available = min(available, BUBBLE_MAX_WIDTH - 2 * (BUBBLE_MARGIN + padding[0]))
+        return max(40, available)
+
+    def _small_font(self, font: QFont) -> QFont:
+        """Font of the context indicator"""
+        small = QFont(font)
+        small.setPixelSize(12)
+        return small
+
+    def _paint_bubble(self, painter, rect, text, font, padding, background, color, radius,
+                      align_right: bool, fill: bool = False):
+        """Draw word-wrapped text in a rounded bubble"""
+        text_width = self._text_width(rect.width(), padding, align_right)
+        metrics = QFontMetrics(font)
+        text_rect = metrics.boundingRect(QRect(0, 0, text_width, 100000), _TEXT_FLAGS, text)
+
+        bubble_width = (text_width if fill else text_rect.width()) + 2 * padding[0]
+        bubble_height = text_rect.height() + 2 * padding[1]
+        top = rect.top() + ROW_MARGIN_V + BUBBLE_MARGIN
+        if align_right:
+            left = rect.right() - ROW_MARGIN_H - BUBBLE_MARGIN - bubble_width
+        else:
+            left = rect.left() + ROW_MARGIN_H + BUBBLE_MARGIN
+        bubble = QRectF(left, top, bubble_width, bubble_height)
+
+        path = QPainterPath()
+        path.addRoundedRect(bubble, radius, radius)
+        painter.fillPath(path, background)
+
+        painter.setFont(font)
+        painter.setPen(color)
+        painter.drawText(
+            QRect(int(left) + padding[0], top + padding[1], text_width, text_rect.height()),
+            _TEXT_FLAGS, text
+        )
+
+    def _paint_context(self, painter, rect, text, font):
+        """Draw the small context indicator pill"""
+        small = self._small_font(font)
+        metrics = QFontMetrics(small)
+        pill = QRectF(
+            rect.left() + ROW_MARGIN_H, rect.top() + 4,
+            metrics.horizontalAdvance(text) + 2 * CONTEXT_PADDING[0],
+            metrics.height() + 2 * CONTEXT_PADDING[1]
+        )
+        path = QPainterPath()
+        path.addRoundedRect(pill, 4, 4)
+        painter.fillPath(path, QColor("#252525"))
+
+        painter.setFont(small)
+        painter.setPen(QColor("#888"))
+        painter.drawText(pill, Qt.AlignmentFlag.AlignCenter, text)
+
+    def _paint_loading(self, painter, rect, item: ChatItem, font):
+        """Draw a loading indicator, followed by a Cancel link for jobs"""
+        italic = QFont(font)
+        italic.setItalic(True)
+        painter.setFont(italic)
+        painter.setPen(QColor("#888"))
+        if not item.job_id:
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, item.text)
+            return
+
+        cancel = self._cancel_rect(rect, item.text, font)
+        text_rect = QRect(rect.left(), rect.top(), cancel.left() - CANCEL_GAP - rect.left(), rect.height())
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, item.text)
+
+        link = QFont(font)
+        link.setUnderline(True)
+        painter.setFont(link)
+        painter.setPen(QColor("#4a8bd8"))
+        painter.drawText(cancel, Qt.AlignmentFlag.AlignCenter, CANCEL_TEXT)
+
+    def _cancel_rect(self, rect: QRect, text: str, font: QFont) -> QRect:
+        """Area of a placeholder's Cancel link, centred along with its text"""
+        italic = QFont(font)
+        italic.setItalic(True)
+        text_width = QFontMetrics(italic).horizontalAdvance(text)
+        cancel_width = QFontMetrics(font).horizontalAdvance(CANCEL_TEXT)
+        left = rect.left() + (rect.width() - text_width - CANCEL_GAP - cancel_width) // 2
+        return QRect(left + text_width + CANCEL_GAP, rect.top(), cancel_width, rect.height())
+
+    def _paint_image(self, painter, rect, item: ChatItem):
+        """Draw an image row, or its placeholder until the pixmap is loaded"""
+        size = item.image_size or QSize(0, 0)
+        frame = QRectF(
+            rect.left() + ROW_MARGIN_H, rect.top() + ROW_MARGIN_V,
+            size.width() + 2 * IMAGE_PADDING, size.height() + 2 * IMAGE_PADDING
+        )
+        path = QPainterPath()
+        path.addRoundedRect(frame, 12, 12)
+        painter.fillPath(path, QColor("#252525"))
+
+        target = QRect(
+            int(frame.left()) + IMAGE_PADDING, int(frame.top()) + IMAGE_PADDING,
+            size.width(), size.height()
+        )
+        pixmap = self.pixmap_provider(item)
+        if pixmap is not None and not pixmap.isNull():
+            painter.drawPixmap(target, pixmap)
+        else:
+            painter.setPen(QColor("#888"))
+            painter.drawText(
+                target, Qt.AlignmentFlag.AlignCenter,
+                "Loading image..." if pixmap is None else "Image unavailable"
+            )
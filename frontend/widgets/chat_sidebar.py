@@ -1,76 +1,34 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QListWidget, QListWidgetItem,
-    QPushButton, QLabel, QInputDialog, QHBoxLayout,
+    QWidget, QVBoxLayout, QListView, QAbstractItemView,
+    QPushButton, QLabel, QInputDialog, QLineEdit,
     QMessageBox
 )
-from PyQt6.QtCore import pyqtSignal, QTimer, Qt
+from PyQt6.QtCore import pyqtSignal, QTimer, Qt, QEvent, QModelIndex, QSortFilterProxyModel
 import asyncio
 
 from backend.chat_service import ChatService
-
-class ChatListItem(QWidget):
-    """Custom widget for chat list items with delete button"""
-    delete_clicked = pyqtSignal(str)
-    
-    def __init__(self, session_id: str, session_name: str):
-        super().__init__()
-        self.session_id = session_id
-        self.session_name = session_name
-        self.init_ui()
-    
-    def init_ui(self):
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(12, 8, 12, 8)
-        layout.setSpacing(8)
-        
-        # Session name label
-        self.name_label = QLabel(self.session_name)
-        self.name_label.setStyleSheet("color: #e0e0e0;")
-        self.name_label.setWordWrap(True)
-        layout.addWidget(self.name_label)
-        
-        layout.addStretch()
-        
-        # Delete button (hidden by default)
-        self.delete_btn = QPushButton("🗑️")
-        self.delete_btn.setFixedSize(30, 30)
-        self.delete_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                border: none;
-                color: #888;
-                font-size: 16px;
-                padding: 0;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #ff4444;
-                color: white;
-            }
-        """)
-        self.delete_btn.clicked.connect(lambda: self.delete_clicked.emit(self.session_id))
-        self.delete_btn.hide()
-        layout.addWidget(self.delete_btn)
-    
-    def enterEvent(self, event):
-        """Show delete button on hover"""
-        self.delete_btn.show()
-        super().enterEvent(event)
-    
-    def leaveEvent(self, event):
-        """Hide delete button when not hovering"""
-        self.delete_btn.hide()
-        super().leaveEvent(event)
+from frontend.widgets.session_list_model import SessionListModel, SessionDelegate
 
 class ChatSidebar(QWidget):
     session_selected = pyqtSignal(str)
     new_session_created = pyqtSignal(object)
     session_deleted = pyqtSignal(str)
+    # A session the user is likely to open next, and the end of that guess
+    prefetch_requested = pyqtSignal(str)
+    prefetch_cancelled = pyqtSignal()
     
-    def __init__(self, chat_service: ChatService):
+    def __init__(self, chat_service: ChatService, prefetch_dwell_ms: int = 250):
         super().__init__()
         self.chat_service = chat_service
         self.setFixedWidth(280)
+        
+        # Request a prefetch once a row has been hovered or focused for the dwell time
+        self._prefetch_candidate = None
+        self.dwell_timer = QTimer(self)
+        self.dwell_timer.setSingleShot(True)
+        self.dwell_timer.setInterval(prefetch_dwell_ms)
+        self.dwell_timer.timeout.connect(self.on_dwell)
+        
         self.init_ui()
         
         # Load sessions on startup
@@ -93,10 +51,35 @@ class ChatSidebar(QWidget):
         self.new_chat_btn.clicked.connect(self.create_new_chat)
         layout.addWidget(self.new_chat_btn)
         
-        # Chat list
-        self.chat_list = QListWidget()
+        # Name filter over the loaded sessions
+        self.filter_input = QLineEdit()
+        self.filter_input.setObjectName("sessionFilter")
+        self.filter_input.setPlaceholderText("Search chats...")
+        self.filter_input.setClearButtonEnabled(True)
+        layout.addWidget(self.filter_input)
+        
+        # Chat list; rows are fetched a page at a time and painted by the delegate
+        self.model = SessionListModel(self.chat_service, parent=self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.filter_input.textChanged.connect(self.proxy.setFilterFixedString)
+        
+        self.delegate = SessionDelegate(self)
+        self.delegate.session_clicked.connect(self.on_item_clicked)
+        self.delegate.delete_clicked.connect(lambda sid: asyncio.create_task(self.delete_session(sid)))
+        
+        self.chat_list = QListView()
         self.chat_list.setObjectName("chatList")
-        self.chat_list.itemClicked.connect(self.on_item_clicked)
+        self.chat_list.setModel(self.proxy)
+        self.chat_list.setItemDelegate(self.delegate)
+        self.chat_list.setUniformItemSizes(True)
+        self.chat_list.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.chat_list.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.chat_list.setMouseTracking(True)
+        self.chat_list.entered.connect(self.on_item_entered)
+        self.chat_list.viewport().installEventFilter(self)
+        self.chat_list.selectionModel().currentChanged.connect(self.on_current_item_changed)
         layout.addWidget(self.chat_list)
     
     def initial_load(self):
@@ -104,33 +87,15 @@ class ChatSidebar(QWidget):
         asyncio.create_task(self.refresh_sessions())
     
     async def refresh_sessions(self):
-        """Refresh the list of chat sessions"""
-        self.chat_list.clear()
-        
-        sessions = await self.chat_service.get_all_sessions()
-        for session in sessions:
-            # Create custom widget
-            item_widget = ChatListItem(session.id, session.name)
-            item_widget.delete_clicked.connect(lambda sid: asyncio.create_task(self.delete_session(sid)))
-            
-            # Create list item
-            item = QListWidgetItem()
-            item.setData(Qt.ItemDataRole.UserRole, session.id)
-            
-            # Set proper size hint with padding
-            size_hint = item_widget.sizeHint()
-            size_hint.setHeight(max(50, size_hint.height()))
-            item.setSizeHint(size_hint)
-            
-            # Add to list
-            self.chat_list.addItem(item)
-            self.chat_list.setItemWidget(item, item_widget)
+        """Reload the list of chat sessions from the first page"""
+        self.cancel_prefetch()
+        await self.model.reload()
     
     def create_new_chat(self):
         """Create a new chat session"""
         name, ok = QInputDialog.getText(
-            self, 
-            "New Chat", 
+            self,
+            "New Chat",
             "Enter chat name:",
             text="New Tattoo Session"
         )
@@ -141,21 +106,23 @@ class ChatSidebar(QWidget):
     async def _create_session(self, name: str):
         """Create a new session asynchronously"""
         session = await self.chat_service.create_session(name)
-        await self.refresh_sessions()
-        
-        # Select the new session
-        for i in range(self.chat_list.count()):
-            item = self.chat_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == session.id:
-                self.chat_list.setCurrentItem(item)
-                break
+        self.model.add_session(session)
+        self.select_session(session.id)
         
         self.new_session_created.emit(session)
     
+    def select_session(self, session_id: str):
+        """Highlight a session's row if it is loaded and passes the filter"""
+        row = self.model.row_of(session_id)
+        if row < 0:
+            return
+        index = self.proxy.mapFromSource(self.model.index(row))
+        if index.isValid():
+            self.chat_list.setCurrentIndex(index)
+    
     async def delete_session(self, session_id: str):
         """Delete a chat session"""
-        sessions = await self.chat_service.get_all_sessions()
-        session = next((s for s in sessions if s.id == session_id), None)
+        session = await self.chat_service.get_session(session_id)
         
         if not session:
             return
@@ -170,12 +137,53 @@ class ChatSidebar(QWidget):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
+            # The model drops the row when ChatService reports the deletion
             await self.chat_service.delete_session(session_id)
-            await self.refresh_sessions()
             
             self.session_deleted.emit(session_id)
     
-    def on_item_clicked(self, item: QListWidgetItem):
+    def on_item_clicked(self, session_id: str):
         """Handle item click"""
-        session_id = item.data(Qt.ItemDataRole.UserRole)
-        self.session_selected.emit(session_id)
\ No newline at end of file
+        self.dwell_timer.stop()
+        self._prefetch_candidate = None
+        self.session_selected.emit(session_id)
+    
+    def on_item_entered(self, index: QModelIndex):
+        """Start the hover dwell for the row under the pointer"""
+        self.start_dwell(index.data(Qt.ItemDataRole.UserRole))
+    
+    def on_current_item_changed(self, current: QModelIndex, previous: QModelIndex):
+        """Treat keyboard navigation onto a row like hovering it"""
+        if current.isValid() and self.chat_list.hasFocus():
+            self.start_dwell(current.data(Qt.ItemDataRole.UserRole))
+    
+    def eventFilter(self, obj, event) -> bool:
+        """Track the pointer over the list for hover prefetch and the delete button"""
+        if obj is self.chat_list.viewport():
+            if event.type() == QEvent.Type.Leave:
+                self.cancel_prefetch()
+            elif event.type() == QEvent.Type.MouseMove:
+                # Repaint the hovered row so its delete button tracks the pointer
+                index = self.chat_list.indexAt(event.position().toPoint())
+                if index.isValid():
+                    self.chat_list.viewport().update(self.chat_list.visualRect(index))
+        return super().eventFilter(obj, event)
+    
+    def start_dwell(self, session_id: str):
+        """Restart the dwell timer for a newly hovered or focused session"""
+        if session_id != self._prefetch_candidate:
+            self.cancel_prefetch()
+            self._prefetch_candidate = session_id
+        self.dwell_timer.start()
+    
+    def on_dwell(self):
+        """Ask for the dwelt-on session to be prefetched"""
+        if self._prefetch_candidate:
+            self.prefetch_requested.emit(self._prefetch_candidate)
+    
+    def cancel_prefetch(self):
+        """Stop waiting on, or prefetching, the current candidate"""
+        self.dwell_timer.stop()
+        if self._prefetch_candidate is not None:
+            self._prefetch_candidate = None
+            self.prefetch_cancelled.emit()
@@ -0,0 +1,201 @@
+"""
+Model and delegate behind the virtualized ImageGallery.
+
+Images are rows of GalleryModel shown in an icon-mode QListView with a
+fixed grid, so only visible cells are painted. GalleryDelegate draws the
+thumbnail (requested on demand from a pixmap provider), the prompt, and
+Export/Analyze buttons as an overlay on the hovered cell.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, QRect, QRectF, QSize, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPainter, QPainterPath, QPen, QPixmap
+from PyQt6.QtWidgets import QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+
+@dataclass(eq=False)
+class GalleryItem:
+    image_path: str
+    prompt: str
+    thumb_path: Optional[str] = None
+    preview_path: Optional[str] = None
+
+
+# Qt role exposing the GalleryItem of a row
+GalleryItemRole = Qt.ItemDataRole.UserRole + 1
+
+
+class GalleryModel(QAbstractListModel):
+    """Flat list of gallery images"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[GalleryItem] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        item = self._items[index.row()]
+        if role == GalleryItemRole:
+            return item
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return item.prompt
+        return None
+
+    def append(self, item: GalleryItem) -> GalleryItem:
+        """Add an image at the end"""
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.append(item)
+        self.endInsertRows()
+        return item
+
+    def set_derivatives(self, image_path: str, thumb_path: str, preview_path: str):
+        """Point an image's rows at derivatives built after they were added"""
+        for row, item in enumerate(self._items):
+            if item.image_path == image_path:
+                item.thumb_path = thumb_path
+                item.preview_path = preview_path
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+
+    def items(self) -> List[GalleryItem]:
+        """Return all images"""
+        return list(self._items)
+
+    def clear(self):
+        """Remove all images"""
+        self.beginResetModel()
+        self._items.clear()
+        self.endResetModel()
+
+
+# Cell layout
+THUMB_SIZE = 150
+CELL_PADDING = 8
+PROMPT_HEIGHT = 40
+BUTTON_HEIGHT = 24
+CELL_SIZE = QSize(THUMB_SIZE + 2 * CELL_PADDING, THUMB_SIZE + PROMPT_HEIGHT + 3 * CELL_PADDING)
+# Grid spacing around each cell
+GRID_SIZE = QSize(CELL_SIZE.width() + 8, CELL_SIZE.height() + 8)
+
+
+class GalleryDelegate(QStyledItemDelegate):
+    """Paints gallery cells and handles clicks on their overlay buttons"""
+    preview_clicked = pyqtSignal(object)
+    export_clicked = pyqtSignal(object)
+    analyze_clicked = pyqtSignal(object)
+
+    def __init__(self, pixmap_provider: Callable[[GalleryItem], Optional[QPixmap]], parent=None):
+        super().__init__(parent)
+        self.pixmap_provider = pixmap_provider
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        return CELL_SIZE
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        item = index.data(GalleryItemRole)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        cell = self._cell_rect(option.rect)
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(cell).adjusted(1, 1, -1, -1), 8, 8)
+        painter.fillPath(path, QColor("#2a2a2a"))
+        if hovered:
+            painter.setPen(QPen(QColor("#3a7bc8"), 2))
+            painter.drawPath(path)
+
+        # Thumbnail, centred in its square
+        thumb_rect = self._thumb_rect(option.rect)
+        pixmap = self.pixmap_provider(item)
+        if pixmap is not None and not pixmap.isNull():
+            size = pixmap.size()
+            painter.drawPixmap(
+                thumb_rect.left() + (THUMB_SIZE - size.width()) // 2,
+                thumb_rect.top() + (THUMB_SIZE - size.height()) // 2,
+                pixmap
+            )
+        else:
+            painter.setPen(QColor("#888"))
+            painter.drawText(
+                thumb_rect, Qt.AlignmentFlag.AlignCenter,
+                "Loading..." if pixmap is None else "Image unavailable"
+            )
+
+        # Prompt preview, elided to two lines
+        font = QFont(option.font)
+        font.setPixelSize(13)
+        painter.setFont(font)
+        painter.setPen(QColor("#e0e0e0"))
+        prompt = item.prompt[:50] + "..." if len(item.prompt) > 50 else item.prompt
+        painter.drawText(
+            self._prompt_rect(option.rect),
+            Qt.TextFlag.TextWordWrap | Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+            prompt
+        )
+
+        if hovered:
+            self._paint_button(painter, self._export_rect(option.rect), "Export", QColor("#2a2a2a"), QColor("#e0e0e0"))
+            self._paint_button(painter, self._analyze_rect(option.rect), "Analyze", QColor("#3a7bc8"), QColor("white"))
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        """Route clicks on the overlay buttons and the thumbnail"""
+        if event.type() != QEvent.Type.MouseButtonRelease or event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        item = index.data(GalleryItemRole)
+        pos = event.position().toPoint()
+        if self._export_rect(option.rect).contains(pos):
+            self.export_clicked.emit(item)
+        elif self._analyze_rect(option.rect).contains(pos):
+            self.analyze_clicked.emit(item)
+        elif self._thumb_rect(option.rect).contains(pos):
+            self.preview_clicked.emit(item)
+        else:
+            return False
+        return True
+
+    def _cell_rect(self, rect: QRect) -> QRect:
+        """Cell bounds centred in the grid slot"""
+        return QRect(
+            rect.left() + (rect.width() - CELL_SIZE.width()) // 2,
+            rect.top() + (rect.height() - CELL_SIZE.height()) // 2,
+            CELL_SIZE.width(), CELL_SIZE.height()
+        )
+
+    def _thumb_rect(self, rect: QRect) -> QRect:
+        cell = self._cell_rect(rect)
+        return QRect(cell.left() + CELL_PADDING, cell.top() + CELL_PADDING, THUMB_SIZE, THUMB_SIZE)
+
+    def _prompt_rect(self, rect: QRect) -> QRect:
+        thumb = self._thumb_rect(rect)
+        return QRect(thumb.left(), thumb.bottom() + CELL_PADDING, THUMB_SIZE, PROMPT_HEIGHT)
+
+    def _export_rect(self, rect: QRect) -> QRect:
+        thumb = self._thumb_rect(rect)
+        width = (THUMB_SIZE - 3 * 4) // 2
+        return QRect(thumb.left() + 4, thumb.bottom() - BUTTON_HEIGHT - 4, width, BUTTON_HEIGHT)
+
+    def _analyze_rect(self, rect: QRect) -> QRect:
+        export = self._export_rect(rect)
+        return QRect(export.right() + 5, export.top(), export.width(), BUTTON_HEIGHT)
+
+    def _paint_button(self, painter: QPainter, rect: QRect, text: str, background: QColor, color: QColor):
+        """Draw an overlay button"""
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(rect), 4, 4)
+        painter.fillPath(path, background)
+        painter.setPen(color)
+        font = painter.font()
+        font.setPixelSize(12)
+        painter.setFont(font)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
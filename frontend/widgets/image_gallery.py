@@ -1,18 +1,56 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QScrollArea, QGridLayout,
-    QLabel, QFrame, QPushButton, QFileDialog, QHBoxLayout, QDialog, QApplication
+    QWidget, QVBoxLayout, QListView, QAbstractItemView,
+    QLabel, QPushButton, QFileDialog, QHBoxLayout, QDialog, QApplication,
+    QMenu
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QPixmap, QMouseEvent, QKeyEvent
+from PyQt6.QtCore import Qt, QObject, QPoint, QTimer, pyqtSignal
+from PyQt6.QtGui import QPixmap, QKeyEvent
+from dataclasses import dataclass
+from typing import List, Tuple
 import shutil
 from pathlib import Path
 
+from frontend.image_loader import load_pixmap, get_image_loader, PixmapCache, PREFETCH_PRIORITY
+from frontend.widgets.gallery_model import (
+    GalleryItem, GalleryModel, GalleryDelegate, GalleryItemRole, GRID_SIZE, THUMB_SIZE
+)
+
+# Memory budget for decoded thumbnails; cells scrolled away are reloaded lazily
+THUMBNAIL_CACHE_BYTES = 16 * 1024 * 1024
+
+
+@dataclass
+class GalleryState:
+    """Gallery images detached from the view, ready to be shown again"""
+    model: GalleryModel
+    scroll_value: int
+
+
+def export_image(parent: QWidget, image_path: str):
+    """Export an image to a user-selected location"""
+    file_name = Path(image_path).name
+    save_path, _ = QFileDialog.getSaveFileName(
+        parent,
+        "Export Tattoo Design",
+        file_name,
+        "PNG Files (*.png);;All Files (*)"
+    )
+    
+    if save_path:
+        try:
+            shutil.copy2(image_path, save_path)
+            print(f"Image exported to: {save_path}")
+        except Exception as e:
+            print(f"Error exporting image: {e}")
+
+
 class ImagePreviewDialog(QDialog):
     """Full-size image preview dialog"""
     
-    def __init__(self, image_path: str, prompt: str, parent=None):
+    def __init__(self, image_path: str, prompt: str, parent=None, preview_path: str = None):
         super().__init__(parent)
         self.image_path = image_path
+        self.preview_path = preview_path
         self.prompt = prompt
         self.init_ui()
     
@@ -59,20 +97,15 @@ class ImagePreviewDialog(QDialog):
             }
         """)
         
-        # Load and scale image
-        pixmap = QPixmap(self.image_path)
+        # Get screen size for reasonable max size
+        screen = QApplication.primaryScreen().geometry()
+        max_width = min(800, screen.width() - 100)
+        max_height = min(600, screen.height() - 200)
+        
+        # Load the large derivative, scaling only on small screens
+        pixmap = load_pixmap(self.preview_path, self.image_path, max_width, max_height)
         if not pixmap.isNull():
-            # Get screen size for reasonable max size
-            screen = QApplication.primaryScreen().geometry()
-            max_width = min(800, screen.width() - 100)
-            max_height = min(600, screen.height() - 200)
-            
-            scaled_pixmap = pixmap.scaled(
-                max_width, max_height,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
+            self.image_label.setPixmap(pixmap)
         
         layout.addWidget(self.image_label)
         
@@ -130,159 +163,20 @@ class ImagePreviewDialog(QDialog):
     
     def export_image(self):
         """Export image to user-selected location"""
-        file_name = Path(self.image_path).name
-        save_path, _ = QFileDialog.getSaveFileName(
-            self,
-            "Export Tattoo Design",
-            file_name,
-            "PNG Files (*.png);;All Files (*)"
-        )
-        
-        if save_path:
-            try:
-                shutil.copy2(self.image_path, save_path)
-                print(f"Image exported to: {save_path}")
-            except Exception as e:
-                print(f"Error exporting image: {e}")
-
-
-class ImageThumbnail(QFrame):
-    """Clickable image thumbnail with export and analyze functionality"""
-    clicked = pyqtSignal(str)
-    analyze_clicked = pyqtSignal(str, str)
-    
-    def __init__(self, image_path: str, prompt: str):
-        super().__init__()
-        self.image_path = image_path
-        self.prompt = prompt
-        self.init_ui()
-    
-    def init_ui(self):
-        """Initialize thumbnail UI"""
-        self.setFrameStyle(QFrame.Shape.Box)
-        self.setStyleSheet("""
-            QFrame {
-                border: 2px solid transparent;
-                border-radius: 8px;
-                background-color: #2a2a2a;
-                padding: 8px;
-            }
-            QFrame:hover {
-                border: 2px solid #3a7bc8;
-            }
-        """)
-        
-        layout = QVBoxLayout(self)
-        layout.setSpacing(6)
-        
-        # Load image
-        pixmap = QPixmap(self.image_path)
-        if not pixmap.isNull():
-            thumbnail = pixmap.scaled(
-                150, 150,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            
-            self.image_label = QLabel()
-            self.image_label.setPixmap(thumbnail)
-            self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.image_label.setCursor(Qt.CursorShape.PointingHandCursor)
-            layout.addWidget(self.image_label)  # Now this matches
-        
-        # Add prompt preview with larger font
-        prompt_label = QLabel(self.prompt[:50] + "..." if len(self.prompt) > 50 else self.prompt)
-        prompt_label.setWordWrap(True)
-        prompt_label.setStyleSheet("color: #e0e0e0; font-size: 13px; padding: 4px 0;")
-        prompt_label.setMaximumHeight(40)
-        layout.addWidget(prompt_label)
-        
-        # Button container
-        button_layout = QHBoxLayout()
-        button_layout.setSpacing(4)
-        
-        # Export button
-        export_btn = QPushButton("Export")
-        export_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2a2a2a;
-                border: 1px solid #3a3a3a;
-                color: #e0e0e0;
-                padding: 4px 8px;
-                border-radius: 4px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #3a3a3a;
-                border: 1px solid #4a4a4a;
-            }
-        """)
-        export_btn.clicked.connect(self.export_image)
-        button_layout.addWidget(export_btn)
-        
-        # Analyze button
-        analyze_btn = QPushButton("Analyze")
-        analyze_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #3a7bc8;
-                border: none;
-                color: white;
-                padding: 4px 8px;
-                border-radius: 4px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #4a8bd8;
-            }
-        """)
-        analyze_btn.clicked.connect(self.analyze_image)
-        button_layout.addWidget(analyze_btn)
-        
-        layout.addLayout(button_layout)
-        
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
-    
-    def mousePressEvent(self, event: QMouseEvent):
-        """Handle mouse click"""
-        if event.button() == Qt.MouseButton.LeftButton:
-            clicked_widget = self.childAt(event.position().toPoint())
-            
-            if clicked_widget == self.image_label:
-                self.show_preview()
-                
-    def show_preview(self):
-        """Show full-size image preview"""
-        preview_dialog = ImagePreviewDialog(self.image_path, self.prompt, self)
-        preview_dialog.exec()
-    
-    def export_image(self):
-        """Export image to user-selected location"""
-        file_name = Path(self.image_path).name
-        save_path, _ = QFileDialog.getSaveFileName(
-            self,
-            "Export Tattoo Design",
-            file_name,
-            "PNG Files (*.png);;All Files (*)"
-        )
-        
-        if save_path:
-            try:
-                shutil.copy2(self.image_path, save_path)
-                print(f"Image exported to: {save_path}")
-            except Exception as e:
-                print(f"Error exporting image: {e}")
-    
-    def analyze_image(self):
-        """Emit signal to analyze the image"""
-        self.analyze_clicked.emit(self.image_path, self.prompt)
+        export_image(self, self.image_path)
 
 
 class ImageGallery(QWidget):
-    image_analyze_requested = pyqtSignal(str, str)
+    image_analyze_requested = pyqtSignal(str, str, bool)
+    analyze_all_requested = pyqtSignal(bool)
     
     def __init__(self):
         super().__init__()
-        self.thumbnails = []
+        self._thumbnails = PixmapCache(THUMBNAIL_CACHE_BYTES)
+        self._requested = set()
+        # Speculative decodes have their own owner so view changes do not cancel them
+        self._prefetcher = QObject(self)
+        self._prefetching = set()
         self.init_ui()
     
     def init_ui(self):
@@ -294,48 +188,169 @@ class ImageGallery(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(12, 12, 12, 12)
         
-        # Title
+        # Title row with batch analysis controls
+        header_layout = QHBoxLayout()
         title = QLabel("Gallery")
         title.setStyleSheet("font-size: 16px; font-weight: 600; margin-bottom: 8px;")
-        layout.addWidget(title)
-        
-        # Scroll area
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setObjectName("galleryScroll")
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        header_layout.addWidget(title)
+        header_layout.addStretch()
         
-        # Grid container
-        self.grid_widget = QWidget()
-        self.grid_layout = QGridLayout(self.grid_widget)
-        self.grid_layout.setSpacing(8)
-        self.grid_layout.setContentsMargins(0, 0, 0, 0)
+        self.progress_label = QLabel()
+        self.progress_label.setStyleSheet("color: #888; font-size: 12px;")
+        self.progress_label.hide()
+        header_layout.addWidget(self.progress_label)
         
-        self.scroll_area.setWidget(self.grid_widget)
-        layout.addWidget(self.scroll_area)
-    
-    def add_image(self, image_path: str, prompt: str):
-        """Add an image to the gallery"""
-        thumbnail = ImageThumbnail(image_path, prompt)
-        thumbnail.analyze_clicked.connect(self.on_analyze_clicked)
+        self.analyze_all_btn = QPushButton("Analyze all")
+        self.analyze_all_btn.setStyleSheet("padding: 4px 10px; font-size: 12px;")
+        analyze_all_menu = QMenu(self.analyze_all_btn)
+        analyze_all_menu.addAction("This session", lambda: self.analyze_all_requested.emit(False))
+        analyze_all_menu.addAction("All sessions", lambda: self.analyze_all_requested.emit(True))
+        self.analyze_all_btn.setMenu(analyze_all_menu)
+        header_layout.addWidget(self.analyze_all_btn)
         
-        # Calculate position in grid - 2 columns layout
-        row = len(self.thumbnails) // 2
-        col = len(self.thumbnails) % 2
+        layout.addLayout(header_layout)
         
-        self.grid_layout.addWidget(thumbnail, row, col)
-        self.thumbnails.append(thumbnail)
+        # Icon grid; only visible cells are painted and decoded
+        self.model = GalleryModel()
+        self.delegate = GalleryDelegate(self._thumbnail_for, self)
+        self.delegate.preview_clicked.connect(self.show_preview)
+        self.delegate.export_clicked.connect(lambda item: export_image(self, item.image_path))
+        self.delegate.analyze_clicked.connect(lambda item: self.on_analyze_clicked(item.image_path, item.prompt))
         
-        # Update minimum size to ensure scrollability
-        self.grid_widget.setMinimumWidth(320)
+        self.list_view = QListView()
+        self.list_view.setObjectName("galleryScroll")
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setViewMode(QListView.ViewMode.IconMode)
+        self.list_view.setFlow(QListView.Flow.LeftToRight)
+        self.list_view.setWrapping(True)
+        self.list_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.list_view.setMovement(QListView.Movement.Static)
+        self.list_view.setGridSize(GRID_SIZE)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.list_view.verticalScrollBar().setSingleStep(24)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.list_view.setMouseTracking(True)
+        self.list_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self.show_context_menu)
+        layout.addWidget(self.list_view)
+    
+    def add_image(self, image_path: str, prompt: str, thumb_path: str = None, preview_path: str = None):
+        """Add an image to the gallery, using its pyramid derivatives if given"""
+        self.model.append(GalleryItem(image_path, prompt, thumb_path, preview_path))
+    
+    def set_image_derivatives(self, image_path: str, thumb_path: str, preview_path: str):
+        """Show derivatives built for an image that is already in the gallery"""
+        self.model.set_derivatives(image_path, thumb_path, preview_path)
     
     def clear(self):
         """Clear all images from gallery"""
-        for thumbnail in self.thumbnails:
-            thumbnail.deleteLater()
-        self.thumbnails.clear()
+        self._show_model(GalleryModel())
+    
+    def save_state(self) -> GalleryState:
+        """Detach the current images, leaving the gallery empty"""
+        state = GalleryState(self.model, self.list_view.verticalScrollBar().value())
+        self.clear()
+        return state
+    
+    def restore_state(self, state: GalleryState):
+        """Show images detached by save_state, at their old scroll position"""
+        self._show_model(state.model)
+        QTimer.singleShot(0, lambda: self.list_view.verticalScrollBar().setValue(state.scroll_value))
+    
+    def visible_capacity(self) -> int:
+        """Number of cells that fit in the gallery without scrolling"""
+        viewport = self.list_view.viewport().size()
+        columns = max(1, viewport.width() // GRID_SIZE.width())
+        rows = max(1, -(-viewport.height() // GRID_SIZE.height()))
+        return columns * rows
+    
+    def prefetch_thumbnails(self, images: List[Tuple[str, str]]):
+        """Decode (thumb_path, image_path) pairs into the cache at low priority"""
+        for thumb_path, image_path in images:
+            key = thumb_path or image_path
+            if key in self._requested or key in self._prefetching or self._thumbnails.get(key) is not None:
+                continue
+            self._prefetching.add(key)
+            get_image_loader().load(
+                self._prefetcher, thumb_path, image_path, THUMB_SIZE, THUMB_SIZE,
+                lambda image, key=key: self._on_thumbnail_decoded(key, image),
+                PREFETCH_PRIORITY
+            )
+    
+    def cancel_prefetch(self):
+        """Drop queued speculative decodes"""
+        get_image_loader().cancel(self._prefetcher)
+        self._prefetching.clear()
+        # Rows that were waiting on a cancelled decode request their own
+        self.list_view.viewport().update()
+    
+    def _show_model(self, model: GalleryModel):
+        """Swap the images shown by the view"""
+        get_image_loader().cancel(self)
+        self._requested.clear()
+        self.model = model
+        self.list_view.setModel(model)
     
-    def on_analyze_clicked(self, image_path: str, prompt: str):
+    def set_batch_progress(self, done: int, total: int):
+        """Show progress of the batch analysis queue"""
+        if total:
+            self.progress_label.setText(f"Analyzing {done}/{total}")
+            self.progress_label.show()
+        else:
+            self.progress_label.hide()
+    
+    def on_analyze_clicked(self, image_path: str, prompt: str, force: bool = False):
         """Handle analyze button click"""
-        self.image_analyze_requested.emit(image_path, prompt)
\ No newline at end of file
+        self.image_analyze_requested.emit(image_path, prompt, force)
+    
+    def show_context_menu(self, pos: QPoint):
+        """Offer analysis actions, including a re-analysis that skips the cache"""
+        index = self.list_view.indexAt(pos)
+        if not index.isValid():
+            return
+        item = index.data(GalleryItemRole)
+        
+        menu = QMenu(self)
+        preview_action = menu.addAction("Preview")
+        analyze_action = menu.addAction("Analyze")
+        reanalyze_action = menu.addAction("Re-analyze")
+        export_action = menu.addAction("Export")
+        
+        chosen = menu.exec(self.list_view.viewport().mapToGlobal(pos))
+        if chosen == preview_action:
+            self.show_preview(item)
+        elif chosen == analyze_action:
+            self.on_analyze_clicked(item.image_path, item.prompt)
+        elif chosen == reanalyze_action:
+            self.on_analyze_clicked(item.image_path, item.prompt, True)
+        elif chosen == export_action:
+            export_image(self, item.image_path)
+    
+    def show_preview(self, item: GalleryItem):
+        """Show full-size image preview"""
+        preview_dialog = ImagePreviewDialog(item.image_path, item.prompt, self, item.preview_path)
+        preview_dialog.exec()
+    
+    def _thumbnail_for(self, item: GalleryItem):
+        """Return a cell's thumbnail, starting a background decode if needed"""
+        key = item.thumb_path or item.image_path
+        pixmap = self._thumbnails.get(key)
+        if pixmap is not None:
+            return pixmap
+        
+        if key not in self._requested and key not in self._prefetching:
+            self._requested.add(key)
+            get_image_loader().load(
+                self, item.thumb_path, item.image_path, THUMB_SIZE, THUMB_SIZE,
+                lambda image, key=key: self._on_thumbnail_decoded(key, image)
+            )
+        return None
+    
+    def _on_thumbnail_decoded(self, key: str, image):
+        """Cache a decoded thumbnail and repaint the visible cells"""
+        self._requested.discard(key)
+        self._prefetching.discard(key)
+        self._thumbnails.put(key, QPixmap.fromImage(image))
+        self.list_view.viewport().update()
@@ -2,15 +2,23 @@ from PyQt6.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QTextEdit,
     QPushButton, QComboBox, QLabel
 )
-from PyQt6.QtCore import pyqtSignal, Qt
+from PyQt6.QtCore import pyqtSignal, Qt, QTimer
 from backend.models import ImageSize, ImageQuality
 
 class InputWidget(QWidget):
     generate_clicked = pyqtSignal(str, ImageSize, ImageQuality) 
+    prompt_idle = pyqtSignal(str)
     
-    def __init__(self):
+    def __init__(self, idle_debounce_ms: int = 700):
         super().__init__()
         self.init_ui()
+        
+        # Emit prompt_idle once typing pauses for the debounce interval
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(idle_debounce_ms)
+        self.idle_timer.timeout.connect(self.on_prompt_idle)
+        self.prompt_input.textChanged.connect(self.idle_timer.start)
     
     def init_ui(self):
         """Initialize the input widget UI"""
@@ -96,18 +104,22 @@ class InputWidget(QWidget):
         
         # Clear input
         self.prompt_input.clear()
+        self.idle_timer.stop()
         
         # Emit signal
         self.generate_clicked.emit(prompt, size, quality)
     
-    def set_loading(self, loading: bool):
-        """Set loading state"""
-        self.generate_btn.setEnabled(not loading)
-        self.prompt_input.setEnabled(not loading)
-        self.size_combo.setEnabled(not loading)
-        self.quality_combo.setEnabled(not loading)
-        
-        if loading:
-            self.generate_btn.setText("Generating...")
+    def on_prompt_idle(self):
+        """Handle a pause in typing"""
+        prompt = self.prompt_input.toPlainText().strip()
+        if prompt:
+            self.prompt_idle.emit(prompt)
+    
+    def set_active_jobs(self, count: int):
+        """Show how many generations are in progress without blocking input"""
+        if count:
+            self.generate_btn.setText(f"Generate ({count})")
+            self.generate_btn.setToolTip(f"{count} {'generation' if count == 1 else 'generations'} in progress")
         else:
-            self.generate_btn.setText("Generate")
\ No newline at end of file
+            self.generate_btn.setText("Generate")
+            self.generate_btn.setToolTip("")
@@ -0,0 +1,233 @@
+"""
+Model and delegate behind the ChatSidebar session list.
+
+SessionListModel holds sessions most recently updated first and pulls them
+from ChatService a page at a time as the view scrolls (canFetchMore /
+fetchMore). ChatService change events become single-row inserts, moves and
+removals, so the list is never rebuilt. SessionDelegate paints each row and
+its hover delete button in place of a widget per session.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, List
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, QRect, QRectF, QSize, pyqtSignal
+from PyQt6.QtGui import QColor, QCursor, QFontMetrics, QPainter, QPainterPath
+from PyQt6.QtWidgets import QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from backend.chat_service import ChatService
+from backend.models import ChatSession
+
+
+# Qt role exposing the ChatSession of a row
+SessionRole = Qt.ItemDataRole.UserRole + 1
+
+
+class SessionListModel(QAbstractListModel):
+    """Sessions, most recently updated first, fetched lazily from ChatService"""
+
+    def __init__(self, chat_service: ChatService, page_size: int = 100, parent=None):
+        super().__init__(parent)
+        self.chat_service = chat_service
+        self.page_size = page_size
+        self._sessions: List[ChatSession] = []
+        self._exhausted = False
+        self._fetch_task = None
+        # Deleted while a page was being fetched, so the page may still hold them
+        self._deleted = set()
+        chat_service.subscribe(self.on_session_changed)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._sessions)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        session = self._sessions[index.row()]
+        if role == SessionRole:
+            return session
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return session.name
+        if role == Qt.ItemDataRole.UserRole:
+            return session.id
+        return None
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if parent.isValid() or self.fetching():
+            return
+        self._fetch_task = asyncio.ensure_future(self._fetch_page())
+
+    def fetching(self) -> bool:
+        """Whether a page is being fetched"""
+        return self._fetch_task is not None and not self._fetch_task.done()
+
+    async def reload(self):
+        """Drop all rows and fetch the first page again"""
+        if self.fetching():
+            self._fetch_task.cancel()
+        self.beginResetModel()
+        self._sessions.clear()
+        self._deleted.clear()
+        self._exhausted = False
+        self.endResetModel()
+
+        self._fetch_task = asyncio.ensure_future(self._fetch_page())
+        await self._fetch_task
+
+    async def _fetch_page(self):
+        """Append the next page of sessions"""
+        after = self._sessions[-1] if self._sessions else None
+        sessions = await self.chat_service.get_sessions_page(self.page_size, after)
+        if len(sessions) < self.page_size:
+            self._exhausted = True
+
+        # Sessions moved to the top or deleted while the query ran are skipped
+        known = {session.id for session in self._sessions} | self._deleted
+        sessions = [session for session in sessions if session.id not in known]
+        self._deleted.clear()
+        if not sessions:
+            return
+
+        first = len(self._sessions)
+        self.beginInsertRows(QModelIndex(), first, first + len(sessions) - 1)
+        self._sessions.extend(sessions)
+        self.endInsertRows()
+
+    def add_session(self, session: ChatSession):
+        """Show a new or newly updated session at the top"""
+        if self.row_of(session.id) >= 0:
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._sessions.insert(0, session)
+        self.endInsertRows()
+
+    def remove_session(self, session_id: str):
+        """Remove a session's row"""
+        row = self.row_of(session_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._sessions[row]
+        self.endRemoveRows()
+
+    def touch_session(self, session_id: str) -> bool:
+        """Move an updated session to the top; False if it is not loaded"""
+        row = self.row_of(session_id)
+        if row < 0:
+            return False
+
+        self._sessions[row].updated_at = datetime.now()
+        if row > 0:
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), 0)
+            self._sessions.insert(0, self._sessions.pop(row))
+            self.endMoveRows()
+        return True
+
+    def row_of(self, session_id: str) -> int:
+        """Find a session's row, searching from the top where recent sessions live"""
+        for row, session in enumerate(self._sessions):
+            if session.id == session_id:
+                return row
+        return -1
+
+    def on_session_changed(self, event: str, session_id: str):
+        """Apply a ChatService change as a single-row update"""
+        if event == "session_deleted":
+            self._deleted.add(session_id)
+            self.remove_session(session_id)
+        elif event == "session_created" or (event == "message_added" and not self.touch_session(session_id)):
+            # Sessions not loaded yet become the most recent one
+            asyncio.ensure_future(self._insert_session(session_id))
+
+    async def _insert_session(self, session_id: str):
+        """Load a session and show it at the top"""
+        session = await self.chat_service.get_session(session_id)
+        if session is not None and session_id not in self._deleted:
+            self.add_session(session)
+
+
+# Row layout mirroring the sidebar styles
+ROW_HEIGHT = 50
+ROW_MARGIN_H = 8
+ROW_MARGIN_V = 4
+ROW_PADDING = 12
+DELETE_SIZE = 30
+
+
+class SessionDelegate(QStyledItemDelegate):
+    """Paints session rows and handles clicks on them and their delete button"""
+    session_clicked = pyqtSignal(str)
+    delete_clicked = pyqtSignal(str)
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        return QSize(option.rect.width(), ROW_HEIGHT + 2 * ROW_MARGIN_V)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        session = index.data(SessionRole)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        row = self._row_rect(option.rect)
+        if selected or hovered:
+            path = QPainterPath()
+            path.addRoundedRect(QRectF(row), 8, 8)
+            painter.fillPath(path, QColor("#3a3a3a" if selected else "#2a2a2a"))
+
+        # Name, elided to the space left of the delete button
+        text_rect = row.adjusted(ROW_PADDING, 0, -(ROW_PADDING + DELETE_SIZE + 8), 0)
+        metrics = QFontMetrics(option.font)
+        painter.setFont(option.font)
+        painter.setPen(QColor("#e0e0e0"))
+        painter.drawText(
+            text_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+            metrics.elidedText(session.name, Qt.TextElideMode.ElideRight, text_rect.width())
+        )
+
+        if hovered:
+            delete_rect = self._delete_rect(option.rect)
+            widget = option.widget
+            if widget is not None and delete_rect.contains(widget.viewport().mapFromGlobal(QCursor.pos())):
+                path = QPainterPath()
+                path.addRoundedRect(QRectF(delete_rect), 4, 4)
+                painter.fillPath(path, QColor("#ff4444"))
+            font = painter.font()
+            font.setPixelSize(16)
+            painter.setFont(font)
+            painter.setPen(QColor("#888"))
+            painter.drawText(delete_rect, Qt.AlignmentFlag.AlignCenter, "🗑️")
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        """Route clicks to the row or its delete button"""
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease):
+            return False
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        session_id = index.data(Qt.ItemDataRole.UserRole)
+        on_delete = self._delete_rect(option.rect).contains(event.position().toPoint())
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            if on_delete:
+                self.delete_clicked.emit(session_id)
+            else:
+                self.session_clicked.emit(session_id)
+        # Pressing the delete button must not select the row
+        return on_delete
+
+    def _row_rect(self, rect: QRect) -> QRect:
+        return rect.adjusted(ROW_MARGIN_H, ROW_MARGIN_V, -ROW_MARGIN_H, -ROW_MARGIN_V)
+
+    def _delete_rect(self, rect: QRect) -> QRect:
+        row = self._row_rect(rect)
+        return QRect(
+            row.right() - ROW_PADDING - DELETE_SIZE,
+            row.top() + (row.height() - DELETE_SIZE) // 2,
+            DELETE_SIZE, DELETE_SIZE
+        )
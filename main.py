@@ -5,6 +5,9 @@ from PyQt6.QtWidgets import QApplication, QMessageBox
 from qasync import QEventLoop, asyncSlot
 
 from frontend.main_window import MainWindow
+from backend.http_pool import HttpPool, OPENAI_BASE_URL, ANTHROPIC_BASE_URL
+from backend.fake_provider import FakeProviderServer
+from backend.workers import shutdown_process_pool
 from config import Config
 
 class TattooAIApp:
@@ -19,17 +22,35 @@ class TattooAIApp:
         # Load configuration
         self.config = Config()
         
+        # Serve both APIs locally when running offline
+        self.fake_provider = None
+        if self.config.offline_mode:
+            self.fake_provider = FakeProviderServer.from_config(self.config).start()
+            self.config.use_fake_provider(self.fake_provider)
+        
         # Validate API key
         if not self.config.openai_api_key:
             self.show_api_key_error()
             sys.exit(1)
         
+        # Shared HTTP connection pool for all API clients
+        self.http_pool = HttpPool.from_config(self.config)
+        
         # Create main window with both API keys
         self.window = MainWindow(
             self.config.openai_api_key,
-            self.config.anthropic_api_key
+            self.config.anthropic_api_key,
+            self.config,
+            self.http_pool
         )
         
+        # Open API connections before the first request needs them
+        if self.config.http_prewarm:
+            base_urls = [self.config.openai_base_url or OPENAI_BASE_URL]
+            if self.config.anthropic_api_key:
+                base_urls.append(self.config.anthropic_base_url or ANTHROPIC_BASE_URL)
+            self.http_pool.start_warm_up(base_urls)
+        
         # Make async slots work
         self._setup_async_handlers()
     
@@ -41,6 +62,7 @@ class TattooAIApp:
         original_on_new = self.window.on_new_session
         original_on_delete = self.window.on_session_deleted
         original_on_analyze = self.window.on_analyze_image
+        original_on_analyze_all = self.window.on_analyze_all
         
         @asyncSlot(str, object, object)
         async def async_generate(prompt, size, quality):
@@ -58,9 +80,13 @@ class TattooAIApp:
         async def async_delete(session_id):
             await original_on_delete(session_id)
         
-        @asyncSlot(str, str)
-        async def async_analyze(image_path, prompt):
-            await original_on_analyze(image_path, prompt)
+        @asyncSlot(str, str, bool)
+        async def async_analyze(image_path, prompt, force):
+            await original_on_analyze(image_path, prompt, force)
+        
+        @asyncSlot(bool)
+        async def async_analyze_all(all_sessions):
+            await original_on_analyze_all(all_sessions)
         
         # Replace with async versions
         self.window.input_widget.generate_clicked.disconnect()
@@ -77,6 +103,9 @@ class TattooAIApp:
         
         self.window.gallery.image_analyze_requested.disconnect()
         self.window.gallery.image_analyze_requested.connect(async_analyze)
+        
+        self.window.gallery.analyze_all_requested.disconnect()
+        self.window.gallery.analyze_all_requested.connect(async_analyze_all)
     
     def show_api_key_error(self):
         """Show error dialog for missing API key"""
@@ -96,8 +125,23 @@ class TattooAIApp:
         
         signal.signal(signal.SIGINT, signal.SIG_DFL)
         
-        with self.loop:
-            self.loop.run_forever()
+        try:
+            with self.loop:
+                self.loop.run_forever()
+                
+                # Stop background work and close pooled connections once the UI has exited
+                self.loop.run_until_complete(self.window.shutdown())
+                print(f"HTTP pool: {self.http_pool.stats()}")
+                print(f"Prompt enhancement: {self.window.openai_service.enhance_stats()}")
+                if self.window.mcp_server:
+                    print(f"Analysis usage: {self.window.mcp_server.usage_stats()}")
+                self.loop.run_until_complete(self.http_pool.aclose())
+        finally:
+            # Join the workers even if shutdown failed, so none outlives the app
+            shutdown_process_pool()
+            
+            if self.fake_provider:
+                self.fake_provider.stop()
 
 
 if __name__ == "__main__":
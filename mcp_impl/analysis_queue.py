@@ -0,0 +1,151 @@
+"""
+Persistent priority queue for tattoo analysis jobs.
+
+Jobs are stored in SQLite so a batch survives restarts, and are processed
+by a fixed number of worker tasks so large batches never flood the API.
+"""
+
+import asyncio
+import itertools
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from backend.chat_service import ChatService
+from backend.models import AnalysisJob, JobStatus
+
+# Lower numbers run first
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = 10
+
+
+class AnalysisJobQueue:
+    """Priority queue of analysis jobs with a bounded worker pool"""
+
+    def __init__(self, analyzer, chat_service: ChatService, concurrency: int = 2):
+        self.analyzer = analyzer
+        self.chat_service = chat_service
+        self.concurrency = concurrency
+
+        # Callbacks for the UI
+        self.on_progress: Optional[Callable[[int, int], None]] = None
+        self.on_job_finished: Optional[Callable[[AnalysisJob, Dict[str, Any]], None]] = None
+
+        self._queue: asyncio.PriorityQueue = None
+        self._order = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._queued: Set[Tuple[str, str]] = set()
+
+        # Progress of the current batch, reset once the queue drains
+        self._batch_total = 0
+        self._batch_done = 0
+
+    @property
+    def started(self) -> bool:
+        """Whether the workers are running"""
+        return bool(self._workers)
+
+    async def start(self):
+        """Restore unfinished jobs from the database and start the workers"""
+        if self._queue is not None:
+            return
+
+        self._queue = asyncio.PriorityQueue()
+        for job in await self.chat_service.get_unfinished_analysis_jobs():
+            # Jobs that were running when the app exited are retried
+            job.status = JobStatus.PENDING
+            self._put(job)
+
+        self._workers = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)
+        ]
+        self._report_progress()
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay persisted"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._queued.clear()
+        self._batch_done = self._batch_total = 0
+
+    async def submit(self, image_path: str, session_id: str, priority: int = INTERACTIVE_PRIORITY) -> Optional[AnalysisJob]:
+        """Queue an image for analysis unless it is already queued"""
+        if self._queue is None:
+            await self.start()
+        if (session_id, image_path) in self._queued:
+            return None
+
+        job = await self.chat_service.create_analysis_job(image_path, session_id, priority)
+        self._put(job)
+        self._report_progress()
+        return job
+
+    async def submit_session(self, session_id: str, priority: int = BATCH_PRIORITY, force: bool = False) -> int:
+        """Queue every image of a session, returning the number of new jobs.
+
+        Images that already have an analysis are skipped unless force is set,
+        since each run adds another analysis message to the session.
+        """
+        images = await self.chat_service.get_session_images(session_id)
+        analyzed = set() if force else await self.chat_service.get_analyzed_image_paths(session_id)
+
+        submitted = 0
+        for image in reversed(images):
+            if image.image_path in analyzed:
+                continue
+            if await self.submit(image.image_path, session_id, priority):
+                submitted += 1
+        return submitted
+
+    async def submit_all_sessions(self, priority: int = BATCH_PRIORITY, force: bool = False) -> int:
+        """Queue every image in every session, returning the number of new jobs"""
+        submitted = 0
+        for session in await self.chat_service.get_all_sessions():
+            submitted += await self.submit_session(session.id, priority, force)
+        return submitted
+
+    def progress(self) -> Tuple[int, int]:
+        """Return (done, total) for the current batch"""
+        return self._batch_done, self._batch_total
+
+    def _put(self, job: AnalysisJob):
+        """Add a job to the in-memory queue"""
+        self._queued.add((job.chat_session_id, job.image_path))
+        self._batch_total += 1
+        self._queue.put_nowait((job.priority, next(self._order), job))
+
+    async def _worker(self):
+        """Process jobs until cancelled"""
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queued.discard((job.chat_session_id, job.image_path))
+                self._batch_done += 1
+                if self._batch_done >= self._batch_total:
+                    self._batch_done = self._batch_total = 0
+                self._report_progress()
+                self._queue.task_done()
+
+    async def _run_job(self, job: AnalysisJob):
+        """Analyze one image and record the outcome"""
+        job.status = JobStatus.RUNNING
+        await self.chat_service.update_analysis_job(job.id, job.status)
+
+        result = await self.analyzer._analyze_tattoo(job.image_path, job.chat_session_id)
+        if result["status"] == "success":
+            job.status = JobStatus.DONE
+        else:
+            job.status = JobStatus.FAILED
+            job.error = result.get("error")
+        await self.chat_service.update_analysis_job(job.id, job.status, job.error)
+
+        if self.on_job_finished:
+            self.on_job_finished(job, result)
+
+    def _report_progress(self):
+        """Notify the UI of batch progress"""
+        if self.on_progress:
+            self.on_progress(self._batch_done, self._batch_total)
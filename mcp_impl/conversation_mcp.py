@@ -1,127 +1,225 @@
 """
 MCP (Model Context Protocol) Integration for Tattoo Analysis
 
-This module provides MCP server functionality to analyze tattoo images
-using Claude API and return meaningful interpretations.
+This module provides the tattoo analysis behind the MCP tools, using the
+Claude API to return meaningful interpretations. The stdio server that
+exposes it to other processes lives in mcp_impl/server.py.
 """
 
 import asyncio
-import base64
-from typing import List, Dict, Any
+import uuid
+from typing import Dict, Any, AsyncIterator, Callable, Optional
 from datetime import datetime
 from pathlib import Path
 import anthropic
+import httpx
 from backend.chat_service import ChatService
+from backend.models import TattooAnalysis
+from backend.analysis_parser import FacetsStripper, parse_analysis
+from backend.single_flight import SingleFlight, fingerprint, hash_file
+from backend.image_processing import prepare_vision_image
+from mcp_impl.analysis_queue import AnalysisJobQueue
 
-try:
-    from mcp.server import Server
-    from mcp.server.stdio import stdio_server
-    MCP_AVAILABLE = True
-except ImportError:
-    MCP_AVAILABLE = False
-    print("MCP not installed. Install with: pip install mcp")
+ANALYSIS_MODEL = "claude-3-haiku-20240307"
+
+# Static instructions sent as the system prompt. They are not marked for
+# prompt caching: at roughly 220 tokens they are far below the model's
+# minimum cacheable prefix, and padding them out to it would cost more in
+# cache writes than the reads would save.
+ANALYSIS_SYSTEM = """You are an expert tattoo artist and art historian. When shown a tattoo design, analyze it and provide insights on:
+
+1. **Symbolism & Meaning**: What symbols, elements, or themes are present? What might they represent?
+2. **Artistic Style**: What tattoo style is this (traditional, neo-traditional, realism, etc.)?
+3. **Cultural Significance**: Are there any cultural or historical references?
+4. **Design Elements**: Describe the composition, use of space, and artistic techniques.
+5. **Personal Interpretation**: What emotions or stories might this tattoo convey?
+
+Provide a thoughtful, detailed analysis that would help someone understand the depth and artistry of the tattoo.
+
+Use the five headings above exactly. After the analysis, add one final line in this format:
+<facets>{"style": "<primary tattoo style, e.g. neo-traditional>", "key_symbols": ["<symbol>", ...]}</facets>"""
+
+ANALYSIS_PROMPT = "Please analyze this tattoo design."
+
+# Cached analyses are only reused while the model and prompts are unchanged
+ANALYSIS_VERSION = fingerprint(ANALYSIS_MODEL, ANALYSIS_SYSTEM, ANALYSIS_PROMPT)[:16]
+
+# Usage fields reported by the messages API, summed in usage_stats()
+USAGE_FIELDS = (
+    "input_tokens", "output_tokens",
+    "cache_creation_input_tokens", "cache_read_input_tokens"
+)
 
 class TattooAnalysisMCP:
-    def __init__(self, chat_service: ChatService, anthropic_api_key: str):
+    def __init__(
+        self,
+        chat_service: ChatService,
+        anthropic_api_key: str,
+        http_client: httpx.AsyncClient = None,
+        base_url: str = None,
+        vision_cache_dir: str = "data/cache/vision",
+        analysis_workers: int = 2
+    ):
         self.chat_service = chat_service
-        self.anthropic_client = anthropic.Anthropic(api_key=anthropic_api_key)
-        self.analysis_queue = asyncio.Queue()
+        self.vision_cache_dir = Path(vision_cache_dir)
+        self.anthropic_client = anthropic.AsyncAnthropic(
+            api_key=anthropic_api_key,
+            base_url=base_url,
+            http_client=http_client
+        )
+        self.analysis_queue = AnalysisJobQueue(self, chat_service, analysis_workers)
+        self._in_flight = SingleFlight()
+        self._usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self._requests = 0
+    
+    async def _analyze_tattoo(self, image_path: str, session_id: str, force: bool = False) -> Dict[str, Any]:
+        """Analyze a tattoo image, sharing the call with identical in-flight requests"""
+        try:
+            image_hash = await self._hash_image(image_path)
+        except OSError as e:
+            return {
+                "status": "error",
+                "error": f"Failed to analyze tattoo: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            }
         
-        if not MCP_AVAILABLE:
-            self.server = None
-            return
-            
-        self.server = Server("tattoo-analysis-mcp")
+        key = fingerprint("analyze", session_id, image_hash, force)
+        return await self._in_flight.do(
+            key, lambda: self._run_analysis(image_path, session_id, image_hash, force=force)
+        )
+    
+    async def stream_analysis(self, image_path: str, session_id: str, force: bool = False) -> AsyncIterator[str]:
+        """Yield analysis text deltas as Claude produces them.
+
+        The full analysis is persisted once the stream completes. When an
+        identical analysis is already running, its final text is yielded as a
+        single chunk instead. Raises an exception if the analysis fails.
+        """
+        image_hash = await self._hash_image(image_path)
+        key = fingerprint("analyze", session_id, image_hash, force)
+        deltas = asyncio.Queue()
+        result_task = asyncio.ensure_future(self._in_flight.do(
+            key, lambda: self._run_analysis(
+                image_path, session_id, image_hash, deltas.put_nowait, force
+            )
+        ))
         
-        # Register handlers
-        self.server.list_tools = self.list_tools
-        self.server.call_tool = self.call_tool
+        streamed = False
+        next_delta = None
+        try:
+            while True:
+                next_delta = asyncio.ensure_future(deltas.get())
+                await asyncio.wait({next_delta, result_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_delta.done():
+                    next_delta.cancel()
+                    break
+                streamed = True
+                yield next_delta.result()
+            
+            while not deltas.empty():
+                streamed = True
+                yield deltas.get_nowait()
+            
+            result = result_task.result()
+            if result["status"] != "success":
+                raise Exception(result.get("error", "Unknown error"))
+            if not streamed:
+                yield result["analysis"]
+        finally:
+            # Cancelling the stream abandons the request along with the pending read
+            if next_delta is not None and not next_delta.done():
+                next_delta.cancel()
+            if not result_task.done():
+                result_task.cancel()
     
-    async def list_tools(self) -> List[Dict[str, Any]]:
-        """List available MCP tools"""
-        return [
-            {
-                "name": "analyze_tattoo",
-                "description": "Analyze a tattoo image to understand its meaning, symbolism, and artistic style",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "image_path": {
-                            "type": "string",
-                            "description": "Path to the tattoo image file"
+    async def _hash_image(self, image_path: str) -> str:
+        """Hash an image file's content off the event loop"""
+        return await asyncio.get_event_loop().run_in_executor(
+            None, hash_file, image_path
+        )
+    
+    def _build_analysis_request(self, image_data: str, media_type: str) -> Dict[str, Any]:
+        """Build the Claude messages request for an encoded image"""
+        return {
+            "model": ANALYSIS_MODEL,
+            "max_tokens": 1000,
+            "system": ANALYSIS_SYSTEM,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": media_type,
+                                "data": image_data
+                            }
                         },
-                        "session_id": {
-                            "type": "string",
-                            "description": "Chat session ID to add the analysis to"
+                        {
+                            "type": "text",
+                            "text": ANALYSIS_PROMPT
                         }
-                    },
-                    "required": ["image_path", "session_id"]
+                    ]
                 }
-            }
-        ]
-    
-    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
-        """Handle tool calls"""
-        if name == "analyze_tattoo":
-            image_path = arguments.get("image_path")
-            session_id = arguments.get("session_id")
-            return await self._analyze_tattoo(image_path, session_id)
-        else:
-            raise ValueError(f"Unknown tool: {name}")
+            ]
+        }
     
-    async def _analyze_tattoo(self, image_path: str, session_id: str) -> Dict[str, Any]:
-        """Analyze a tattoo image using Claude"""
-        try:
-            # Read and encode the image
-            image_data = await self._encode_image(image_path)
-            
-            # Create the analysis prompt
-            prompt = """Please analyze this tattoo design and provide insights on:
-
-            1. **Symbolism & Meaning**: What symbols, elements, or themes are present? What might they represent?
-            2. **Artistic Style**: What tattoo style is this (traditional, neo-traditional, realism, etc.)?
-            3. **Cultural Significance**: Are there any cultural or historical references?
-            4. **Design Elements**: Describe the composition, use of space, and artistic techniques.
-            5. **Personal Interpretation**: What emotions or stories might this tattoo convey?
+    async def _run_analysis(
+        self,
+        image_path: str,
+        session_id: str,
+        image_hash: str,
+        on_delta: Optional[Callable[[str], None]] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """Analyze a tattoo image using Claude, streaming deltas to on_delta if given.
 
-            Please provide a thoughtful, detailed analysis that would help someone understand the depth and artistry of this tattoo."""
-
-            # Call Claude API
-            response = self.anthropic_client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=1000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/png",
-                                    "data": image_data
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ]
-            )
+        A cached analysis of the same image content is reused unless force is set.
+        The structured sections and facets are stored in tattoo_analyses.
+        """
+        try:
+            raw_text = None
+            if not force:
+                raw_text = await self.chat_service.get_cached_analysis(image_hash, ANALYSIS_VERSION)
+            cached = raw_text is not None
             
-            analysis_text = response.content[0].text
+            if cached:
+                parsed = parse_analysis(raw_text)
+                if on_delta:
+                    on_delta(parsed["display_text"])
+            else:
+                # Users only see the prose; the facets block is withheld
+                stripper = FacetsStripper(on_delta) if on_delta else None
+                raw_text = await self._request_analysis(
+                    image_path, image_hash, stripper.feed if stripper else None
+                )
+                await self.chat_service.save_cached_analysis(image_hash, ANALYSIS_VERSION, raw_text)
+                parsed = parse_analysis(raw_text)
             
-            # Add analysis to chat
-            await self.chat_service.add_message(
-                session_id,
-                f"🔍 Tattoo Analysis:\n\n{analysis_text}"
-            )
+            # The analysis and its chat message are committed together; once
+            # the commit starts, cancelling the analysis no longer stops it
+            await asyncio.shield(self.chat_service.save_analysis(TattooAnalysis(
+                id=str(uuid.uuid4()),
+                chat_session_id=session_id,
+                image_path=image_path,
+                image_hash=image_hash,
+                style=parsed["style"],
+                key_symbols=parsed["key_symbols"],
+                symbolism=parsed["symbolism"],
+                artistic_style=parsed["artistic_style"],
+                cultural_significance=parsed["cultural_significance"],
+                design_elements=parsed["design_elements"],
+                interpretation=parsed["interpretation"],
+                created_at=datetime.now()
+            ), f"🔍 Tattoo Analysis:\n\n{parsed['display_text']}"))
             
             return {
                 "status": "success",
-                "analysis": analysis_text,
+                "analysis": parsed["display_text"],
+                "style": parsed["style"],
+                "key_symbols": parsed["key_symbols"],
+                "cached": cached,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -133,23 +231,46 @@ class TattooAnalysisMCP:
                 "timestamp": datetime.now().isoformat()
             }
     
-    async def _encode_image(self, image_path: str) -> str:
-        """Encode image to base64"""
-        path = Path(image_path)
-        if not path.exists():
-            raise FileNotFoundError(f"Image not found: {image_path}")
+    async def _request_analysis(
+        self,
+        image_path: str,
+        image_hash: str,
+        on_delta: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Call Claude for an analysis, streaming deltas to on_delta if given"""
+        # Downscale and encode the image for upload
+        media_type, image_data = await prepare_vision_image(
+            image_path, image_hash, self.vision_cache_dir
+        )
+        request = self._build_analysis_request(image_data, media_type)
+        
+        # Call Claude API
+        if on_delta:
+            async with self.anthropic_client.messages.stream(**request) as stream:
+                async for text in stream.text_stream:
+                    on_delta(text)
+                response = await stream.get_final_message()
+        else:
+            response = await self.anthropic_client.messages.create(**request)
         
-        with open(path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+        self._record_usage(response.usage)
+        return response.content[0].text
     
-    async def run_server(self):
-        """Run the MCP server"""
-        if not self.server:
-            print("MCP not available")
-            return
-            
-        async with stdio_server() as (read, write):
-            await self.server.run(read, write)
+    def _record_usage(self, usage):
+        """Add a response's token usage, including any prompt cache reads and writes"""
+        self._requests += 1
+        for field in USAGE_FIELDS:
+            self._usage[field] += getattr(usage, field, None) or 0
+    
+    def usage_stats(self) -> Dict[str, Any]:
+        """Return token usage totals for diagnostics"""
+        cached = self._usage["cache_read_input_tokens"]
+        prompt_total = cached + self._usage["input_tokens"] + self._usage["cache_creation_input_tokens"]
+        return dict(
+            self._usage,
+            requests=self._requests,
+            cache_hit_ratio=round(cached / prompt_total, 3) if prompt_total else 0.0
+        )
 
 class MCPClient:
     """Client to communicate with the MCP server"""
@@ -157,25 +278,10 @@ class MCPClient:
     def __init__(self, mcp_server: TattooAnalysisMCP):
         self.mcp_server = mcp_server
     
-    async def analyze_image(self, image_path: str, session_id: str) -> Dict[str, Any]:
-        """Request image analysis from MCP server"""
-        if not self.mcp_server.server:
-            # Direct call if MCP is not available
-            return await self.mcp_server._analyze_tattoo(image_path, session_id)
-        
-        # Call through MCP protocol
-        return await self.mcp_server.call_tool("analyze_tattoo", {
-            "image_path": image_path,
-            "session_id": session_id
-        })
-
-def run_mcp_server_thread(chat_service: ChatService, anthropic_api_key: str):
-    """Run MCP server in a separate thread"""
-    async def run():
-        mcp = TattooAnalysisMCP(chat_service, anthropic_api_key)
-        await mcp.run_server()
+    async def analyze_image(self, image_path: str, session_id: str, force: bool = False) -> Dict[str, Any]:
+        """Request image analysis in-process; other processes use mcp_impl.server"""
+        return await self.mcp_server._analyze_tattoo(image_path, session_id, force)
     
-    # Create new event loop for the thread
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(run())
\ No newline at end of file
+    def stream_analysis(self, image_path: str, session_id: str, force: bool = False) -> AsyncIterator[str]:
+        """Stream image analysis text as it is generated"""
+        return self.mcp_server.stream_analysis(image_path, session_id, force)
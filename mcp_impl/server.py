@@ -0,0 +1,359 @@
+"""
+Standalone MCP server for InkForge.
+
+Runs as its own process over stdio and exposes the tattoo store to MCP
+clients: analysis, generation, session listing, session timelines and
+search. It opens the same SQLite database as the GUI; WAL mode lets both
+processes read while the other writes.
+
+Run with:  python -m mcp_impl.server
+"""
+
+import asyncio
+import io
+import json
+import sys
+from typing import Any, Dict
+
+from backend.chat_service import ChatService
+from backend.openai_service import OpenAIService
+from backend.models import ImageSize, ImageQuality
+from backend.http_pool import HttpPool
+from backend.fake_provider import FakeProviderServer
+from backend.workers import shutdown_process_pool
+from mcp_impl.conversation_mcp import TattooAnalysisMCP
+from config import Config
+
+try:
+    import anyio
+    import mcp.types as types
+    from mcp.server import Server
+    from mcp.server.stdio import stdio_server
+    MCP_AVAILABLE = True
+except ImportError:
+    MCP_AVAILABLE = False
+
+TOOLS = [
+    {
+        "name": "analyze_tattoo",
+        "description": "Analyze a tattoo image to understand its meaning, symbolism, and artistic style",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "image_path": {"type": "string", "description": "Path to the tattoo image file"},
+                "session_id": {"type": "string", "description": "Chat session ID to add the analysis to"},
+                "force": {"type": "boolean", "description": "Re-analyze even if a cached analysis exists"}
+            },
+            "required": ["image_path", "session_id"]
+        }
+    },
+    {
+        "name": "generate_tattoo",
+        "description": "Generate a tattoo design with DALL-E 3, using the session's earlier prompts as context",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "prompt": {"type": "string", "description": "Description of the tattoo"},
+                "session_id": {"type": "string", "description": "Chat session ID; a new session is created if omitted"},
+                "size": {"type": "string", "enum": [s.value for s in ImageSize]},
+                "quality": {"type": "string", "enum": [q.value for q in ImageQuality]}
+            },
+            "required": ["prompt"]
+        }
+    },
+    {
+        "name": "list_sessions",
+        "description": "List chat sessions, most recently updated first",
+        "inputSchema": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "get_session_timeline",
+        "description": "Get a session's messages and generated images in chronological order",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "session_id": {"type": "string", "description": "Chat session ID"}
+            },
+            "required": ["session_id"]
+        }
+    },
+    {
+        "name": "search",
+        "description": "Search messages by text, or analyzed designs by style or key symbol, across all sessions",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Text to find in messages and prompts"},
+                "style": {"type": "string", "description": "Tattoo style, e.g. neo-traditional"},
+                "symbol": {"type": "string", "description": "Key symbol, e.g. wolf"},
+                "limit": {"type": "integer", "description": "Maximum number of messages to return"}
+            }
+        }
+    }
+]
+
+# Python types accepted for each JSON schema type (bool is not an integer here)
+_SCHEMA_TYPES = {"string": str, "boolean": bool, "integer": int, "object": dict}
+
+
+def validate_arguments(tool: Dict[str, Any], arguments: Dict[str, Any]):
+    """Check tool arguments against its input schema, raising ValueError"""
+    schema = tool["inputSchema"]
+    properties = schema.get("properties", {})
+
+    missing = [name for name in schema.get("required", []) if name not in arguments]
+    if missing:
+        raise ValueError(f"{tool['name']}: missing required argument(s): {', '.join(missing)}")
+
+    for name, value in arguments.items():
+        spec = properties.get(name)
+        if spec is None:
+            raise ValueError(f"{tool['name']}: unexpected argument: {name}")
+        expected = _SCHEMA_TYPES[spec["type"]]
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"{tool['name']}: {name} must be of type {spec['type']}")
+        if "enum" in spec and value not in spec["enum"]:
+            raise ValueError(f"{tool['name']}: {name} must be one of {', '.join(spec['enum'])}")
+
+
+class TattooMCPServer:
+    """MCP tool handlers over the chat store and the AI services"""
+
+    def __init__(
+        self,
+        chat_service: ChatService,
+        openai_service: OpenAIService,
+        analyzer: TattooAnalysisMCP = None
+    ):
+        self.chat_service = chat_service
+        self.openai_service = openai_service
+        self.analyzer = analyzer
+        self._handlers = {
+            "analyze_tattoo": self.analyze_tattoo,
+            "generate_tattoo": self.generate_tattoo,
+            "list_sessions": self.list_sessions,
+            "get_session_timeline": self.get_session_timeline,
+            "search": self.search
+        }
+
+    def build_server(self) -> "Server":
+        """Create an MCP server exposing the tools"""
+        async def list_tools(ctx, params) -> types.ListToolsResult:
+            return types.ListToolsResult(
+                tools=[types.Tool(**tool) for tool in TOOLS if tool["name"] in self._handlers]
+            )
+
+        async def call_tool(ctx, params: types.CallToolRequestParams) -> types.CallToolResult:
+            try:
+                result = await self.call_tool(params.name, params.arguments or {})
+            except ValueError as e:
+                return types.CallToolResult(
+                    content=[types.TextContent(type="text", text=str(e))],
+                    is_error=True
+                )
+            return types.CallToolResult(
+                content=[types.TextContent(type="text", text=json.dumps(result, default=str))]
+            )
+
+        return Server("inkforge", on_list_tools=list_tools, on_call_tool=call_tool)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a tool call to its handler"""
+        handler = self._handlers.get(name)
+        if handler is None:
+            raise ValueError(f"Unknown tool: {name}")
+        validate_arguments(next(tool for tool in TOOLS if tool["name"] == name), arguments)
+        return await handler(**arguments)
+
+    async def analyze_tattoo(self, image_path: str, session_id: str, force: bool = False) -> Dict[str, Any]:
+        """Analyze an image and add the analysis to its session"""
+        if not self.analyzer:
+            return {"status": "error", "error": "Image analysis is not available. Please set ANTHROPIC_API_KEY."}
+        return await self.analyzer._analyze_tattoo(image_path, session_id, force)
+
+    async def generate_tattoo(
+        self,
+        prompt: str,
+        session_id: str = None,
+        size: str = ImageSize.SQUARE_1024.value,
+        quality: str = ImageQuality.STANDARD.value
+    ) -> Dict[str, Any]:
+        """Generate a design and record it in the session like the GUI does"""
+        if not session_id:
+            session = await self.chat_service.create_session(f"Session {prompt[:20]}...")
+            session_id = session.id
+
+        await self.chat_service.add_message(session_id, prompt)
+        messages = await self.chat_service.get_session_messages(session_id)
+        conversation_history = [
+            {"role": "user", "content": msg.content}
+            for msg in messages[:-1] if not msg.image_id
+        ]
+
+        try:
+            image = await self.openai_service.generate_tattoo(
+                prompt, ImageSize(size), ImageQuality(quality), session_id, conversation_history
+            )
+        except Exception as e:
+            return {"status": "error", "session_id": session_id, "error": str(e)}
+
+        await self.chat_service.save_generated_image(image, f"Generated tattoo: {prompt}")
+
+        return {
+            "status": "success",
+            "session_id": session_id,
+            "image_id": image.id,
+            "image_path": image.image_path
+        }
+
+    async def list_sessions(self) -> Dict[str, Any]:
+        """List all sessions"""
+        sessions = await self.chat_service.get_all_sessions()
+        return {
+            "sessions": [
+                {
+                    "id": session.id,
+                    "name": session.name,
+                    "created_at": session.created_at.isoformat(),
+                    "updated_at": session.updated_at.isoformat()
+                }
+                for session in sessions
+            ]
+        }
+
+    async def get_session_timeline(self, session_id: str) -> Dict[str, Any]:
+        """Return a session's messages with their images attached"""
+        messages, images = await asyncio.gather(
+            self.chat_service.get_session_messages(session_id),
+            self.chat_service.get_session_images(session_id)
+        )
+        image_map = {image.id: image for image in images}
+
+        timeline = []
+        for message in messages:
+            entry = {
+                "id": message.id,
+                "content": message.content,
+                "created_at": message.created_at.isoformat()
+            }
+            image = image_map.get(message.image_id)
+            if image:
+                entry["image"] = {
+                    "id": image.id,
+                    "prompt": image.prompt,
+                    "image_path": image.image_path,
+                    "size": image.size.value,
+                    "quality": image.quality.value
+                }
+            timeline.append(entry)
+
+        return {"session_id": session_id, "timeline": timeline}
+
+    async def search(self, query: str = None, style: str = None, symbol: str = None, limit: int = 50) -> Dict[str, Any]:
+        """Search messages by text and analyses by style or symbol"""
+        results: Dict[str, Any] = {}
+
+        if query:
+            messages = await self.chat_service.search_messages(query, limit)
+            results["messages"] = [
+                {
+                    "id": msg.id,
+                    "session_id": msg.chat_session_id,
+                    "content": msg.content,
+                    "created_at": msg.created_at.isoformat()
+                }
+                for msg in messages
+            ]
+
+        analyses = []
+        if style:
+            analyses += await self.chat_service.find_analyses_by_style(style)
+        if symbol:
+            found = await self.chat_service.find_analyses_by_symbol(symbol)
+            if style:
+                # Both filters given: keep designs matching both
+                ids = {a.id for a in analyses}
+                analyses = [a for a in found if a.id in ids]
+            else:
+                analyses = found
+        if style or symbol:
+            results["analyses"] = [
+                {
+                    "id": a.id,
+                    "session_id": a.chat_session_id,
+                    "image_path": a.image_path,
+                    "style": a.style,
+                    "key_symbols": a.key_symbols,
+                    "created_at": a.created_at.isoformat()
+                }
+                for a in analyses
+            ]
+
+        return results
+
+
+async def serve(config: Config, stdout=None):
+    """Run the MCP server over stdio until the client disconnects"""
+    fake_provider = None
+    if config.offline_mode:
+        fake_provider = FakeProviderServer.from_config(config).start()
+        config.use_fake_provider(fake_provider)
+
+    http_pool = HttpPool.from_config(config)
+    chat_service = ChatService(str(config.db_path))
+    openai_service = OpenAIService(
+        config.openai_api_key,
+        enhance_budget_ms=config.enhance_budget_ms,
+        enhance_policy=config.enhance_policy,
+        http_client=http_pool.async_client,
+        base_url=config.openai_base_url
+    )
+    analyzer = None
+    if config.anthropic_api_key:
+        analyzer = TattooAnalysisMCP(
+            chat_service,
+            config.anthropic_api_key,
+            http_client=http_pool.async_client,
+            base_url=config.anthropic_base_url
+        )
+
+    server = TattooMCPServer(chat_service, openai_service, analyzer).build_server()
+    try:
+        async with stdio_server(stdout=stdout) as (read, write):
+            await server.run(read, write, server.create_initialization_options())
+    finally:
+        print(f"HTTP pool: {http_pool.stats()}")
+        print(f"Prompt enhancement: {openai_service.enhance_stats()}")
+        if analyzer:
+            print(f"Analysis usage: {analyzer.usage_stats()}")
+        try:
+            await http_pool.aclose()
+        finally:
+            # Join the workers before exit, so none outlives the server
+            shutdown_process_pool()
+            if fake_provider:
+                fake_provider.stop()
+
+
+def main():
+    """Entry point for python -m mcp_impl.server"""
+    if not MCP_AVAILABLE:
+        print("MCP not installed. Install with: pip install mcp", file=sys.stderr)
+        sys.exit(1)
+
+    # stdout carries the protocol; send stray prints to stderr instead
+    protocol_out = anyio.wrap_file(io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8"))
+    sys.stdout = sys.stderr
+
+    config = Config()
+    try:
+        config.validate()
+    except ValueError as e:
+        print(f"Configuration error: {e}")
+        sys.exit(1)
+
+    asyncio.run(serve(config, protocol_out))
+
+
+if __name__ == "__main__":
+    main()
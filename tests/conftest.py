@@ -0,0 +1,93 @@
+"""
+Shared fixtures: every test runs in its own data directory against the
+offline stand-in provider, and Qt runs on the offscreen platform.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from backend.fake_provider import FakeProviderServer  # noqa: E402
+from config import Config  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run the test from an empty directory, so data/ is created there"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_provider(data_dir):
+    """A running stand-in for the OpenAI and Anthropic APIs"""
+    server = FakeProviderServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def offline_config(fake_provider):
+    """Configuration pointing both API clients at the fake provider"""
+    config = Config()
+    config.offline_mode = True
+    config.http_prewarm = False
+    config.cassette_mode = "off"
+    config.validate()
+    config.use_fake_provider(fake_provider)
+    return config
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """The QApplication shared by all GUI tests"""
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    yield app
+
+
+@pytest.fixture
+def qt_loop(qapp):
+    """A qasync event loop driving Qt; call run(coro) to run a coroutine on it"""
+    from qasync import QEventLoop
+    loop = QEventLoop(qapp)
+    asyncio.set_event_loop(loop)
+    yield loop.run_until_complete
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+@pytest.fixture(autouse=True)
+def process_pool():
+    """Shut down the image processing pool after each test, so no worker
+    outlives the test (and working directory) it was started for"""
+    yield
+    from backend.workers import shutdown_process_pool
+    shutdown_process_pool()
+
+
+@pytest.fixture
+def main_window(offline_config, qt_loop):
+    """The main window wired to the fake provider, without image analysis"""
+    from frontend.main_window import MainWindow
+    window = MainWindow(offline_config.openai_api_key, None, offline_config)
+    window.show()
+    yield window
+    close_window(window, qt_loop)
+
+
+def close_window(window, qt_loop):
+    """Shut a window down and delete it, so none of its timers fire later"""
+    from PyQt6.QtCore import QCoreApplication, QEvent
+    qt_loop(window.shutdown())
+    qt_loop(window.http_pool.aclose())
+    window.close()
+    window.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
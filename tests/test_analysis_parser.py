@@ -0,0 +1,41 @@
+"""Parsing of analysis text and its facets block."""
+
+import json
+
+import pytest
+
+from backend.analysis_parser import parse_analysis
+
+ANALYSIS = (
+    "**Symbolism & Meaning**: A wolf for loyalty.\n\n"
+    "**Artistic Style**: Blackwork with heavy fills.\n\n"
+)
+
+
+def with_facets(facets):
+    return ANALYSIS + f"<facets>{json.dumps(facets)}</facets>"
+
+
+def test_facets_are_normalized():
+    parsed = parse_analysis(with_facets({"style": "Neo Traditional", "key_symbols": ["Wolf", "wolf", " Full Moon "]}))
+
+    assert parsed["style"] == "neo-traditional"
+    assert parsed["key_symbols"] == ["wolf", "full-moon"]
+    assert "<facets>" not in parsed["display_text"]
+
+
+@pytest.mark.parametrize("facets", [
+    {"style": ["blackwork"], "key_symbols": {"wolf": 1}},
+    {"style": {"name": "blackwork"}, "key_symbols": 3},
+    {"style": 7, "key_symbols": [["wolf"], None]},
+])
+def test_facets_of_the_wrong_type_are_ignored(facets):
+    parsed = parse_analysis(with_facets(facets))
+
+    # The style falls back to the one named in the style section
+    assert parsed["style"] == "blackwork"
+    assert parsed["key_symbols"] == []
+
+
+def test_single_symbol_string_is_accepted():
+    assert parse_analysis(with_facets({"key_symbols": "Wolf"}))["key_symbols"] == ["wolf"]
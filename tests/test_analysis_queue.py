@@ -0,0 +1,62 @@
+"""Batch analysis through the persistent job queue."""
+
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from PyQt6.QtGui import QColor, QImage
+
+from backend.chat_service import ChatService
+from backend.models import ImageQuality, ImageSize, TattooImage
+from mcp_impl.conversation_mcp import TattooAnalysisMCP
+
+
+async def add_images(chat_service, session_id, directory, count):
+    for i in range(count):
+        path = str(directory / f"{session_id}_{i}.png")
+        image = QImage(64, 64, QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 60, 200, 200))
+        image.save(path)
+        await chat_service.save_generated_image(TattooImage(
+            id=str(uuid.uuid4()),
+            prompt=f"design {i}",
+            image_path=path,
+            size=ImageSize.SQUARE_1024,
+            quality=ImageQuality.STANDARD,
+            created_at=datetime.now(),
+            chat_session_id=session_id
+        ), f"Generated tattoo: design {i}")
+
+
+async def drain(queue):
+    while queue.progress() != (0, 0):
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_session_batch_skips_analysed_images(offline_config, data_dir):
+    chat_service = ChatService()
+    analyzer = TattooAnalysisMCP(
+        chat_service, offline_config.anthropic_api_key, base_url=offline_config.anthropic_base_url
+    )
+    queue = analyzer.analysis_queue
+    session = await chat_service.create_session("batch")
+    await add_images(chat_service, session.id, data_dir, 2)
+
+    try:
+        assert await queue.submit_session(session.id) == 2
+        await drain(queue)
+        assert await chat_service.get_analyzed_image_paths(session.id) == {
+            image.image_path for image in await chat_service.get_session_images(session.id)
+        }
+
+        # A second run would only add duplicate analysis messages
+        assert await queue.submit_session(session.id) == 0
+        assert await queue.submit_session(session.id, force=True) == 2
+        await drain(queue)
+    finally:
+        await queue.stop()
+
+    messages = await chat_service.get_session_messages(session.id)
+    assert sum(m.content.startswith("🔍 Tattoo Analysis") for m in messages) == 4
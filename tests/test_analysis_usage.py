@@ -0,0 +1,37 @@
+"""Token usage totals reported by the tattoo analyzer."""
+
+import pytest
+from PIL import Image
+
+from backend.chat_service import ChatService
+from mcp_impl.conversation_mcp import USAGE_FIELDS, TattooAnalysisMCP
+
+
+@pytest.mark.asyncio
+async def test_usage_sums_every_analysis_request(fake_provider, data_dir):
+    chat_service = ChatService()
+    analyzer = TattooAnalysisMCP(chat_service, "offline", base_url=fake_provider.anthropic_base_url)
+    session = await chat_service.create_session("usage")
+    paths = []
+    for i, colour in enumerate(("navy", "olive")):
+        paths.append(str(data_dir / f"tattoo_{i}.png"))
+        Image.new("RGB", (64, 64), colour).save(paths[-1])
+
+    responses = []
+    record_usage = analyzer._record_usage
+    analyzer._record_usage = lambda usage: (responses.append(usage), record_usage(usage))
+
+    # One plain and one streamed request; a cache hit makes no request
+    assert (await analyzer._analyze_tattoo(paths[0], session.id))["status"] == "success"
+    assert [delta async for delta in analyzer.stream_analysis(paths[1], session.id)]
+    assert (await analyzer._analyze_tattoo(paths[0], session.id))["cached"]
+
+    stats = analyzer.usage_stats()
+    assert stats["requests"] == len(responses) == 2
+    for field in USAGE_FIELDS:
+        assert stats[field] == sum(getattr(usage, field) or 0 for usage in responses)
+    assert stats["input_tokens"] > 0 and stats["output_tokens"] > 0
+    # The analysis prompt is below the minimum cacheable length
+    assert stats["cache_creation_input_tokens"] == stats["cache_read_input_tokens"] == 0
+    assert stats["cache_hit_ratio"] == 0.0
+    await analyzer.analysis_queue.stop()
@@ -0,0 +1,98 @@
+"""Recording and replaying API exchanges through the cassette transport."""
+
+import base64
+import threading
+import time
+
+import httpx
+import pytest
+
+from backend.cassette import AsyncCassetteTransport, Cassette
+
+
+def image_response(request):
+    image = base64.b64encode(b"\x89PNG" + bytes(range(256)) * 64).decode("ascii")
+    return httpx.Response(200, json={"data": [{"b64_json": image}]})
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path):
+    cassette = Cassette(str(tmp_path))
+    recording = AsyncCassetteTransport(httpx.MockTransport(image_response), cassette, "record")
+    async with httpx.AsyncClient(transport=recording, base_url="https://api.test") as client:
+        recorded = (await client.post("/v1/images/generations", json={"prompt": "fox"})).json()
+
+    assert len(list((tmp_path / "blobs").iterdir())) == 1
+
+    replaying = AsyncCassetteTransport(httpx.MockTransport(image_response), Cassette(str(tmp_path)), "replay")
+    async with httpx.AsyncClient(transport=replaying, base_url="https://api.test") as client:
+        replayed = (await client.post("/v1/images/generations", json={"prompt": "fox"})).json()
+
+    assert replayed == recorded
+
+
+@pytest.mark.asyncio
+async def test_recording_writes_off_the_event_loop(tmp_path):
+    writers = []
+
+    class WatchedCassette(Cassette):
+        def record(self, *args):
+            writers.append(threading.current_thread())
+            super().record(*args)
+
+    transport = AsyncCassetteTransport(httpx.MockTransport(image_response), WatchedCassette(str(tmp_path)), "record")
+    async with httpx.AsyncClient(transport=transport, base_url="https://api.test") as client:
+        await client.post("/v1/images/generations", json={"prompt": "fox"})
+
+    assert writers and threading.main_thread() not in writers
+
+
+STREAMED_MESSAGE = {
+    "model": "claude-test",
+    "stream": True,
+    "messages": [{"role": "user", "content": "describe the koi"}]
+}
+
+
+async def read_stream(client, stop_after=None):
+    """Return a streamed body's chunks with the time each one arrived"""
+    chunks = []
+    started = time.monotonic()
+    async with client.stream("POST", "/v1/messages", json=STREAMED_MESSAGE) as response:
+        async for chunk in response.aiter_bytes():
+            chunks.append((chunk, time.monotonic() - started))
+            if len(chunks) == stop_after:
+                break
+    return chunks
+
+
+@pytest.mark.asyncio
+async def test_recording_passes_streamed_chunks_on_as_they_arrive(tmp_path, fake_provider):
+    fake_provider.chunk_delay_ms = 30
+    cassette = Cassette(str(tmp_path / "cassette"))
+    transport = AsyncCassetteTransport(httpx.AsyncHTTPTransport(), cassette, "record")
+    async with httpx.AsyncClient(transport=transport, base_url=fake_provider.anthropic_base_url) as client:
+        chunks = await read_stream(client)
+
+    # The first event is seen long before the last one was sent
+    first, last = chunks[0][1], chunks[-1][1]
+    assert len(chunks) > 5
+    assert last - first > 0.1
+
+    replaying = AsyncCassetteTransport(httpx.AsyncHTTPTransport(), Cassette(str(tmp_path / "cassette")), "replay")
+    async with httpx.AsyncClient(transport=replaying, base_url=fake_provider.anthropic_base_url) as client:
+        replayed = await read_stream(client)
+
+    assert b"".join(chunk for chunk, _ in replayed) == b"".join(chunk for chunk, _ in chunks)
+    assert fake_provider.request_counts["/v1/messages"] == 1
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_is_not_recorded(tmp_path, fake_provider):
+    fake_provider.chunk_delay_ms = 30
+    cassette = Cassette(str(tmp_path / "cassette"))
+    transport = AsyncCassetteTransport(httpx.AsyncHTTPTransport(), cassette, "record")
+    async with httpx.AsyncClient(transport=transport, base_url=fake_provider.anthropic_base_url) as client:
+        await read_stream(client, stop_after=2)
+
+    assert not cassette.index_path.exists()
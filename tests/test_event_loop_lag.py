@@ -0,0 +1,61 @@
+"""The event loop keeps running while images are generated and analysed."""
+
+import asyncio
+
+import pytest
+
+from backend.chat_service import ChatService
+from backend.fake_provider import FakeProviderServer
+from backend.openai_service import OpenAIService
+from mcp_impl.conversation_mcp import TattooAnalysisMCP
+
+# Each API call takes this long, so a blocking call stalls the loop past the bound
+PROVIDER_LATENCY_MS = 500
+MAX_LAG = 0.2
+
+
+class LagProbe:
+    """Sleeps in short ticks and records the worst overshoot"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, loop.time() - started - self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+@pytest.fixture
+def slow_provider(data_dir):
+    with FakeProviderServer(latency_ms=PROVIDER_LATENCY_MS) as server:
+        yield server
+
+
+@pytest.mark.asyncio
+async def test_generation_and_analysis_do_not_block_the_loop(slow_provider):
+    chat_service = ChatService()
+    session = await chat_service.create_session("lag")
+    openai_service = OpenAIService("offline", base_url=slow_provider.openai_base_url)
+    mcp = TattooAnalysisMCP(chat_service, "offline", base_url=slow_provider.anthropic_base_url)
+
+    with LagProbe() as probe:
+        image = await openai_service.generate_tattoo("a lighthouse in a storm", chat_session_id=session.id)
+        result = await mcp._analyze_tattoo(image.image_path, session.id)
+        streamed = [delta async for delta in mcp.stream_analysis(image.image_path, session.id, force=True)]
+
+    assert result["status"] == "success"
+    assert streamed
+    assert slow_provider.request_counts.get("/v1/messages") == 2
+    assert probe.max_lag < MAX_LAG, f"event loop stalled for {probe.max_lag:.3f}s"
@@ -0,0 +1,55 @@
+"""Behaviour of the offline stand-in provider."""
+
+import json
+import time
+
+import httpx
+
+from backend.fake_provider import FakeProviderServer, min_cacheable_tokens
+
+
+def messages_request(model, system_text):
+    return {
+        "model": model,
+        "max_tokens": 100,
+        "system": [{"type": "text", "text": system_text, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": "Please analyze this tattoo design."}]
+    }
+
+
+def usage(server, body):
+    status, _, payload = server.handle("/v1/messages", body)
+    assert status == 200
+    return json.loads(payload)["usage"]
+
+
+def test_prompt_cache_requires_the_model_minimum():
+    server = FakeProviderServer()
+    model = "claude-3-haiku-20240307"
+    assert min_cacheable_tokens(model) == 2048
+
+    # A prefix long enough for other models is still too short for Haiku
+    short = messages_request(model, "x" * 4 * 1500)
+    for _ in range(2):
+        assert usage(server, short)["cache_creation_input_tokens"] == 0
+        assert usage(server, short)["cache_read_input_tokens"] == 0
+
+    long = messages_request(model, "x" * 4 * 2100)
+    assert usage(server, long)["cache_creation_input_tokens"] > 2048
+    assert usage(server, long)["cache_read_input_tokens"] > 2048
+
+
+def test_stream_chunks_are_spaced_by_the_chunk_delay():
+    body = dict(messages_request("claude-3-haiku-20240307", "Analyze tattoos."), stream=True)
+    arrivals = []
+    with FakeProviderServer(chunk_delay_ms=20) as server:
+        start = time.monotonic()
+        with httpx.stream("POST", f"{server.url}/v1/messages", json=body) as response:
+            for line in response.iter_lines():
+                if line.startswith("data:") and "text_delta" in line:
+                    arrivals.append(time.monotonic() - start)
+
+    # The first delta arrives early and the rest follow over time
+    assert len(arrivals) > 5
+    assert arrivals[-1] - arrivals[0] >= 0.02 * (len(arrivals) - 1) * 0.8
+    assert arrivals[0] < arrivals[-1] / 2
@@ -0,0 +1,87 @@
+"""Identical generation and analysis requests share one API call."""
+
+import asyncio
+
+import pytest
+from PIL import Image
+
+from conftest import close_window
+from backend.chat_service import ChatService
+from backend.models import ImageQuality, ImageSize
+from backend.openai_service import OpenAIService
+from frontend.main_window import MainWindow
+from mcp_impl.conversation_mcp import TattooAnalysisMCP
+
+
+def chat_texts(window):
+    return [item.text for item in window.chat_area.model.items()]
+
+
+def test_identical_submits_make_one_api_call(main_window, fake_provider, qt_loop):
+    async def scenario():
+        session = await main_window.chat_service.create_session("dedupe")
+        await main_window.on_session_selected(session.id)
+
+        await asyncio.gather(*(
+            main_window.on_generate_tattoo("a koi fish in waves", ImageSize.SQUARE_1024, ImageQuality.STANDARD)
+            for _ in range(2)
+        ))
+        while main_window.generation_queue.active_jobs():
+            await asyncio.sleep(0.02)
+        return await main_window.chat_service.get_session_images(session.id)
+
+    images = qt_loop(scenario())
+
+    assert fake_provider.request_counts.get("/v1/images/generations") == 1
+    assert len(images) == 1
+    assert "This design is already being generated" in chat_texts(main_window)
+
+
+def test_identical_analyses_stream_once(offline_config, fake_provider, data_dir, qt_loop):
+    fake_provider.latency_ms = 100
+    window = MainWindow(offline_config.openai_api_key, offline_config.anthropic_api_key, offline_config)
+    image_path = str(data_dir / "koi.png")
+    Image.new("RGB", (64, 64), "navy").save(image_path)
+
+    async def scenario():
+        session = await window.chat_service.create_session("dedupe")
+        await window.on_session_selected(session.id)
+        await asyncio.gather(*(window.on_analyze_image(image_path, "koi") for _ in range(2)))
+
+    try:
+        qt_loop(scenario())
+        texts = chat_texts(window)
+        placeholders = window.chat_area.job_placeholders()
+    finally:
+        close_window(window, qt_loop)
+
+    assert fake_provider.request_counts.get("/v1/messages") == 1
+    assert sum(text.startswith("🔍 Tattoo Analysis") for text in texts) == 1
+    assert "This image is already being analyzed" in texts
+    assert not placeholders
+
+
+@pytest.mark.asyncio
+async def test_service_calls_share_one_flight(fake_provider, data_dir):
+    fake_provider.latency_ms = 50
+    chat_service = ChatService()
+    session = await chat_service.create_session("dedupe")
+    openai_service = OpenAIService("offline", base_url=fake_provider.openai_base_url)
+    analyzer = TattooAnalysisMCP(chat_service, "offline", base_url=fake_provider.anthropic_base_url)
+
+    first, second = await asyncio.gather(*(
+        openai_service.generate_tattoo("a paper crane", chat_session_id=session.id)
+        for _ in range(2)
+    ))
+    assert first is second
+    assert fake_provider.request_counts["/v1/images/generations"] == 1
+
+    results = await asyncio.gather(*(
+        analyzer._analyze_tattoo(first.image_path, session.id) for _ in range(2)
+    ))
+    assert [result["status"] for result in results] == ["success", "success"]
+    assert results[0] is results[1]
+    assert fake_provider.request_counts["/v1/messages"] == 1
+    assert await chat_service.get_analyzed_image_paths(session.id) == {first.image_path}
+    messages = await chat_service.get_session_messages(session.id)
+    assert sum(m.content.startswith("🔍 Tattoo Analysis") for m in messages) == 1
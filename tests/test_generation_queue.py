@@ -0,0 +1,152 @@
+"""Cancelling generation and analysis jobs."""
+
+import asyncio
+import time
+
+import pytest
+from PIL import Image
+
+from backend.chat_service import ChatService
+from backend.generation_queue import GenerationQueue
+from backend.models import ImageQuality, ImageSize, JobStatus
+from backend.openai_service import OpenAIService
+from mcp_impl.conversation_mcp import TattooAnalysisMCP
+
+
+def make_queue(fake_provider, concurrency=1):
+    chat_service = ChatService()
+    openai_service = OpenAIService("offline", base_url=fake_provider.openai_base_url)
+    queue = GenerationQueue(openai_service, chat_service, concurrency)
+    updates = []
+    start = time.monotonic()
+    queue.on_job_updated = lambda job: updates.append((job.id, job.status, time.monotonic() - start))
+    return queue, chat_service, updates
+
+
+def submit(queue, session_id, prompt):
+    return queue.submit(session_id, prompt, ImageSize.SQUARE_1024, ImageQuality.STANDARD, [])
+
+
+async def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def slow_saves(chat_service, seconds):
+    """Make save_generated_image take a while, so a job stays committing"""
+    save = chat_service.save_generated_image
+
+    async def slow_save(*args):
+        await asyncio.sleep(seconds)
+        return await save(*args)
+
+    chat_service.save_generated_image = slow_save
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_frees_its_slot(fake_provider):
+    fake_provider.latency_ms = 1000
+    queue, chat_service, updates = make_queue(fake_provider)
+    session = await chat_service.create_session("slots")
+
+    first = submit(queue, session.id, "a fox")
+    second = submit(queue, session.id, "an owl")
+    await wait_until(lambda: first.status == JobStatus.RUNNING)
+    await asyncio.sleep(0.1)
+    assert second.status == JobStatus.PENDING
+
+    assert queue.cancel(first.id)
+    await wait_until(lambda: second.status == JobStatus.RUNNING)
+
+    # The waiting job starts long before the cancelled request would have ended
+    started = next(at for job_id, status, at in updates if job_id == second.id and status == JobStatus.RUNNING)
+    assert started < 0.5
+    assert first.status == JobStatus.CANCELLED
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_committing_job_cannot_be_cancelled(fake_provider):
+    queue, chat_service, _ = make_queue(fake_provider)
+    slow_saves(chat_service, 0.3)
+    session = await chat_service.create_session("commit")
+
+    job = submit(queue, session.id, "a lantern")
+    await wait_until(lambda: job.id in queue._committing)
+    assert not queue.cancel(job.id)
+
+    await wait_until(lambda: not queue.active_jobs())
+    assert job.status == JobStatus.DONE
+    assert len(await chat_service.get_session_images(session.id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_during_save_reports_the_saved_image(fake_provider):
+    queue, chat_service, updates = make_queue(fake_provider)
+    slow_saves(chat_service, 0.3)
+    session = await chat_service.create_session("stop")
+
+    job = submit(queue, session.id, "a compass")
+    await wait_until(lambda: job.id in queue._committing)
+    await queue.stop()
+
+    images = await chat_service.get_session_images(session.id)
+    assert [image.id for image in images] == [job.image.id]
+    assert updates[-1][1] == JobStatus.DONE
+
+
+@pytest.mark.asyncio
+async def test_discarded_image_files_are_deleted(tmp_path):
+    paths = [tmp_path / name for name in ("tattoo.png", "tattoo_large.jpg", "tattoo_thumb.png")]
+    for path in paths:
+        path.write_bytes(b"image")
+
+    store = asyncio.get_running_loop().create_future()
+    store.set_result((str(paths[0]), {"large": str(paths[1]), "medium": str(paths[1]), "thumb": str(paths[2])}))
+    OpenAIService._discard_stored_image(store)
+
+    assert not any(path.exists() for path in paths)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_analysis_saves_nothing(fake_provider, data_dir):
+    fake_provider.chunk_delay_ms = 20
+    chat_service = ChatService()
+    analyzer = TattooAnalysisMCP(chat_service, "offline", base_url=fake_provider.anthropic_base_url)
+    session = await chat_service.create_session("cancel")
+    image_path = str(data_dir / "rose.png")
+    Image.new("RGB", (64, 64), "maroon").save(image_path)
+
+    stream = analyzer.stream_analysis(image_path, session.id)
+    await stream.__anext__()
+    await stream.aclose()
+    await asyncio.sleep(0.5)
+
+    assert await chat_service.get_analyzed_image_paths(session.id) == set()
+    assert await chat_service.get_session_messages(session.id) == []
+    await analyzer.analysis_queue.stop()
+
+
+def test_cancel_link_cancels_the_generation(main_window, fake_provider, qt_loop):
+    fake_provider.latency_ms = 1000
+
+    async def scenario():
+        session = await main_window.chat_service.create_session("cancel link")
+        await main_window.on_session_selected(session.id)
+        await main_window.on_generate_tattoo("a koi fish", ImageSize.SQUARE_1024, ImageQuality.STANDARD)
+        job = main_window.generation_queue.active_jobs(session.id)[0]
+        await wait_until(lambda: job.status == JobStatus.RUNNING)
+
+        # The delegate's Cancel link is forwarded through ChatArea
+        main_window.chat_area.delegate.cancel_clicked.emit(job.id)
+        await wait_until(lambda: not main_window.generation_queue.active_jobs())
+        return job, await main_window.chat_service.get_session_images(session.id)
+
+    job, images = qt_loop(scenario())
+
+    assert job.status == JobStatus.CANCELLED
+    assert images == []
+    assert job.id not in main_window.chat_area.job_placeholders()
+    assert "Generation cancelled" in [item.text for item in main_window.chat_area.model.items()]
@@ -0,0 +1,62 @@
+"""Background decoding and cancellation in ImageLoader."""
+
+import time
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtGui import QColor, QImage
+
+from frontend.image_loader import ImageLoader
+
+
+def make_images(directory, count, width=1792, height=1024):
+    paths = []
+    for i in range(count):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 50 % 360, 200, 200))
+        path = str(directory / f"image_{i}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def drain(qapp, loader, timeout=30):
+    deadline = time.monotonic() + timeout
+    while loader.pending() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+    loader.pool.waitForDone()
+    qapp.processEvents()
+
+
+def test_cancelling_running_decodes_is_safe(qapp, tmp_path):
+    # Cancelling while workers are mid-decode used to free tasks they were running
+    paths = make_images(tmp_path, 6)
+    loader = ImageLoader()
+    owner = QObject()
+    delivered = []
+
+    for _ in range(100):
+        for path in paths:
+            loader.load(owner, None, path, 600, 600, delivered.append)
+        qapp.processEvents()
+        loader.cancel(owner)
+
+    drain(qapp, loader)
+    assert loader.pending() == 0
+
+
+def test_only_uncancelled_requests_are_delivered(qapp, tmp_path):
+    paths = make_images(tmp_path, 4, 800, 600)
+    loader = ImageLoader()
+    kept, dropped = QObject(), QObject()
+    delivered = {"kept": [], "dropped": []}
+
+    for path in paths:
+        loader.load(kept, None, path, 400, 400, delivered["kept"].append)
+        loader.load(dropped, None, path, 400, 400, delivered["dropped"].append)
+    loader.cancel(dropped)
+    drain(qapp, loader)
+
+    assert len(delivered["kept"]) == len(paths)
+    assert all(image.width() == 400 for image in delivered["kept"])
+    assert delivered["dropped"] == []
@@ -0,0 +1,44 @@
+"""Image derivatives built in the shared process pool."""
+
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from backend.image_processing import build_image_pyramid
+from backend.workers import get_process_pool, shutdown_process_pool
+
+
+@pytest.mark.asyncio
+async def test_pyramid_of_relative_path_after_chdir(tmp_path, monkeypatch):
+    # Pool workers keep the directory they started in, so relative paths broke
+    first, second = tmp_path / "first", tmp_path / "second"
+    for directory in (first, second):
+        (directory / "images").mkdir(parents=True)
+        Image.new("RGB", (1792, 1024), "teal").save(directory / "images" / "tattoo.png")
+
+    for directory in (first, second):
+        monkeypatch.chdir(directory)
+        paths = await build_image_pyramid(os.path.join("images", "tattoo.png"))
+
+        assert set(paths) == {"large", "medium", "thumb"}
+        for path in paths.values():
+            assert not Path(path).is_absolute()
+            assert (directory / path).exists()
+        with Image.open(paths["thumb"]) as thumb:
+            assert max(thumb.size) == 150
+
+
+@pytest.mark.asyncio
+async def test_shutdown_joins_the_pool_workers(tmp_path):
+    Image.new("RGB", (64, 64), "teal").save(tmp_path / "tattoo.png")
+    await build_image_pyramid(str(tmp_path / "tattoo.png"))
+    workers = list(get_process_pool()._processes.values())
+
+    shutdown_process_pool()
+
+    assert workers
+    assert not any(worker.is_alive() for worker in workers)
+    # The next use starts a fresh pool
+    assert await build_image_pyramid(str(tmp_path / "tattoo.png"))
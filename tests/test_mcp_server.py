@@ -0,0 +1,45 @@
+"""Smoke test of the standalone MCP server over stdio."""
+
+import os
+import sys
+
+import pytest
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+from conftest import ROOT
+from mcp_impl.server import TOOLS
+
+
+@pytest.mark.asyncio
+async def test_server_starts_and_lists_tools(data_dir):
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        INKFORGE_OFFLINE="1",
+        HTTP_PREWARM="0",
+        CASSETTE_MODE="off"
+    )
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "mcp_impl.server"],
+        env=env,
+        cwd=str(data_dir)
+    )
+
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.list_tools()
+            sessions = await session.call_tool("list_sessions", {})
+            missing = await session.call_tool("get_session_timeline", {})
+            mistyped = await session.call_tool("search", {"limit": "ten"})
+
+    assert {tool.name for tool in result.tools} == {tool["name"] for tool in TOOLS}
+    assert not sessions.is_error
+
+    # Bad arguments come back as tool errors, not protocol errors
+    assert missing.is_error
+    assert "session_id" in missing.content[0].text
+    assert mistyped.is_error
+    assert "limit" in mistyped.content[0].text
@@ -0,0 +1,105 @@
+"""Prompt enhancement under a latency budget, with fallback and hedge policies."""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.openai_service import OpenAIService
+
+BUDGET_MS = 200
+HISTORY = [{"role": "user", "content": "a koi fish"}]
+COMPLETIONS = "/v1/chat/completions"
+
+
+def make_service(fake_provider, policy):
+    return OpenAIService(
+        "offline",
+        enhance_budget_ms=BUDGET_MS,
+        enhance_policy=policy,
+        base_url=fake_provider.openai_base_url
+    )
+
+
+async def timed(coro):
+    start = time.monotonic()
+    result = await coro
+    return result, (time.monotonic() - start) * 1000
+
+
+@pytest.mark.asyncio
+async def test_fallback_gives_up_after_one_budget(fake_provider):
+    fake_provider.latency_ms = BUDGET_MS * 3
+    openai_service = make_service(fake_provider, "fallback")
+
+    result, elapsed = await timed(openai_service._enhance_within_budget("add waves", HISTORY))
+
+    assert result is None
+    assert BUDGET_MS <= elapsed < BUDGET_MS * 1.5
+    assert fake_provider.request_counts[COMPLETIONS] == 1
+    assert openai_service.enhance_stats()["over_budget"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_once_and_gives_up_after_two_budgets(fake_provider):
+    fake_provider.latency_ms = BUDGET_MS * 4
+    openai_service = make_service(fake_provider, "hedge")
+
+    result, elapsed = await timed(openai_service._enhance_within_budget("add waves", HISTORY))
+
+    assert result is None
+    assert BUDGET_MS * 2 <= elapsed < BUDGET_MS * 2.5
+    assert fake_provider.request_counts[COMPLETIONS] == 2
+    stats = openai_service.enhance_stats()
+    assert (stats["hedged"], stats["over_budget"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_slow_first_request_still_wins_within_two_budgets(fake_provider):
+    fake_provider.latency_ms = int(BUDGET_MS * 1.5)
+    openai_service = make_service(fake_provider, "hedge")
+
+    result, elapsed = await timed(openai_service._enhance_within_budget("add waves", HISTORY))
+
+    assert result.startswith("Professional tattoo design")
+    assert elapsed < BUDGET_MS * 2
+    assert fake_provider.request_counts[COMPLETIONS] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_first_request_falls_to_the_hedge(fake_provider):
+    openai_service = make_service(fake_provider, "hedge")
+    enhance = openai_service._enhance_prompt
+    calls = []
+
+    async def first_fails_late(*args):
+        # The first request fails after the hedge has started; the hedge is fast
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            await asyncio.sleep(BUDGET_MS * 1.5 / 1000)
+            raise RuntimeError("upstream failure")
+        return await enhance(*args)
+
+    openai_service._enhance_prompt = first_fails_late
+    result, elapsed = await timed(openai_service._enhance_within_budget("add waves", HISTORY))
+
+    assert len(calls) == 2
+    assert result.startswith("Professional tattoo design")
+    assert elapsed < BUDGET_MS * 2
+
+
+@pytest.mark.asyncio
+async def test_error_is_raised_once_every_request_failed(fake_provider):
+    openai_service = make_service(fake_provider, "hedge")
+
+    async def failing(*args):
+        raise RuntimeError("upstream failure")
+
+    openai_service._enhance_prompt = failing
+    with pytest.raises(RuntimeError, match="upstream failure"):
+        await openai_service._enhance_within_budget("add waves", HISTORY)
+    assert openai_service.enhance_stats()["failed"] == 1
+
+    # The generation path falls back to the local prompt
+    prompt = await openai_service._build_contextual_prompt("add waves", HISTORY)
+    assert "Current request: add waves" in prompt
@@ -0,0 +1,27 @@
+"""Speculative prompt enhancement is only reused by the session it ran for."""
+
+import asyncio
+
+import pytest
+
+from backend.openai_service import OpenAIService
+
+HISTORY = [{"role": "user", "content": "a koi fish"}]
+COMPLETIONS = "/v1/chat/completions"
+
+
+@pytest.mark.asyncio
+async def test_speculation_is_not_shared_between_sessions(fake_provider):
+    openai_service = OpenAIService("offline", base_url=fake_provider.openai_base_url)
+
+    openai_service.speculate_prompt("add waves", "session-a", HISTORY)
+    await asyncio.wait({openai_service._speculative_task})
+    assert fake_provider.request_counts[COMPLETIONS] == 1
+
+    # Same prompt and history in another session enhances afresh
+    await openai_service.generate_tattoo("add waves", chat_session_id="session-b", conversation_history=HISTORY)
+    assert fake_provider.request_counts[COMPLETIONS] == 2
+
+    # The session the speculation ran for claims it
+    await openai_service.generate_tattoo("add waves", chat_session_id="session-a", conversation_history=HISTORY)
+    assert fake_provider.request_counts[COMPLETIONS] == 2
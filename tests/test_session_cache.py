@@ -0,0 +1,73 @@
+"""Eviction of detached session views by count and by estimated size."""
+
+from frontend.session_cache import ROW_OVERHEAD_BYTES, SessionView, SessionViewCache
+from frontend.widgets.chat_area import ChatAreaState
+from frontend.widgets.chat_model import ChatItem, ChatItemKind, ChatMessageModel
+from frontend.widgets.gallery_model import GalleryItem, GalleryModel
+from frontend.widgets.image_gallery import GalleryState
+
+
+def make_view(text_length=0, images=0):
+    chat = ChatMessageModel()
+    chat.append(ChatItem(ChatItemKind.USER, "x" * text_length))
+    gallery = GalleryModel()
+    for index in range(images):
+        gallery.append(GalleryItem(f"image_{index}.png", "prompt"))
+    return SessionView(ChatAreaState(chat, None), GalleryState(gallery, 0))
+
+
+def test_view_cost_counts_text_and_rows(qapp):
+    view = make_view(text_length=100, images=2)
+
+    assert view.cost == 200 + 3 * ROW_OVERHEAD_BYTES
+
+
+def test_least_recently_used_view_is_evicted_by_count(qapp):
+    cache = SessionViewCache(max_sessions=2)
+    views = {name: make_view() for name in "abc"}
+    cache.put("a", views["a"])
+    cache.put("b", views["b"])
+    # Putting a back makes b the least recently used
+    cache.put("a", cache.take("a"))
+    cache.put("c", views["c"])
+
+    assert "b" not in cache
+    assert len(cache) == 2
+    assert cache.take("a") is views["a"] and cache.take("c") is views["c"]
+    assert cache.bytes == 0
+
+
+def test_views_are_evicted_to_stay_within_bytes(qapp):
+    view_cost = make_view(text_length=1000).cost
+    cache = SessionViewCache(max_sessions=8, max_bytes=view_cost * 2 + 1)
+    for name in "abc":
+        cache.put(name, make_view(text_length=1000))
+
+    assert "a" not in cache
+    assert ("b" in cache, "c" in cache) == (True, True)
+    assert cache.bytes == view_cost * 2
+
+    # A view larger than the whole budget is not kept and evicts nothing
+    cache.put("huge", make_view(text_length=view_cost * 2))
+    assert "huge" not in cache
+    assert len(cache) == 2
+
+
+def test_invalidate_and_clear_release_bytes(qapp):
+    cache = SessionViewCache()
+    cache.put("a", make_view(text_length=10))
+    cache.put("b", make_view(images=1))
+
+    cache.invalidate("a")
+    assert "a" not in cache
+    assert cache.bytes == make_view(images=1).cost
+
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_disabled_cache_keeps_nothing(qapp):
+    cache = SessionViewCache(max_sessions=0)
+    cache.put("a", make_view())
+
+    assert "a" not in cache and cache.bytes == 0
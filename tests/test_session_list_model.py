@@ -0,0 +1,142 @@
+"""Keyset paging and event-driven updates of the sidebar session list."""
+
+import asyncio
+
+from PyQt6.QtCore import QCoreApplication, QEvent
+
+from backend.chat_service import ChatService
+from frontend.widgets.chat_sidebar import ChatSidebar
+from frontend.widgets.session_list_model import SessionListModel
+
+
+async def create_sessions(chat_service, names):
+    """Create sessions oldest first, so the last name is the most recent"""
+    sessions = []
+    for name in names:
+        sessions.append(await chat_service.create_session(name))
+        await asyncio.sleep(0.002)
+    return sessions
+
+
+async def fetch_more(model):
+    model.fetchMore()
+    await model._fetch_task
+
+
+def names(model):
+    return [model.index(row).data() for row in range(model.rowCount())]
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_pages_stop_at_the_last_session(qapp, data_dir, qt_loop):
+    async def scenario():
+        chat_service = ChatService()
+        await create_sessions(chat_service, [f"s{i}" for i in range(5)])
+        model = SessionListModel(chat_service, page_size=2)
+
+        await model.reload()
+        pages = [names(model)]
+        while model.canFetchMore():
+            await fetch_more(model)
+            pages.append(names(model))
+        return pages
+
+    pages = qt_loop(scenario())
+
+    assert pages == [
+        ["s4", "s3"],
+        ["s4", "s3", "s2", "s1"],
+        ["s4", "s3", "s2", "s1", "s0"],
+    ]
+
+
+def test_paging_an_exact_multiple_and_equal_timestamps(qapp, data_dir, qt_loop):
+    async def scenario():
+        chat_service = ChatService()
+        await create_sessions(chat_service, [f"s{i}" for i in range(4)])
+        # Keyset paging must not skip or repeat sessions updated at the same time
+        await chat_service._execute_query(
+            "UPDATE chat_sessions SET updated_at = ?", ("2026-01-01 00:00:00",)
+        )
+        model = SessionListModel(chat_service, page_size=2)
+
+        await model.reload()
+        fetches = 0
+        while model.canFetchMore():
+            await fetch_more(model)
+            fetches += 1
+        return names(model), fetches
+
+    loaded, fetches = qt_loop(scenario())
+
+    assert sorted(loaded) == ["s0", "s1", "s2", "s3"]
+    # A full last page needs one more (empty) fetch to know the list ended
+    assert fetches == 2
+
+
+def test_service_events_insert_move_and_remove_rows(qapp, data_dir, qt_loop):
+    async def scenario():
+        chat_service = ChatService()
+        sessions = await create_sessions(chat_service, [f"s{i}" for i in range(5)])
+        model = SessionListModel(chat_service, page_size=3)
+        await model.reload()
+        steps = [names(model)]
+
+        await chat_service.create_session("new")
+        await settle()
+        steps.append(names(model))
+
+        # A loaded session moves to the top when it gets a message
+        await chat_service.add_message(sessions[2].id, "hello")
+        await settle()
+        steps.append(names(model))
+
+        await chat_service.delete_session(sessions[3].id)
+        await settle()
+        steps.append(names(model))
+
+        # A session beyond the loaded pages is inserted at the top, and not
+        # repeated when its old page is fetched later
+        await chat_service.add_message(sessions[0].id, "hello")
+        await settle()
+        steps.append(names(model))
+        while model.canFetchMore():
+            await fetch_more(model)
+        steps.append(names(model))
+        return steps
+
+    steps = qt_loop(scenario())
+
+    assert steps == [
+        ["s4", "s3", "s2"],
+        ["new", "s4", "s3", "s2"],
+        ["s2", "new", "s4", "s3"],
+        ["s2", "new", "s4"],
+        ["s0", "s2", "new", "s4"],
+        ["s0", "s2", "new", "s4", "s1"],
+    ]
+
+
+def test_filter_matches_names_case_insensitively(qapp, data_dir, qt_loop):
+    async def scenario():
+        chat_service = ChatService()
+        await create_sessions(chat_service, ["Koi sleeve", "Rose", "koi back piece"])
+        sidebar = ChatSidebar(chat_service)
+        try:
+            await sidebar.refresh_sessions()
+            sidebar.filter_input.setText("KOI")
+            filtered = [sidebar.proxy.index(row, 0).data() for row in range(sidebar.proxy.rowCount())]
+            sidebar.filter_input.clear()
+            return filtered, sidebar.proxy.rowCount()
+        finally:
+            sidebar.deleteLater()
+            QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    filtered, unfiltered = qt_loop(scenario())
+
+    assert filtered == ["koi back piece", "Koi sleeve"]
+    assert unfiltered == 3
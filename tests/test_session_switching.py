@@ -0,0 +1,201 @@
+"""Rapid session switches leave only the last selected session on screen."""
+
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime
+
+from PyQt6.QtGui import QColor, QImage
+
+from backend.models import ImageQuality, ImageSize, TattooImage
+
+
+async def make_session(chat_service, directory, index):
+    session = await chat_service.create_session(f"session {index}")
+    await chat_service.add_message(session.id, f"prompt {index}")
+    await make_session_image(chat_service, directory, session.id, index)
+    return session.id
+
+
+async def make_session_image(chat_service, directory, session_id, index):
+    image_path = str(directory / f"image_{index}.png")
+    image = QImage(64, 64, QImage.Format.Format_RGB32)
+    image.fill(QColor.fromHsv(index * 60, 200, 200))
+    image.save(image_path)
+    await chat_service.save_generated_image(TattooImage(
+        id=str(uuid.uuid4()),
+        prompt=f"design {index}",
+        image_path=image_path,
+        size=ImageSize.SQUARE_1024,
+        quality=ImageQuality.STANDARD,
+        created_at=datetime.now(),
+        chat_session_id=session_id
+    ), f"Generated tattoo: design {index}")
+
+
+def test_rapid_switches_show_only_the_last_session(main_window, data_dir, qt_loop):
+    async def scenario():
+        sessions = [
+            await make_session(main_window.chat_service, data_dir, i) for i in range(5)
+        ]
+        rng = random.Random(0)
+        order = [rng.choice(sessions) for _ in range(49)] + [sessions[2]]
+
+        switches = []
+        for session_id in order:
+            switches.append(asyncio.ensure_future(main_window.on_session_selected(session_id)))
+            # Interleave with loads already under way, as a fast user would
+            for _ in range(rng.randrange(3)):
+                await asyncio.sleep(0)
+        await asyncio.gather(*switches)
+        await asyncio.sleep(0.05)
+        return order[-1]
+
+    last = qt_loop(scenario())
+
+    texts = [item.text for item in main_window.chat_area.model.items()]
+    gallery = [item.prompt for item in main_window.gallery.model.items()]
+    assert main_window.current_session == last
+    assert "prompt 2" in texts and "design 2" in texts
+    assert not any(text.endswith(str(i)) for text in texts for i in (0, 1, 3, 4))
+    assert len(texts) == 3
+    assert gallery == ["design 2"]
+
+
+def test_derivatives_are_backfilled_once_and_shown(main_window, data_dir, qt_loop, monkeypatch):
+    import frontend.main_window as main_window_module
+    build = main_window_module.build_image_pyramid
+    built = []
+
+    async def slow_build(image_path):
+        built.append(image_path)
+        await asyncio.sleep(0.2)
+        return await build(image_path)
+
+    monkeypatch.setattr(main_window_module, "build_image_pyramid", slow_build)
+    # Every switch reloads from the database
+    main_window.view_cache.max_sessions = 0
+
+    async def scenario():
+        sessions = [
+            await make_session(main_window.chat_service, data_dir, i) for i in range(3)
+        ]
+        # The third session's image cannot be built
+        (data_dir / "image_2.png").unlink()
+
+        for session_id in sessions + sessions + sessions[:1]:
+            await main_window.on_session_selected(session_id)
+        while main_window._backfills:
+            await asyncio.sleep(0.02)
+        await main_window.on_session_selected(sessions[2])
+        await main_window.on_session_selected(sessions[0])
+        await asyncio.sleep(0.05)
+
+    qt_loop(scenario())
+
+    # Each image is built once, even after repeated loads and a failure
+    assert sorted(built) == sorted(str(data_dir / f"image_{i}.png") for i in range(3))
+    gallery = main_window.gallery.model.items()
+    chat_images = [item for item in main_window.chat_area.model.items() if item.image_path]
+    # The open session's rows show the derivatives built after they were added
+    assert gallery[0].thumb_path and os.path.exists(gallery[0].thumb_path)
+    assert gallery[0].preview_path and chat_images[0].display_path
+    assert os.path.exists(chat_images[0].display_path)
+
+
+def test_cached_view_is_dropped_when_its_session_changes(main_window, data_dir, qt_loop):
+    async def scenario():
+        first = await make_session(main_window.chat_service, data_dir, 0)
+        second = await make_session(main_window.chat_service, data_dir, 1)
+        await main_window.on_session_selected(first)
+        await main_window.on_session_selected(second)
+        cached = [first in main_window.view_cache]
+
+        await main_window.chat_service.add_message(first, "a new message")
+        cached.append(first in main_window.view_cache)
+
+        await main_window.on_session_selected(first)
+        await main_window.on_session_selected(second)
+        cached.append(first in main_window.view_cache)
+        await make_session_image(main_window.chat_service, data_dir, first, 5)
+        cached.append(first in main_window.view_cache)
+
+        await main_window.on_session_selected(first)
+        return cached
+
+    cached = qt_loop(scenario())
+
+    assert cached == [True, False, True, False]
+    texts = [item.text for item in main_window.chat_area.model.items()]
+    assert "a new message" in texts and "design 5" in texts
+    assert [item.prompt for item in main_window.gallery.model.items()] == ["design 5", "design 0"]
+
+
+def slow_message_reads(chat_service, seconds):
+    """Make get_session_messages return what it read a while ago"""
+    read = chat_service.get_session_messages
+
+    async def slow_read(session_id):
+        messages = await read(session_id)
+        await asyncio.sleep(seconds)
+        return messages
+
+    chat_service.get_session_messages = slow_read
+
+
+def test_prefetch_is_cancelled_by_another_selection(main_window, data_dir, qt_loop):
+    slow_message_reads(main_window.chat_service, 0.2)
+
+    async def scenario():
+        hovered = await make_session(main_window.chat_service, data_dir, 0)
+        selected = await make_session(main_window.chat_service, data_dir, 1)
+        main_window.on_prefetch_requested(hovered)
+        prefetch = main_window._prefetch_task
+
+        await main_window.on_session_selected(selected)
+        await asyncio.sleep(0.3)
+        return hovered, prefetch
+
+    hovered, prefetch = qt_loop(scenario())
+
+    assert prefetch.cancelled()
+    assert hovered not in main_window._prefetched
+    assert main_window._prefetch_session is None
+
+
+def test_prefetch_of_a_changed_session_is_not_adopted(main_window, data_dir, qt_loop):
+    slow_message_reads(main_window.chat_service, 0.2)
+
+    async def scenario():
+        session_id = await make_session(main_window.chat_service, data_dir, 0)
+        # The prefetch reads the timeline before the message is added
+        main_window.on_prefetch_requested(session_id)
+        prefetch = main_window._prefetch_task
+        await asyncio.sleep(0.05)
+        await main_window.chat_service.add_message(session_id, "a new message")
+
+        await main_window.on_session_selected(session_id)
+        return prefetch
+
+    prefetch = qt_loop(scenario())
+
+    assert prefetch.cancelled()
+    assert "a new message" in [item.text for item in main_window.chat_area.model.items()]
+
+
+def test_finished_prefetch_is_dropped_when_its_session_changes(main_window, data_dir, qt_loop):
+    async def scenario():
+        session_id = await make_session(main_window.chat_service, data_dir, 0)
+        main_window.on_prefetch_requested(session_id)
+        await main_window._prefetch_task
+        prefetched = session_id in main_window._prefetched
+
+        await main_window.chat_service.add_message(session_id, "a new message")
+        await main_window.on_session_selected(session_id)
+        return prefetched, session_id in main_window._prefetched
+
+    prefetched, still_prefetched = qt_loop(scenario())
+
+    assert (prefetched, still_prefetched) == (True, False)
+    assert "a new message" in [item.text for item in main_window.chat_area.model.items()]
@@ -0,0 +1,58 @@
+"""Coalescing of streamed text deltas into few model updates."""
+
+import asyncio
+
+from frontend.widgets.chat_area import StreamingMessage
+from frontend.widgets.chat_model import ChatItem, ChatItemKind, ChatMessageModel
+
+FLUSH_INTERVAL_MS = 50
+
+
+def make_message():
+    model = ChatMessageModel()
+    item = model.append(ChatItem(ChatItemKind.USER, "Analysis: "))
+    message = StreamingMessage(model, item, FLUSH_INTERVAL_MS)
+    changes, updates = [], []
+    model.dataChanged.connect(lambda *args: changes.append(item.text))
+    message.updated.connect(lambda: updates.append(item.text))
+    return message, item, changes, updates
+
+
+def test_deltas_within_an_interval_cause_one_update(qapp, qt_loop):
+    message, item, changes, updates = make_message()
+
+    async def scenario():
+        for index in range(100):
+            message.append(f"word{index} ")
+        # Nothing is applied before the interval ends
+        pending = (list(changes), item.text)
+        await asyncio.sleep(FLUSH_INTERVAL_MS * 3 / 1000)
+        return pending
+
+    pending = qt_loop(scenario())
+
+    text = "Analysis: " + "".join(f"word{index} " for index in range(100))
+    assert pending == ([], "Analysis: ")
+    assert changes == updates == [text]
+    assert message.text() == text
+
+
+def test_finish_flushes_the_remaining_text(qapp, qt_loop):
+    message, item, changes, updates = make_message()
+
+    async def scenario():
+        message.append("a rose ")
+        await asyncio.sleep(FLUSH_INTERVAL_MS * 3 / 1000)
+        message.append("with ")
+        message.append("thorns")
+        message.finish()
+        flushed = list(changes)
+        # The stopped timer applies nothing more, and an idle finish is a no-op
+        await asyncio.sleep(FLUSH_INTERVAL_MS * 3 / 1000)
+        message.finish()
+        return flushed
+
+    flushed = qt_loop(scenario())
+
+    assert flushed == changes == updates == ["Analysis: a rose ", "Analysis: a rose with thorns"]
+    assert item.text == message.text() == "Analysis: a rose with thorns"